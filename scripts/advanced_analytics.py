@@ -6,11 +6,15 @@ Advanced Statistical Analysis for Election Data
 
 import numpy as np
 import pandas as pd
-from scipy import stats
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, Union
 import matplotlib.pyplot as plt
-from collections import Counter
 import math
+import os
+
+from benford import benford_test
+from historical_swing import ElectionHistory
+from spatial import (DEFAULT_ADJACENCY, SpatialWeights, align_variables, build_weights, spatial_report,
+                     unit_variables)
 
 
 class AdvancedElectionAnalytics:
@@ -32,31 +36,23 @@ class AdvancedElectionAnalytics:
         
         หากข้อมูลถูกปลอมแปลง มักจะไม่เป็นไปตามกฎนี้
         """
-        # แยกเลขหลักหน้า
-        first_digits = [int(str(abs(x))[0]) for x in data if x > 0]
+        # ตัด NaN / inf / ค่าที่ไม่เป็นบวกก่อนแปลงเป็นจำนวนเต็ม (เหมือนเดิมที่นับเฉพาะ x > 0)
+        values = np.asarray(data, dtype=np.float64)
+        values = values[np.isfinite(values) & (values > 0)]
+        table = benford_test(values.astype(np.int64), 'first', min_value=1)
+        total = int(table.n[0])
         
-        if len(first_digits) < 30:
+        if total < 30:
             return {
                 'valid': False,
                 'reason': 'ข้อมูลน้อยเกินไป (ต้อง >= 30 รายการ)',
-                'sample_size': len(first_digits)
+                'sample_size': total
             }
         
-        # นับความถี่
-        observed_freq = Counter(first_digits)
-        total = len(first_digits)
-        
-        # คำนวณ Chi-Square
-        chi_square = 0
         details = {}
-        
         for digit in range(1, 10):
-            observed = observed_freq.get(digit, 0)
+            observed = int(table.counts[0, digit - 1])
             expected = self.benford_expected[digit] * total
-            
-            if expected > 0:
-                chi_square += ((observed - expected) ** 2) / expected
-            
             details[digit] = {
                 'observed': observed,
                 'observed_pct': (observed / total) * 100,
@@ -65,13 +61,16 @@ class AdvancedElectionAnalytics:
             }
         
         # ทดสอบที่ df = 8 (9 digits - 1)
-        p_value = 1 - stats.chi2.cdf(chi_square, df=8)
+        chi_square = float(table.chi_square[0])
+        p_value = float(table.p_value[0])
         
         return {
             'valid': True,
             'chi_square': chi_square,
             'p_value': p_value,
             'conforms_to_benford': p_value > 0.05,  # ถ้า > 0.05 แสดงว่าเป็นไปตามกฎ
+            'mad': float(table.mad[0]),
+            'kuiper': float(table.kuiper[0]),
             'details': details,
             'interpretation': self._interpret_benford_result(p_value)
         }
@@ -158,12 +157,16 @@ class AdvancedElectionAnalytics:
         }
     
     def compare_with_historical_data(self, current: pd.DataFrame, 
-                                     historical: pd.DataFrame) -> Dict:
+                                     historical: Union[pd.DataFrame, ElectionHistory]) -> Dict:
         """
         เปรียบเทียบกับข้อมูลการเลือกตั้งครั้งก่อน
         
         หา swing ที่ผิดปกติ
+        historical เป็น ElectionHistory: current คือ units รูปแบบ election_data.json
+        เทียบ swing รายพรรคและ turnout กับทุกการเลือกตั้งในคลังพร้อมกัน
         """
+        if isinstance(historical, ElectionHistory):
+            return self._compare_with_history(current, historical)
         if 'constituency_id' not in current.columns:
             return {'valid': False}
         
@@ -196,18 +199,59 @@ class AdvancedElectionAnalytics:
         
         return {'valid': False}
     
-    def spatial_autocorrelation(self, df: pd.DataFrame) -> Dict:
+    def _compare_with_history(self, current: pd.DataFrame, history: ElectionHistory) -> Dict:
+        """swing รายพรรค + turnout เทียบทุกการเลือกตั้งใน ElectionHistory"""
+        if 'unit_id' not in current.columns or not history.elections:
+            return {'valid': False}
+        
+        result = history.swings(current.to_dict('records'))
+        summary = result.party_summary().dropna()
+        outliers = result.outliers()
+        turnout = result.turnout_frame()
+        
+        return {
+            'valid': True,
+            'elections': result.elections,
+            'party_swing': {
+                election: summary.loc[election].round(2).to_dict('index')
+                for election in result.elections if election in summary.index.get_level_values(0)
+            },
+            'turnout_delta': turnout.groupby('election')['delta'].mean().round(2).to_dict(),
+            'outliers_count': len(outliers),
+            'outliers': outliers.round(2).to_dict('records'),
+            'interpretation': f"พบ {len(outliers)} swing ผิดปกติจาก {len(result.elections)} การเลือกตั้ง"
+        }
+    
+    def spatial_autocorrelation(self, df: pd.DataFrame, weights: SpatialWeights = None,
+                                permutations: int = 999, workers: int = 1) -> Dict:
         """
-        ทดสอบ Spatial Autocorrelation (Moran's I)
+        ทดสอบ Spatial Autocorrelation (Moran's I + LISA)
         
         ตรวจสอบว่าเขตใกล้เคียงกันมีแนวโน้มคะแนนใกล้เคียงกันหรือไม่
         หากผิดปกติ อาจบ่งบอกถึงการโกงที่เป็นระบบ
+
+        df: ข้อมูลรายเขตรูปแบบ election_data.json (unit_id, prov_id, zone, turn_out, ...)
+        weights: SpatialWeights (None = data/adjacency.json ถ้ามี ไม่เช่นนั้นใช้อำเภอร่วมกันใน zone)
         """
-        # Placeholder - ต้องมีข้อมูล geospatial จริง
+        if 'unit_id' not in df.columns:
+            return {'valid': False, 'reason': 'ต้องการคอลัมน์ unit_id'}
+        units = df.to_dict('records')
+        if weights is None:
+            if 'zone' not in df.columns and not os.path.exists(DEFAULT_ADJACENCY):
+                return {'valid': False, 'reason': 'ต้องการคอลัมน์ zone หรือไฟล์ adjacency'}
+            weights = build_weights(units)
+        
+        # ตัวแปรต้องเรียงตาม weights.ids — df อาจเรียงต่างกันหรือมีจำนวนแถวไม่เท่ากับ weights
+        variables = align_variables(unit_variables(units), df['unit_id'].tolist(), weights)
+        results = spatial_report(variables, weights, permutations, workers=workers)
+        significant = {name: r['I'] for name, r in results.items() if r['valid'] and r['p_sim'] < 0.05}
         return {
-            'valid': False,
-            'reason': 'ต้องการข้อมูล latitude, longitude',
-            'note': 'ใช้ pysal หรือ geopandas สำหรับการวิเคราะห์เต็มรูปแบบ'
+            'valid': True,
+            'constituencies': weights.n,
+            'islands': int(weights.islands.sum()),
+            'variables': results,
+            'interpretation': (f"พบการเกาะกลุ่มเชิงพื้นที่: {', '.join(f'{k} (I={v:.3f})' for k, v in significant.items())}"
+                               if significant else "ไม่พบการเกาะกลุ่มเชิงพื้นที่ที่มีนัยสำคัญ")
         }
     
     def generate_full_report(self, df: pd.DataFrame) -> Dict:
@@ -7,25 +7,22 @@
 import json
 import math
 import os
-import statistics
-from collections import Counter, defaultdict
+import time
+from collections import defaultdict
 
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_DIR = os.path.join(SCRIPT_DIR, '..', 'data')
+import numpy as np
 
+import histogram
+import sharding
+from anomaly_engine import AnomalyEngine, UnitColumns, round_half_even, to_python
+from anomaly_runner import Task, format_timings, run_tasks
+from benford import TESTS, benford_groups
+from group_stats import LEVELS, GroupedStats, encode, unit_groupings
+from histogram import SortedSample
+from robust_outliers import MAD_THRESHOLD, hampel, mad_scores, trimmed_scores
 
-def quantiles_4(data):
-    """Return (Q1, Q2, Q3) — works on Python 3.7+"""
-    s = sorted(data)
-    n = len(s)
-    def percentile(p):
-        k = (n - 1) * p
-        f = math.floor(k)
-        c = math.ceil(k)
-        if f == c:
-            return s[int(k)]
-        return s[f] * (c - k) + s[c] * (k - f)
-    return percentile(0.25), percentile(0.50), percentile(0.75)
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(SCRIPT_DIR, '..', 'data')
 
 
 def load_data():
@@ -34,233 +31,218 @@ def load_data():
         return json.load(f)
 
 
+def as_engine(units):
+    """รับ list ของ units, UnitColumns หรือ AnomalyEngine แล้วคืน AnomalyEngine"""
+    if isinstance(units, AnomalyEngine):
+        return units
+    if isinstance(units, UnitColumns):
+        return AnomalyEngine(units)
+    return AnomalyEngine(UnitColumns.from_units(units))
+
+
 def analyze_turnout(units):
     """วิเคราะห์อัตราการมาใช้สิทธิ"""
-    turnouts = []
-    for u in units:
-        if u['turn_out'] > 0 and u['registered_vote'] and u['registered_vote'] > 0:
-            pct = u['percent_turn_out']
-            turnouts.append({
-                'unit_id': u['unit_id'],
-                'constituency': u['constituency'],
-                'province': u['province'],
-                'turnout_pct': round(pct, 2),
-                'registered': u['registered_vote'],
-                'came': u['turn_out'],
-            })
-
-    pcts = [t['turnout_pct'] for t in turnouts]
-    mean = statistics.mean(pcts)
-    stdev = statistics.stdev(pcts)
-    median = statistics.median(pcts)
-    q1, _, q3 = quantiles_4(pcts)
-    iqr = q3 - q1
-    lower_fence = q1 - 1.5 * iqr
-    upper_fence = q3 + 1.5 * iqr
-
-    for t in turnouts:
-        z = (t['turnout_pct'] - mean) / stdev if stdev > 0 else 0
-        t['z_score'] = round(z, 2)
-        t['is_outlier'] = t['turnout_pct'] < lower_fence or t['turnout_pct'] > upper_fence
-        if t['turnout_pct'] < lower_fence:
-            t['flag'] = 'ต่ำผิดปกติ'
-        elif t['turnout_pct'] > upper_fence:
-            t['flag'] = 'สูงผิดปกติ'
-        else:
-            t['flag'] = 'ปกติ'
+    engine = as_engine(units)
+    cols = engine.cols
+    rate = engine.turnout
+    idx = rate.index
+
+    pcts = rate.pyvalues()
+    z_scores = rate.pyz()
+    flags = np.where(rate.below, 'ต่ำผิดปกติ', np.where(rate.above, 'สูงผิดปกติ', 'ปกติ')).tolist()
+    is_outlier = (rate.below | rate.above).tolist()
+    turnouts = [
+        {
+            'unit_id': uid,
+            'constituency': cons,
+            'province': prov,
+            'turnout_pct': pct,
+            'registered': reg,
+            'came': came,
+            'z_score': z,
+            'is_outlier': out,
+            'flag': flag,
+        }
+        for uid, cons, prov, pct, reg, came, z, out, flag in zip(
+            cols.text('unit_id', idx), cols.text('constituency', idx), cols.text('province', idx),
+            pcts, cols.registered_vote[idx].tolist(), cols.turn_out[idx].tolist(),
+            z_scores, is_outlier, flags)
+    ]
 
-    outliers = [t for t in turnouts if t['is_outlier']]
-    outliers.sort(key=lambda x: x['z_score'])
+    outlier_pos = np.flatnonzero(rate.below | rate.above)
+    outliers = [turnouts[i] for i in outlier_pos[np.argsort(rate.z[outlier_pos], kind='stable')].tolist()]
 
     return {
         'summary': {
-            'mean': round(mean, 2),
-            'median': round(median, 2),
-            'stdev': round(stdev, 2),
-            'q1': round(q1, 2),
-            'q3': round(q3, 2),
-            'iqr': round(iqr, 2),
-            'lower_fence': round(lower_fence, 2),
-            'upper_fence': round(upper_fence, 2),
-            'total': len(turnouts),
+            'mean': round(rate.mean, 2),
+            'median': round(rate.median, 2),
+            'stdev': round(rate.stdev, 2),
+            'q1': round(rate.q1, 2),
+            'q3': round(rate.q3, 2),
+            'iqr': round(rate.iqr, 2),
+            'lower_fence': round(rate.lower_fence, 2),
+            'upper_fence': round(rate.upper_fence, 2),
+            'total': rate.count,
             'outlier_count': len(outliers),
         },
-        'distribution': build_histogram(pcts, bins=[0, 30, 40, 50, 55, 60, 65, 70, 75, 80, 100]),
+        'distribution': rate_histogram(rate, bins=[0, 30, 40, 50, 55, 60, 65, 70, 75, 80, 100]),
         'outliers': outliers,
-        'all': sorted(turnouts, key=lambda x: x['turnout_pct']),
+        'all': [turnouts[i] for i in np.argsort(rate.values, kind='stable').tolist()],
     }
 
 
-def analyze_invalid_ballots(units):
-    """วิเคราะห์อัตราบัตรเสีย"""
-    items = []
-    for u in units:
-        if u['turn_out'] > 0:
-            rate = u['invalid_votes'] / u['turn_out'] * 100
-            items.append({
-                'unit_id': u['unit_id'],
-                'constituency': u['constituency'],
-                'province': u['province'],
-                'invalid_rate': round(rate, 2),
-                'invalid_votes': u['invalid_votes'],
-                'turn_out': u['turn_out'],
-            })
-
-    rates = [i['invalid_rate'] for i in items]
-    mean = statistics.mean(rates)
-    stdev = statistics.stdev(rates)
-    q1, _, q3 = quantiles_4(rates)
-    iqr = q3 - q1
-    upper_fence = q3 + 1.5 * iqr
-
-    for i in items:
-        z = (i['invalid_rate'] - mean) / stdev if stdev > 0 else 0
-        i['z_score'] = round(z, 2)
-        i['is_outlier'] = i['invalid_rate'] > upper_fence
-        i['flag'] = 'บัตรเสียสูงผิดปกติ' if i['is_outlier'] else 'ปกติ'
+def _upper_outlier_rate(engine, rate, value_key, count_key, count_values, flag_text, bins):
+    """โครงร่างร่วมของ analyzer ที่ตรวจเฉพาะค่าสูงเกิน upper fence (บัตรเสีย/ไม่ประสงค์ฯ)"""
+    cols = engine.cols
+    idx = rate.index
+    values = rate.pyvalues()
+    flags = np.where(rate.above, flag_text, 'ปกติ').tolist()
+    items = [
+        {
+            'unit_id': uid,
+            'constituency': cons,
+            'province': prov,
+            value_key: value,
+            count_key: count,
+            'turn_out': came,
+            'z_score': zs,
+            'is_outlier': out,
+            'flag': flag,
+        }
+        for uid, cons, prov, value, count, came, zs, out, flag in zip(
+            cols.text('unit_id', idx), cols.text('constituency', idx), cols.text('province', idx),
+            values, count_values, cols.turn_out[idx].tolist(),
+            rate.pyz(), rate.above.tolist(), flags)
+    ]
 
-    outliers = [i for i in items if i['is_outlier']]
-    outliers.sort(key=lambda x: x['invalid_rate'], reverse=True)
+    outlier_pos = np.flatnonzero(rate.above)
+    order = outlier_pos[np.argsort(-rate.values[outlier_pos], kind='stable')]
+    outliers = [items[i] for i in order.tolist()]
 
     return {
         'summary': {
-            'mean': round(mean, 2),
-            'stdev': round(stdev, 2),
-            'q1': round(q1, 2),
-            'q3': round(q3, 2),
-            'upper_fence': round(upper_fence, 2),
-            'total': len(items),
+            'mean': round(rate.mean, 2),
+            'stdev': round(rate.stdev, 2),
+            'q1': round(rate.q1, 2),
+            'q3': round(rate.q3, 2),
+            'upper_fence': round(rate.upper_fence, 2),
+            'total': rate.count,
             'outlier_count': len(outliers),
         },
-        'distribution': build_histogram(rates, bins=[0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 15]),
+        'distribution': rate_histogram(rate, bins=bins),
         'outliers': outliers,
     }
 
 
-def analyze_blank_votes(units):
-    """วิเคราะห์อัตราไม่ประสงค์ลงคะแนน"""
-    items = []
-    for u in units:
-        if u['turn_out'] > 0:
-            rate = u['blank_votes'] / u['turn_out'] * 100
-            items.append({
-                'unit_id': u['unit_id'],
-                'constituency': u['constituency'],
-                'province': u['province'],
-                'blank_rate': round(rate, 2),
-                'blank_votes': u['blank_votes'],
-                'turn_out': u['turn_out'],
-            })
-
-    rates = [i['blank_rate'] for i in items]
-    mean = statistics.mean(rates)
-    stdev = statistics.stdev(rates)
-    q1, _, q3 = quantiles_4(rates)
-    iqr = q3 - q1
-    upper_fence = q3 + 1.5 * iqr
-
-    for i in items:
-        z = (i['blank_rate'] - mean) / stdev if stdev > 0 else 0
-        i['z_score'] = round(z, 2)
-        i['is_outlier'] = i['blank_rate'] > upper_fence
-        i['flag'] = 'ไม่ประสงค์ฯ สูงผิดปกติ' if i['is_outlier'] else 'ปกติ'
+def analyze_invalid_ballots(units):
+    """วิเคราะห์อัตราบัตรเสีย"""
+    engine = as_engine(units)
+    rate = engine.invalid
+    return _upper_outlier_rate(
+        engine, rate, 'invalid_rate', 'invalid_votes',
+        engine.cols.invalid_votes[rate.index].tolist(), 'บัตรเสียสูงผิดปกติ',
+        bins=[0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 15])
 
-    outliers = [i for i in items if i['is_outlier']]
-    outliers.sort(key=lambda x: x['blank_rate'], reverse=True)
 
-    return {
-        'summary': {
-            'mean': round(mean, 2),
-            'stdev': round(stdev, 2),
-            'q1': round(q1, 2),
-            'q3': round(q3, 2),
-            'upper_fence': round(upper_fence, 2),
-            'total': len(items),
-            'outlier_count': len(outliers),
-        },
-        'distribution': build_histogram(rates, bins=[0, 2, 3, 4, 5, 6, 7, 8, 10, 15, 25]),
-        'outliers': outliers,
-    }
+def analyze_blank_votes(units):
+    """วิเคราะห์อัตราไม่ประสงค์ลงคะแนน"""
+    engine = as_engine(units)
+    rate = engine.blank
+    return _upper_outlier_rate(
+        engine, rate, 'blank_rate', 'blank_votes',
+        engine.cols.blank_votes[rate.index].tolist(), 'ไม่ประสงค์ฯ สูงผิดปกติ',
+        bins=[0, 2, 3, 4, 5, 6, 7, 8, 10, 15, 25])
 
 
 def analyze_winner_dominance(units):
     """วิเคราะห์ผู้ชนะได้คะแนนสูงเกินไป (potential vote buying / manipulation)"""
-    items = []
-    for u in units:
-        if u['valid_votes'] > 0 and u['winner_votes'] > 0:
-            pct = u['winner_votes'] / u['valid_votes'] * 100
-            cands = u.get('candidates', [])
-            runner_up = cands[1] if len(cands) >= 2 else None
-            margin = 0
-            if runner_up:
-                margin = (u['winner_votes'] - runner_up.get('ect_votes', 0)) / u['valid_votes'] * 100
-
-            items.append({
-                'unit_id': u['unit_id'],
-                'constituency': u['constituency'],
-                'province': u['province'],
-                'winner': u['winner'],
-                'winner_color': u['winner_color'],
-                'winner_pct': round(pct, 2),
-                'winner_votes': u['winner_votes'],
-                'valid_votes': u['valid_votes'],
-                'margin': round(margin, 2),
-                'runner_up': runner_up.get('party', '') if runner_up else '',
-                'runner_up_votes': runner_up.get('ect_votes', 0) if runner_up else 0,
-            })
-
-    pcts = [i['winner_pct'] for i in items]
-    mean = statistics.mean(pcts)
-    stdev = statistics.stdev(pcts)
-
-    for i in items:
-        z = (i['winner_pct'] - mean) / stdev if stdev > 0 else 0
-        i['z_score'] = round(z, 2)
-        i['is_extreme'] = i['winner_pct'] > 60
-        i['flag'] = 'ชนะขาดลอย (>60%)' if i['is_extreme'] else 'ปกติ'
+    engine = as_engine(units)
+    cols = engine.cols
+    rate = engine.winner
+    idx = rate.index
+
+    has_runner_up = cols.n_cands[idx] >= 2
+    runner_up = np.where(has_runner_up, cols.top2_party[idx], cols.code(''))
+    runner_up_votes = np.where(has_runner_up, cols.top2_votes[idx], 0)
+    is_extreme = rate.values > 60
+    flags = np.where(is_extreme, 'ชนะขาดลอย (>60%)', 'ปกติ').tolist()
+    strings = cols.strings
+
+    items = [
+        {
+            'unit_id': uid,
+            'constituency': cons,
+            'province': prov,
+            'winner': winner,
+            'winner_color': color,
+            'winner_pct': pct,
+            'winner_votes': wv,
+            'valid_votes': valid,
+            'margin': margin,
+            'runner_up': strings[ru],
+            'runner_up_votes': ruv,
+            'z_score': z,
+            'is_extreme': ext,
+            'flag': flag,
+        }
+        for uid, cons, prov, winner, color, pct, wv, valid, margin, ru, ruv, z, ext, flag in zip(
+            cols.text('unit_id', idx), cols.text('constituency', idx), cols.text('province', idx),
+            cols.text('winner', idx), cols.text('winner_color', idx), rate.pyvalues(),
+            cols.winner_votes[idx].tolist(), cols.valid_votes[idx].tolist(),
+            to_python(engine.winner_margin, engine.winner_margin_is_int),
+            runner_up.tolist(), runner_up_votes.tolist(), rate.pyz(), is_extreme.tolist(), flags)
+    ]
 
-    extreme = [i for i in items if i['is_extreme']]
-    extreme.sort(key=lambda x: x['winner_pct'], reverse=True)
+    by_pct = np.argsort(-rate.values, kind='stable')
+    extreme = [items[i] for i in by_pct[is_extreme[by_pct]].tolist()]
 
     return {
         'summary': {
-            'mean': round(mean, 2),
-            'stdev': round(stdev, 2),
-            'total': len(items),
+            'mean': round(rate.mean, 2),
+            'stdev': round(rate.stdev, 2),
+            'total': rate.count,
             'extreme_count': len(extreme),
         },
-        'distribution': build_histogram(pcts, bins=[0, 20, 30, 35, 40, 45, 50, 55, 60, 70, 80, 100]),
+        'distribution': rate_histogram(rate, bins=[0, 20, 30, 35, 40, 45, 50, 55, 60, 70, 80, 100]),
         'extreme': extreme,
-        'all': sorted(items, key=lambda x: x['winner_pct'], reverse=True),
+        'all': [items[i] for i in by_pct.tolist()],
     }
 
 
 def analyze_close_races(units):
     """วิเคราะห์เขตที่ผลสูสี (margin <3%)"""
-    items = []
-    for u in units:
-        cands = u.get('candidates', [])
-        if len(cands) >= 2 and u['valid_votes'] > 0:
-            v1 = cands[0].get('ect_votes', 0)
-            v2 = cands[1].get('ect_votes', 0)
-            margin = (v1 - v2) / u['valid_votes'] * 100
-            items.append({
-                'unit_id': u['unit_id'],
-                'constituency': u['constituency'],
-                'province': u['province'],
-                'margin_pct': round(margin, 2),
-                'margin_votes': v1 - v2,
-                'winner': cands[0].get('party', ''),
-                'winner_votes': v1,
-                'runner_up': cands[1].get('party', ''),
-                'runner_up_votes': v2,
-                'winner_name': cands[0].get('name', ''),
-                'runner_up_name': cands[1].get('name', ''),
-                'counted_pct': u.get('percent_count', 0),
-            })
+    engine = as_engine(units)
+    cols = engine.cols
+    idx = np.flatnonzero((cols.n_cands >= 2) & (cols.valid_votes > 0))
+    v1 = cols.top1_votes[idx]
+    v2 = cols.top2_votes[idx]
+    margin = round_half_even((v1 - v2) / cols.valid_votes[idx] * 100)
+    strings = cols.strings
+
+    items = [
+        {
+            'unit_id': uid,
+            'constituency': cons,
+            'province': prov,
+            'margin_pct': m,
+            'margin_votes': mv,
+            'winner': strings[w],
+            'winner_votes': wv,
+            'runner_up': strings[r],
+            'runner_up_votes': rv,
+            'winner_name': strings[wn],
+            'runner_up_name': strings[rn],
+            'counted_pct': counted,
+        }
+        for uid, cons, prov, m, mv, w, wv, r, rv, wn, rn, counted in zip(
+            cols.text('unit_id', idx), cols.text('constituency', idx), cols.text('province', idx),
+            margin.tolist(), (v1 - v2).tolist(), cols.top1_party[idx].tolist(), v1.tolist(),
+            cols.top2_party[idx].tolist(), v2.tolist(), cols.top1_name[idx].tolist(),
+            cols.top2_name[idx].tolist(), cols.number('percent_count', idx))
+    ]
 
-    items.sort(key=lambda x: x['margin_pct'])
-    close = [i for i in items if i['margin_pct'] < 3]
+    order = np.argsort(margin, kind='stable')
+    close = [items[i] for i in order[margin[order] < 3].tolist()]
 
     return {
         'summary': {
@@ -273,32 +255,39 @@ def analyze_close_races(units):
 
 def analyze_counting_progress(units):
     """วิเคราะห์ความคืบหน้าการนับคะแนน + ที่หยุดรายงาน"""
-    items = []
-    for u in units:
-        total_st = u.get('total_stations', 0) or 0
-        counted = u.get('counted_stations', 0) or 0
-        pct = u.get('percent_count', 0)
-        paused = u.get('pause_report', False)
-        remaining = total_st - counted
-        items.append({
-            'unit_id': u['unit_id'],
-            'constituency': u['constituency'],
-            'province': u['province'],
+    engine = as_engine(units)
+    cols = engine.cols
+    pct = cols.percent_count
+    pct_is_int = cols.percent_count_is_int
+    rounded = np.where(pct_is_int, pct, round_half_even(pct))
+    remaining = cols.total_stations - cols.counted_stations
+
+    items = [
+        {
+            'unit_id': uid,
+            'constituency': cons,
+            'province': prov,
             'total_stations': total_st,
             'counted_stations': counted,
-            'remaining': remaining,
-            'percent_count': round(pct, 2),
+            'remaining': rem,
+            'percent_count': p,
             'pause_report': paused,
-        })
+        }
+        for uid, cons, prov, total_st, counted, rem, p, paused in zip(
+            cols.text('unit_id'), cols.text('constituency'), cols.text('province'),
+            cols.total_stations.tolist(), cols.counted_stations.tolist(), remaining.tolist(),
+            to_python(rounded, pct_is_int), cols.pause_report.tolist())
+    ]
 
-    paused = [i for i in items if i['pause_report']]
-    incomplete = [i for i in items if i['percent_count'] < 100]
-    incomplete.sort(key=lambda x: x['percent_count'])
+    paused = [items[i] for i in np.flatnonzero(cols.pause_report).tolist()]
+    incomplete_pos = np.flatnonzero(rounded < 100)
+    order = incomplete_pos[np.argsort(rounded[incomplete_pos], kind='stable')]
+    incomplete = [items[i] for i in order.tolist()]
 
     return {
         'summary': {
             'total': len(items),
-            'complete': len([i for i in items if i['percent_count'] >= 100]),
+            'complete': int(np.count_nonzero(rounded >= 100)),
             'incomplete': len(incomplete),
             'paused': len(paused),
         },
@@ -309,80 +298,100 @@ def analyze_counting_progress(units):
 
 def analyze_math_consistency(units):
     """ตรวจสอบความสอดคล้องทางคณิตศาสตร์"""
-    errors = []
-    for u in units:
-        if u['turn_out'] > 0:
-            expected = u['valid_votes'] + u['invalid_votes'] + u['blank_votes']
-            diff = abs(expected - u['turn_out'])
-            if diff > 0:
-                errors.append({
-                    'unit_id': u['unit_id'],
-                    'constituency': u['constituency'],
-                    'province': u['province'],
-                    'turn_out': u['turn_out'],
-                    'sum_votes': expected,
-                    'difference': diff,
-                })
+    engine = as_engine(units)
+    cols = engine.cols
+    expected = cols.valid_votes + cols.invalid_votes + cols.blank_votes
+    diff = np.abs(expected - cols.turn_out)
+    idx = np.flatnonzero((cols.turn_out > 0) & (diff > 0))
+    errors = [
+        {
+            'unit_id': uid,
+            'constituency': cons,
+            'province': prov,
+            'turn_out': came,
+            'sum_votes': total,
+            'difference': d,
+        }
+        for uid, cons, prov, came, total, d in zip(
+            cols.text('unit_id', idx), cols.text('constituency', idx), cols.text('province', idx),
+            cols.turn_out[idx].tolist(), expected[idx].tolist(), diff[idx].tolist())
+    ]
 
     # Check candidate votes sum vs valid_votes
-    cand_errors = []
-    for u in units:
-        cands = u.get('candidates', [])
-        if cands and u['valid_votes'] > 0:
-            cand_sum = sum(c.get('ect_votes', 0) for c in cands)
-            diff = abs(cand_sum - u['valid_votes'])
-            if diff > 0:
-                pct_diff = diff / u['valid_votes'] * 100
-                cand_errors.append({
-                    'unit_id': u['unit_id'],
-                    'constituency': u['constituency'],
-                    'province': u['province'],
-                    'valid_votes': u['valid_votes'],
-                    'candidate_sum': cand_sum,
-                    'difference': diff,
-                    'pct_diff': round(pct_diff, 2),
-                })
+    cand_diff = np.abs(cols.cand_sum - cols.valid_votes)
+    idx = np.flatnonzero((cols.n_cands > 0) & (cols.valid_votes > 0) & (cand_diff > 0))
+    pct_diff = round_half_even(cand_diff[idx] / cols.valid_votes[idx] * 100)
+    cand_errors = [
+        {
+            'unit_id': uid,
+            'constituency': cons,
+            'province': prov,
+            'valid_votes': valid,
+            'candidate_sum': total,
+            'difference': d,
+            'pct_diff': p,
+        }
+        for uid, cons, prov, valid, total, d, p in zip(
+            cols.text('unit_id', idx), cols.text('constituency', idx), cols.text('province', idx),
+            cols.valid_votes[idx].tolist(), cols.cand_sum[idx].tolist(), cand_diff[idx].tolist(),
+            pct_diff.tolist())
+    ]
 
-    cand_errors.sort(key=lambda x: x['difference'], reverse=True)
+    order = np.argsort(-cand_diff[idx], kind='stable')
+    cand_errors = [cand_errors[i] for i in order.tolist()]
 
     return {
         'summary': {
             'turnout_math_errors': len(errors),
             'candidate_sum_errors': len(cand_errors),
-            'total_units': len(units),
+            'total_units': cols.n,
         },
         'turnout_errors': errors,
         'candidate_sum_errors': cand_errors[:30],
     }
 
 
-def analyze_benford(units):
-    """Benford's Law analysis on candidate vote counts"""
-    first_digits = Counter()
-    all_votes = []
+def _benford_summary(table, i=0):
+    row = table.row(i)
+    return {
+        'total_values': row['n'],
+        'chi_square': round(row['chi_square'], 2),
+        'p_value': round(row['p_value'], 4),
+        'chi_critical_005': round(table.chi_critical_005, 3),
+        'passes_test': row['chi_square'] < table.chi_critical_005,
+        'mad': round(row['mad'], 5),
+        'conformity': row['conformity'],
+        'kuiper': round(row['kuiper'], 4),
+    }
+
 
-    for u in units:
-        cands = u.get('candidates', [])
-        for c in cands:
-            v = c.get('ect_votes', 0)
-            if v >= 10:  # Need at least 2 digits
-                first = int(str(v)[0])
-                first_digits[first] += 1
-                all_votes.append(v)
+def analyze_benford(units, min_group_values=100):
+    """
+    Benford's Law บนคะแนนผู้สมัคร (>= 10): หลักแรก, หลักที่สอง, สองหลักแรก, หลักสุดท้าย
+    ทั้งประเทศ และหลักแรกรายพรรค / รายจังหวัด (เฉพาะกลุ่มที่มีค่า >= min_group_values)
+    """
+    cols = as_engine(units).cols
+    votes = cols.cand_votes
+    owner = np.repeat(np.arange(cols.n), np.diff(cols.cand_ptr))
+    party_codes, party_idx = np.unique(cols.cand_party, return_inverse=True)
+    prov_codes, prov_idx = np.unique(cols.prov_id[owner], return_inverse=True)
+    groupings = {
+        'all': (np.zeros(len(votes), dtype=np.int64), ['all']),
+        'party': (party_idx, [cols.strings[c] for c in party_codes.tolist()]),
+        'province': (prov_idx, [cols.strings[c] for c in prov_codes.tolist()]),
+    }
+    tables = benford_groups(votes, groupings, min_value=10)  # Need at least 2 digits
+    first = tables['all']['first']
 
-    total = sum(first_digits.values())
+    total = int(first.n[0])
     expected_benford = {d: math.log10(1 + 1/d) for d in range(1, 10)}
 
     results = []
-    chi_sq = 0
     for d in range(1, 10):
-        observed = first_digits.get(d, 0)
+        observed = int(first.counts[0, d - 1])
         expected_pct = expected_benford[d]
         observed_pct = observed / total if total > 0 else 0
-        expected_count = expected_pct * total
         deviation = observed_pct - expected_pct
-        if expected_count > 0:
-            chi_sq += (observed - expected_count) ** 2 / expected_count
         results.append({
             'digit': d,
             'observed_count': observed,
@@ -391,51 +400,81 @@ def analyze_benford(units):
             'deviation': round(deviation * 100, 2),
         })
 
-    # Chi-square critical value for 8 df at 0.05 = 15.507
+    def by_group(name):
+        table = tables[name]['first']
+        rows = [dict(_benford_summary(table, i), group=table.labels[i])
+                for i in np.flatnonzero(table.n >= min_group_values).tolist()]
+        # เสมอกันเรียงตามชื่อกลุ่ม (ลำดับรหัสข้อความต่างกันได้ระหว่าง engine แบบเต็มกับแบบ incremental)
+        return sorted(rows, key=lambda r: (-r['mad'], r['group']))
+
+    chi_sq = float(first.chi_square[0])
+    critical = first.chi_critical_005
     return {
         'summary': {
             'total_values': total,
             'chi_square': round(chi_sq, 2),
-            'chi_critical_005': 15.507,
-            'passes_test': chi_sq < 15.507,
+            'chi_critical_005': round(critical, 3),
+            'passes_test': chi_sq < critical,
         },
         'digits': results,
+        'tests': {test: _benford_summary(tables['all'][test]) for test in TESTS},
+        'by_party': by_group('party'),
+        'by_province': by_group('province'),
     }
 
 
 def analyze_province_patterns(units):
     """วิเคราะห์รูปแบบรายจังหวัด — พรรคเดียวชนะทุกเขต"""
-    prov_data = defaultdict(list)
-    for u in units:
-        prov_data[u['province']].append(u)
+    engine = as_engine(units)
+    cols = engine.cols
+    strings = cols.strings
+    has_turnout = cols.turn_out > 0
+    invalid_rate = cols.invalid_votes / np.where(has_turnout, cols.turn_out, 1) * 100
+
+    # จัดกลุ่มตามจังหวัด (ลำดับตามที่พบครั้งแรก เหมือน dict เดิม)
+    prov, labels = encode(cols.province)
+    n_prov = len(labels)
+    first_unit = np.unique(prov, return_index=True)[1]
+
+    # พรรคที่ชนะมากที่สุดต่อจังหวัด: นับคู่ (จังหวัด, พรรค) แล้วเลือกคู่ที่นับได้มากสุด
+    # เสมอกันใช้พรรคที่พบก่อน (ลำดับเดียวกับ Counter.most_common)
+    has_winner = cols.winner != cols.code('')
+    n_codes = len(strings)
+    pairs, pair_first, pair_count = np.unique(
+        prov[has_winner] * n_codes + cols.winner[has_winner], return_index=True, return_counts=True)
+    pair_prov = pairs // n_codes
+    best = np.lexsort((pair_first, -pair_count, pair_prov))
+    best = best[np.r_[True, pair_prov[best][1:] != pair_prov[best][:-1]]] if len(best) else best
+    dominant = dict(zip(pair_prov[best].tolist(), zip((pairs[best] % n_codes).tolist(), pair_count[best].tolist())))
+    unique_winners = np.bincount(pair_prov, minlength=n_prov)
+    total_winners = np.bincount(prov[has_winner], minlength=n_prov)
+
+    pct = cols.percent_turn_out
+    turnouts = GroupedStats(pct[pct > 0], prov[pct > 0], n_prov)
+    inv_rates = GroupedStats(invalid_rate[has_turnout], prov[has_turnout], n_prov)
 
     monopoly = []
     high_variation = []
-    for prov, prov_units in prov_data.items():
-        winners = [u['winner'] for u in prov_units if u['winner']]
-        if not winners:
+    for g in range(n_prov):
+        if g not in dominant:
             continue
-        unique = set(winners)
-        total = len(winners)
-        most_common = Counter(winners).most_common(1)[0]
-
-        turnouts = [u['percent_turn_out'] for u in prov_units if u['percent_turn_out'] > 0]
-        inv_rates = [u['invalid_votes'] / u['turn_out'] * 100 for u in prov_units if u['turn_out'] > 0]
+        party, count = dominant[g]
+        total = int(total_winners[g])
 
         entry = {
-            'province': prov,
-            'prov_id': prov_units[0]['prov_id'],
+            'province': strings[labels[g]],
+            'prov_id': strings[cols.prov_id[first_unit[g]]],
             'total_cons': total,
-            'unique_winners': len(unique),
-            'dominant_party': most_common[0],
-            'dominant_count': most_common[1],
-            'dominant_pct': round(most_common[1] / total * 100, 1),
-            'avg_turnout': round(statistics.mean(turnouts), 1) if turnouts else 0,
-            'turnout_stdev': round(statistics.stdev(turnouts), 1) if len(turnouts) > 1 else 0,
-            'avg_invalid_rate': round(statistics.mean(inv_rates), 2) if inv_rates else 0,
+            'unique_winners': int(unique_winners[g]),
+            'dominant_party': strings[party],
+            'dominant_count': count,
+            'dominant_pct': round(count / total * 100, 1),
+            'avg_turnout': round(float(turnouts.mean[g]), 1) if turnouts.count[g] else 0,
+            'turnout_stdev': round(float(turnouts.stdev[g]), 1) if turnouts.count[g] > 1 else 0,
+            'avg_invalid_rate': round(float(inv_rates.mean[g]), 2) if inv_rates.count[g] else 0,
         }
 
-        if len(unique) == 1 and total >= 3:
+        if entry['unique_winners'] == 1 and total >= 3:
             entry['flag'] = 'ผูกขาด — พรรคเดียวชนะทุกเขต'
             monopoly.append(entry)
         elif entry['turnout_stdev'] > 10:
@@ -450,64 +489,243 @@ def analyze_province_patterns(units):
     }
 
 
-def analyze_wasted_votes(units):
-    """วิเคราะห์อัตราคะแนนสูญเปล่า (invalid + blank) / turn_out"""
-    items = []
-    for u in units:
-        if u['turn_out'] > 0:
-            wasted = u['invalid_votes'] + u['blank_votes']
-            rate = wasted / u['turn_out'] * 100
-            items.append({
-                'unit_id': u['unit_id'],
-                'constituency': u['constituency'],
-                'province': u['province'],
-                'wasted_rate': round(rate, 2),
-                'wasted_votes': wasted,
-                'invalid_votes': u['invalid_votes'],
-                'blank_votes': u['blank_votes'],
-                'turn_out': u['turn_out'],
+# อัตราที่ตรวจเทียบกลุ่ม: (ชื่อใน engine, ตรวจด้านต่ำด้วยหรือไม่)
+PEER_RATES = {
+    'turnout': ('turnout', True),
+    'invalid_rate': ('invalid', False),
+    'blank_rate': ('blank', False),
+    'wasted_rate': ('wasted', False),
+    'winner_pct': ('winner', False),
+}
+
+
+def analyze_peer_groups(units, min_peers=5):
+    """
+    สถิติทุกอัตราแยกตามระดับ (ทั้งประเทศ / ภาค / จังหวัด / พรรคผู้ชนะ)
+    แล้ว flag หน่วยที่หลุด IQR fence ของกลุ่มตัวเอง (เฉพาะกลุ่มที่มี >= min_peers หน่วย)
+    """
+    engine = as_engine(units)
+    cols = engine.cols
+    groupings = unit_groupings(cols)
+
+    levels = {level: {} for level in LEVELS}
+    counts = {}
+    flags = []
+    for key, (name, check_low) in PEER_RATES.items():
+        rate = getattr(engine, name)
+        idx = rate.index
+        uids = cols.text('unit_id', idx)
+        cons = cols.text('constituency', idx)
+        provs = cols.text('province', idx)
+        values = rate.pyvalues()
+        national = (rate.below | rate.above) if check_low else rate.above
+        counts[key] = {}
+        for level in LEVELS:
+            codes, labels = groupings[level]
+            gs = GroupedStats(rate.values, codes[idx], labels=labels)
+            levels[level][key] = [
+                {field: round(v, 2) if isinstance(v, float) else v for field, v in row.items()}
+                for row in gs.rows(min_peers)
+            ]
+            z, below, above = gs.flags()
+            out = (above | below) if check_low else above
+            out &= gs.count[gs.groups] >= min_peers
+            pos = np.flatnonzero(out)
+            counts[key][level] = len(pos)
+            if level == 'national':
+                continue
+            g = gs.groups[pos]
+            for i, grp, zs, med, lo, hi in zip(
+                    pos.tolist(), g.tolist(), round_half_even(z[pos]).tolist(), gs.median[g].tolist(),
+                    gs.lower_fence[g].tolist(), gs.upper_fence[g].tolist()):
+                flags.append({
+                    'unit_id': uids[i],
+                    'constituency': cons[i],
+                    'province': provs[i],
+                    'rate': key,
+                    'level': level,
+                    'group': labels[grp],
+                    'value': values[i],
+                    'group_median': round(med, 2),
+                    'lower_fence': round(lo, 2),
+                    'upper_fence': round(hi, 2),
+                    'z_score': zs,
+                    'national_outlier': bool(national[i]),
+                })
+
+    flags.sort(key=lambda f: -abs(f['z_score']))
+    return {
+        'summary': {
+            'min_peers': min_peers,
+            'outlier_counts': counts,
+            'peer_only_flags': sum(not f['national_outlier'] for f in flags),
+        },
+        'levels': levels,
+        'flags': flags,
+    }
+
+
+def _unit_number(unit_id):
+    """เลขเขตจาก unit_id รูปแบบ '<prov_id>_<เขต>' (ไม่ใช่ตัวเลข = 0)"""
+    tail = unit_id.rsplit('_', 1)[-1]
+    return int(tail) if tail.isdigit() else 0
+
+
+def analyze_robust(units, hampel_k=3, hampel_t=3.0, trim=0.1):
+    """
+    Outlier แบบทนทานของทุกอัตรา (ไม่ใช้ mean/stdev ของทั้งประเทศ)
+      - mad        : modified z ทั้งประเทศ > 3.5
+      - regional   : modified z ภายในภาค > 3.5
+      - hampel     : เทียบเขตข้างเคียง ±hampel_k เขต (ตามเลขเขต) ในจังหวัดเดียวกัน
+      - trimmed    : z เทียบ trimmed mean / winsorized stdev ภายในภาค > 3
+    """
+    engine = as_engine(units)
+    cols = engine.cols
+    groupings = unit_groupings(cols)
+    numbers = np.array([_unit_number(u) for u in cols.text('unit_id')], dtype=np.int64)
+
+    counts = {}
+    flags = []
+    for key, (name, check_low) in PEER_RATES.items():
+        rate = getattr(engine, name)
+        idx = rate.index
+        values = rate.values
+        region = groupings['region'][0][idx]
+        province = groupings['province'][0][idx]
+
+        mad_z = mad_scores(values)[0]
+        regional_z = mad_scores(values, region)[0]
+        order = np.lexsort((numbers[idx], province))
+        h_med, h_score, h_flag = hampel(values, province, order, k=hampel_k, t=hampel_t)
+        # score มีเครื่องหมายตามทิศเทียบ median ของหน้าต่าง (+ 0.0 เปลี่ยน -0.0 เป็น 0.0 ใน JSON)
+        h_score = np.where(values < h_med, -h_score, h_score) + 0.0
+        trim_z = trimmed_scores(values, region, trim)[0]
+
+        def beyond(score, limit):
+            return (np.abs(score) > limit) if check_low else (score > limit)
+
+        methods = {
+            'mad': beyond(mad_z, MAD_THRESHOLD),
+            'regional': beyond(regional_z, MAD_THRESHOLD),
+            'hampel': h_flag if check_low else h_flag & (values > h_med),
+            'trimmed': beyond(trim_z, 3.0),
+        }
+        counts[key] = {m: int(np.count_nonzero(mask)) for m, mask in methods.items()}
+
+        hit = np.zeros(len(idx), dtype=bool)
+        for mask in methods.values():
+            hit |= mask
+        pos = np.flatnonzero(hit)
+        uids = cols.text('unit_id', idx[pos])
+        cons = cols.text('constituency', idx[pos])
+        provs = cols.text('province', idx[pos])
+        pyvalues = rate.pyvalues()
+        for j, i in enumerate(pos.tolist()):
+            flags.append({
+                'unit_id': uids[j],
+                'constituency': cons[j],
+                'province': provs[j],
+                'rate': key,
+                'value': pyvalues[i],
+                'methods': [m for m, mask in methods.items() if mask[i]],
+                'mad_z': round(float(mad_z[i]), 2),
+                'regional_mad_z': round(float(regional_z[i]), 2),
+                'hampel_median': round(float(h_med[i]), 2),
+                'hampel_score': round(float(h_score[i]), 2),
+                'trimmed_z': round(float(trim_z[i]), 2),
             })
 
-    rates = [i['wasted_rate'] for i in items]
-    mean = statistics.mean(rates)
-    stdev = statistics.stdev(rates)
-    q1w, _, q3 = quantiles_4(rates)
-    iqr = q3 - q1w
-    upper_fence = q3 + 1.5 * iqr
+    flags.sort(key=lambda f: (-len(f['methods']), -abs(f['regional_mad_z'])))
+    return {
+        'summary': {
+            'params': {'mad_threshold': MAD_THRESHOLD, 'hampel_k': hampel_k, 'hampel_t': hampel_t, 'trim': trim},
+            'counts': counts,
+            'flagged_units': len({f['unit_id'] for f in flags}),
+        },
+        'flags': flags,
+    }
+
 
-    for i in items:
-        i['is_outlier'] = i['wasted_rate'] > upper_fence
-        i['flag'] = 'คะแนนสูญเปล่าสูง' if i['is_outlier'] else 'ปกติ'
+def analyze_wasted_votes(units):
+    """วิเคราะห์อัตราคะแนนสูญเปล่า (invalid + blank) / turn_out"""
+    engine = as_engine(units)
+    cols = engine.cols
+    rate = engine.wasted
+    idx = rate.index
+    invalid = cols.invalid_votes[idx]
+    blank = cols.blank_votes[idx]
+    flags = np.where(rate.above, 'คะแนนสูญเปล่าสูง', 'ปกติ').tolist()
+
+    items = [
+        {
+            'unit_id': uid,
+            'constituency': cons,
+            'province': prov,
+            'wasted_rate': value,
+            'wasted_votes': wasted,
+            'invalid_votes': inv,
+            'blank_votes': blk,
+            'turn_out': came,
+            'is_outlier': out,
+            'flag': flag,
+        }
+        for uid, cons, prov, value, wasted, inv, blk, came, out, flag in zip(
+            cols.text('unit_id', idx), cols.text('constituency', idx), cols.text('province', idx),
+            rate.pyvalues(), (invalid + blank).tolist(), invalid.tolist(), blank.tolist(),
+            cols.turn_out[idx].tolist(), rate.above.tolist(), flags)
+    ]
 
-    outliers = [i for i in items if i['is_outlier']]
-    outliers.sort(key=lambda x: x['wasted_rate'], reverse=True)
+    outlier_pos = np.flatnonzero(rate.above)
+    order = outlier_pos[np.argsort(-rate.values[outlier_pos], kind='stable')]
+    outliers = [items[i] for i in order.tolist()]
 
     return {
         'summary': {
-            'mean': round(mean, 2),
-            'stdev': round(stdev, 2),
-            'upper_fence': round(upper_fence, 2),
+            'mean': round(rate.mean, 2),
+            'stdev': round(rate.stdev, 2),
+            'upper_fence': round(rate.upper_fence, 2),
             'outlier_count': len(outliers),
         },
-        'distribution': build_histogram(rates, bins=[0, 3, 5, 7, 9, 11, 13, 15, 20, 35]),
+        'distribution': rate_histogram(rate, bins=[0, 3, 5, 7, 9, 11, 13, 15, 20, 35]),
         'outliers': outliers,
     }
 
 
 def build_histogram(values, bins):
     """สร้าง histogram data"""
-    counts = [0] * (len(bins) - 1)
-    labels = []
-    for i in range(len(bins) - 1):
-        lo, hi = bins[i], bins[i + 1]
-        labels.append(f'{lo}-{hi}%')
-        for v in values:
-            if v >= lo and (v < hi or (i == len(bins) - 2 and v <= hi)):
-                counts[i] += 1
-    return {'labels': labels, 'counts': counts}
-
-
-def main():
+    return histogram.build_histogram(values, bins)
+
+
+def rate_histogram(rate, bins):
+    """histogram ของ RateColumn จากค่าที่เรียงไว้แล้วใน engine (ไม่ต้องเรียงซ้ำ)"""
+    return SortedSample(rate.sorted, presorted=True).histogram(bins)
+
+
+# analyzer ทั้งหมดของ main() พร้อมคอลัมน์ของ UnitColumns ที่อ่าน (อัตราที่ engine คำนวณแล้วส่งไปให้เสมอ)
+_UNIT_TEXT = ('unit_id', 'constituency', 'province')
+ANALYZERS = [
+    Task('turnout', analyze_turnout, _UNIT_TEXT + ('turn_out', 'registered_vote')),
+    Task('invalid_ballots', analyze_invalid_ballots, _UNIT_TEXT + ('turn_out', 'invalid_votes')),
+    Task('blank_votes', analyze_blank_votes, _UNIT_TEXT + ('turn_out', 'blank_votes')),
+    Task('winner_dominance', analyze_winner_dominance, _UNIT_TEXT + (
+        'winner', 'winner_color', 'top2_party', 'winner_votes', 'valid_votes', 'n_cands', 'top2_votes')),
+    Task('close_races', analyze_close_races, _UNIT_TEXT + (
+        'top1_votes', 'top2_votes', 'top1_party', 'top2_party', 'top1_name', 'top2_name', 'valid_votes',
+        'n_cands', 'percent_count', 'percent_count_is_int')),
+    Task('counting_progress', analyze_counting_progress, _UNIT_TEXT + (
+        'percent_count', 'percent_count_is_int', 'total_stations', 'counted_stations', 'pause_report')),
+    Task('math_consistency', analyze_math_consistency, _UNIT_TEXT + (
+        'cand_sum', 'turn_out', 'valid_votes', 'invalid_votes', 'blank_votes', 'n_cands')),
+    Task('benford', analyze_benford, ('cand_votes', 'cand_ptr', 'cand_party', 'prov_id')),
+    Task('province_patterns', analyze_province_patterns, (
+        'province', 'prov_id', 'winner', 'turn_out', 'invalid_votes', 'percent_turn_out')),
+    Task('wasted_votes', analyze_wasted_votes, _UNIT_TEXT + ('turn_out', 'invalid_votes', 'blank_votes')),
+    Task('peer_groups', analyze_peer_groups, _UNIT_TEXT + ('prov_id', 'winner')),
+    Task('robust_flags', analyze_robust, _UNIT_TEXT + ('prov_id', 'winner')),
+]
+
+
+def main(incremental=False, shard=False, workers=1):
     print('=' * 60)
     print(' วิเคราะห์ความผิดปกติข้อมูลเลือกตั้ง กกต.')
     print('=' * 60)
@@ -516,44 +734,64 @@ def main():
     units = data['units']
     print(f'\nข้อมูล: {len(units)} เขตเลือกตั้ง')
 
-    print('\n[1/8] วิเคราะห์อัตราการมาใช้สิทธิ...')
-    turnout = analyze_turnout(units)
-    print(f'  outliers: {turnout["summary"]["outlier_count"]} เขต')
-
-    print('[2/8] วิเคราะห์บัตรเสีย...')
-    invalid = analyze_invalid_ballots(units)
-    print(f'  outliers: {invalid["summary"]["outlier_count"]} เขต')
-
-    print('[3/8] วิเคราะห์ไม่ประสงค์ลงคะแนน...')
-    blank = analyze_blank_votes(units)
-    print(f'  outliers: {blank["summary"]["outlier_count"]} เขต')
-
-    print('[4/8] วิเคราะห์ผู้ชนะได้คะแนนสูง...')
-    dominance = analyze_winner_dominance(units)
-    print(f'  ชนะ >60%: {dominance["summary"]["extreme_count"]} เขต')
-
-    print('[5/8] วิเคราะห์เขตสูสี...')
-    close = analyze_close_races(units)
-    print(f'  margin <3%: {close["summary"]["total_close"]} เขต')
-
-    print('[6/8] วิเคราะห์ความคืบหน้าการนับ...')
-    counting = analyze_counting_progress(units)
-    print(f'  ยังนับไม่ครบ: {counting["summary"]["incomplete"]} เขต, หยุดรายงาน: {counting["summary"]["paused"]}')
-
-    print('[7/8] ตรวจสอบความสอดคล้องทางคณิตศาสตร์...')
-    math_check = analyze_math_consistency(units)
-    print(f'  turnout errors: {math_check["summary"]["turnout_math_errors"]}')
-    print(f'  candidate sum errors: {math_check["summary"]["candidate_sum_errors"]}')
-
-    print('[8/8] Benford\'s Law + Province patterns + Wasted votes...')
-    benford = analyze_benford(units)
-    print(f'  Chi-sq={benford["summary"]["chi_square"]}, pass={benford["summary"]["passes_test"]}')
-
-    province = analyze_province_patterns(units)
-    print(f'  monopoly provinces: {len(province["monopoly"])}')
+    # โหลดเป็น columnar arrays ครั้งเดียว แล้วให้ทุก analyzer ใช้ร่วมกัน
+    if incremental:
+        # ใช้สถิติจากรอบก่อน ปรับเฉพาะเขตที่เปลี่ยน
+        from anomaly_incremental import load_engine
+        engine, changed = load_engine(units)
+        if changed is None:
+            print('  incremental: ไม่มี state ที่ใช้ได้ คำนวณใหม่ทั้งหมด')
+        else:
+            print(f'  incremental: เปลี่ยน {len(changed)} เขต')
+    else:
+        engine = AnomalyEngine(UnitColumns.from_units(units))
+
+    print(f'\nรัน {len(ANALYZERS)} analyzer' + (f' บน {workers} process' if workers > 1 else '') + '...')
+    start = time.perf_counter()
+    results, timings = run_tasks(ANALYZERS, engine, workers=workers)
+    wall = time.perf_counter() - start
+    turnout = results['turnout']
+    invalid = results['invalid_ballots']
+    blank = results['blank_votes']
+    dominance = results['winner_dominance']
+    close = results['close_races']
+    counting = results['counting_progress']
+    math_check = results['math_consistency']
+    benford = results['benford']
+    province = results['province_patterns']
+    wasted = results['wasted_votes']
+    peers = results['peer_groups']
+    robust = results['robust_flags']
+
+    # สรุปผลของแต่ละ analyzer ตามลำดับใน ANALYZERS
+    reports = {
+        'turnout': ('อัตราการมาใช้สิทธิ', [f'outliers: {turnout["summary"]["outlier_count"]} เขต']),
+        'invalid_ballots': ('บัตรเสีย', [f'outliers: {invalid["summary"]["outlier_count"]} เขต']),
+        'blank_votes': ('ไม่ประสงค์ลงคะแนน', [f'outliers: {blank["summary"]["outlier_count"]} เขต']),
+        'winner_dominance': ('ผู้ชนะได้คะแนนสูง', [f'ชนะ >60%: {dominance["summary"]["extreme_count"]} เขต']),
+        'close_races': ('เขตสูสี', [f'margin <3%: {close["summary"]["total_close"]} เขต']),
+        'counting_progress': ('ความคืบหน้าการนับ', [
+            f'ยังนับไม่ครบ: {counting["summary"]["incomplete"]} เขต, หยุดรายงาน: {counting["summary"]["paused"]}']),
+        'math_consistency': ('ความสอดคล้องทางคณิตศาสตร์', [
+            f'turnout errors: {math_check["summary"]["turnout_math_errors"]}',
+            f'candidate sum errors: {math_check["summary"]["candidate_sum_errors"]}']),
+        'benford': ("Benford's Law", [
+            f'Chi-sq={benford["summary"]["chi_square"]}, pass={benford["summary"]["passes_test"]}']),
+        'province_patterns': ('Province patterns', [f'monopoly provinces: {len(province["monopoly"])}']),
+        'wasted_votes': ('Wasted votes', [f'wasted vote outliers: {wasted["summary"]["outlier_count"]}']),
+        'peer_groups': ('Peer groups', [
+            f'peer-group outliers: {len(peers["flags"])} (ไม่หลุดเกณฑ์ระดับประเทศ {peers["summary"]["peer_only_flags"]})']),
+        'robust_flags': ('Robust', [
+            f'robust outliers: {len(robust["flags"])} รายการ, {robust["summary"]["flagged_units"]} เขต']),
+    }
+    for i, task in enumerate(ANALYZERS, 1):
+        title, lines = reports[task.name]
+        print(f'[{i}/{len(ANALYZERS)}] {title}')
+        for line in lines:
+            print(f'  {line}')
 
-    wasted = analyze_wasted_votes(units)
-    print(f'  wasted vote outliers: {wasted["summary"]["outlier_count"]}')
+    print('\nเวลาต่อ analyzer:')
+    print(format_timings(timings, wall))
 
     # Build anomaly summary
     all_flags = []
@@ -617,6 +855,8 @@ def main():
         'math_consistency': math_check,
         'benford': benford,
         'province_patterns': province,
+        'peer_groups': peers,
+        'robust_flags': robust,
         'all_flags': all_flags,
         'flags_by_unit': {uid: flags for uid, flags in flag_by_unit.items()},
     }
@@ -626,6 +866,13 @@ def main():
     with open(out_path, 'w', encoding='utf-8') as f:
         json.dump(anomaly_data, f, ensure_ascii=False, indent=2)
     print(f'\n✅ บันทึก: {out_path}')
+    if incremental:
+        engine.save()
+    if shard:
+        shard_dir = os.path.join(DATA_DIR, 'shards', 'anomaly')
+        manifest, written = sharding.write_shards(anomaly_data, shard_dir, sharding.ANOMALY_SHARD_PATHS,
+                                                  sharding.ANOMALY_SUMMARY_PATHS)
+        print(f'✅ บันทึก: {shard_dir} ({len(manifest["shards"])} จังหวัด, เขียนใหม่ {written})')
 
     # Summary
     print('\n' + '=' * 60)
@@ -646,4 +893,13 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description='วิเคราะห์ความผิดปกติข้อมูลเลือกตั้ง กกต.')
+    parser.add_argument('--incremental', action='store_true',
+                        help='ใช้สถิติจากรอบก่อน คำนวณใหม่เฉพาะเขตที่เปลี่ยน')
+    parser.add_argument('--shard', action='store_true',
+                        help='เขียนไฟล์แยกรายจังหวัด + manifest ใน data/shards/anomaly/')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='จำนวน process สำหรับรัน analyzer แบบขนาน (1 = เรียงกันใน process เดียว)')
+    args = parser.parse_args()
+    main(incremental=args.incremental, shard=args.shard, workers=args.workers)
@@ -7,10 +7,18 @@
   - https://static-ectreport69.ect.go.th/data/data/refs/info_party_overview.json (ข้อมูลพรรค)
 """
 
+import hashlib
 import json
 import requests
 from datetime import datetime
 import os
+import time
+
+import columnar_store
+import sharding
+from ect_fetcher import ConcurrentFetcher, Endpoint, timing_report
+from http_cache import HTTPCache
+from snapshot_store import SnapshotStore
 
 # --- API Endpoints ---
 STATS_URL = "https://stats-ectreport69.ect.go.th/data/records/stats_cons.json"
@@ -19,8 +27,23 @@ PARTY_URL = "https://static-ectreport69.ect.go.th/data/data/refs/info_party_over
 CONSTITUENCY_URL = "https://static-ectreport69.ect.go.th/data/data/refs/info_constituency.json"
 CANDIDATE_URL = "https://static-ectreport69.ect.go.th/data/data/refs/info_mp_candidate.json"
 
+# ดึงพร้อมกันใน main() — stats_cons และรายชื่อผู้สมัครเป็นไฟล์ใหญ่ ให้ read timeout นานกว่า
+# ไฟล์อ้างอิง (refs) แทบไม่เปลี่ยน จึงผ่าน HTTP cache (conditional GET)
+ENDPOINTS = [
+    Endpoint("stats", STATS_URL, "ผลคะแนน (stats_cons)", timeout=(5, 60)),
+    Endpoint("provinces", PROVINCE_URL, "ข้อมูลจังหวัด", cache=True),
+    Endpoint("parties", PARTY_URL, "ข้อมูลพรรค", cache=True),
+    Endpoint("constituencies", CONSTITUENCY_URL, "ข้อมูลเขตเลือกตั้ง", cache=True),
+    Endpoint("candidates", CANDIDATE_URL, "ข้อมูลผู้สมัคร", timeout=(5, 60), cache=True),
+]
+
+# อายุของไฟล์อ้างอิงใน cache ก่อนต้อง revalidate (วินาที)
+REF_CACHE_MAX_AGE = int(os.environ.get("ECT_REF_CACHE_MAX_AGE", 6 * 3600))
+
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(SCRIPT_DIR, '..', 'data')
+# fingerprints ของรอบก่อน สำหรับ --incremental (ไม่ต้อง commit)
+STATE_PATH = os.path.join(SCRIPT_DIR, '..', '.cache', 'dashboard_state.json')
 
 
 def fetch_json(url, label):
@@ -37,6 +60,22 @@ def fetch_json(url, label):
         return None
 
 
+def fetch_all_json(endpoints=ENDPOINTS, fetcher=None):
+    """ดึง JSON ทุก endpoint พร้อมกัน คืน dict key -> data (None ถ้าล้มเหลว)"""
+    fetcher = fetcher or ConcurrentFetcher(cache=HTTPCache(max_age=REF_CACHE_MAX_AGE))
+    print(f"  ดึงข้อมูล {len(endpoints)} รายการพร้อมกัน...")
+    start = time.perf_counter()
+    results = fetcher.fetch_all(endpoints)
+    wall_time = time.perf_counter() - start
+    for r in results.values():
+        if r.ok:
+            print(f"  ✅ {r.label} สำเร็จ")
+        else:
+            print(f"  ❌ {r.label} ล้มเหลว: {r.error}")
+    print(timing_report(results, wall_time))
+    return {key: r.data for key, r in results.items()}
+
+
 def build_party_map(party_data):
     """สร้าง dict party_id -> {name, color, abbr}"""
     m = {}
@@ -87,145 +126,119 @@ def build_province_map(province_data):
     return m
 
 
-def create_dashboard_data(stats, province_map, party_map, cons_map, candidate_map):
-    """สร้างข้อมูล Dashboard จาก stats_cons.json"""
+def is_empty_constituency(cons):
+    """BKK_0 หรือรายการรวมที่ไม่มีคะแนนจริง"""
+    return cons.get("turn_out", 0) == 0 and cons.get("valid_votes", 0) == 0
 
-    last_update = stats.get("last_update", datetime.now().isoformat())
-    national_turnout = stats.get("turn_out", 0)
-    national_valid = stats.get("valid_votes", 0)
-    national_invalid = stats.get("invalid_votes", 0)
-    national_blank = stats.get("blank_votes", 0)
-    percent_count = stats.get("percent_count", 0)
 
-    provinces_result = stats.get("result_province", [])
+def build_unit(cons, prov_id, prov_name, party_map, cons_map, candidate_map):
+    """สร้าง unit dict ของเขตเลือกตั้งหนึ่งเขต"""
+    cons_id = cons["cons_id"]
 
-    all_units = []
-    province_summary = {}
-    total_constituencies = 0
+    # Constituency static info (total stations, registered, zone)
+    cinfo = cons_map.get(cons_id, {})
+    total_stations = cinfo.get("total_vote_stations", 0)
+    registered_vote = cinfo.get("registered_vote", 0)
+    zone = cinfo.get("zone", [])
 
-    for prov in provinces_result:
-        prov_id = prov["prov_id"]
-        prov_name = province_map.get(prov_id, prov_id)
-        prov_turnout = prov.get("turn_out", 0)
-        prov_valid = prov.get("valid_votes", 0)
-        prov_counted = prov.get("counted_vote_stations", 0)
-        prov_total_stations = prov.get("total_vote_stations", 0)
-        prov_percent = prov.get("percent_count", 0)
-
-        # Top parties at province level
-        prov_parties = prov.get("result_party", [])
-        top_prov_parties = sorted(prov_parties, key=lambda x: x.get("party_cons_votes", 0), reverse=True)[:5]
-        prov_top = []
-        for pp in top_prov_parties:
-            pid = pp["party_id"]
-            pinfo = party_map.get(pid, {"name": f"party_{pid}", "color": "#999"})
-            prov_top.append({
-                "name": pinfo["name"],
-                "color": pinfo["color"],
-                "cons_votes": pp.get("party_cons_votes", 0),
-                "party_list_votes": pp.get("party_list_vote", 0),
-            })
-
-        constituencies = prov.get("constituencies", [])
-        prov_unit_count = 0
+    # Candidate results (sorted by rank)
+    candidates = cons.get("candidates", [])
+    candidates_sorted = sorted(candidates, key=lambda x: x.get("mp_app_rank", 999))
 
-        for cons in constituencies:
-            cons_id = cons["cons_id"]
-            # Skip BKK_0 or similar aggregate entries with no real votes
-            if cons.get("turn_out", 0) == 0 and cons.get("valid_votes", 0) == 0:
-                continue
+    candidates_list = []
+    parties_list = []
+    for cand in candidates_sorted:
+        pid = cand["party_id"]
+        pinfo = party_map.get(pid, {"name": f"party_{pid}", "color": "#999"})
+        cand_id = cand.get("mp_app_id", "")
+        cand_info = candidate_map.get(cand_id, {})
+        cand_entry = {
+            "candidate_id": cand_id,
+            "name": cand_info.get("name", ""),
+            "number": cand_info.get("number", 0),
+            "party": pinfo["name"],
+            "party_color": pinfo["color"],
+            "ect_votes": cand.get("mp_app_vote", 0),
+            "vote62_votes": 0,
+            "percent": cand.get("mp_app_vote_percent", 0),
+            "rank": cand.get("mp_app_rank", 0),
+        }
+        candidates_list.append(cand_entry)
+        parties_list.append({
+            "name": pinfo["name"],
+            "color": pinfo["color"],
+            "candidate_id": cand_id,
+            "candidate_name": cand_info.get("name", ""),
+            "ect": cand.get("mp_app_vote", 0),
+            "vote62": 0,
+            "percent": cand.get("mp_app_vote_percent", 0),
+            "rank": cand.get("mp_app_rank", 0),
+        })
 
-            total_constituencies += 1
-            prov_unit_count += 1
+    ect_total = cons.get("valid_votes", 0)
+
+    return {
+        "unit_id": cons_id,
+        "constituency": f"{prov_name} เขต {cons_id.split('_')[1]}",
+        "province": prov_name,
+        "prov_id": prov_id,
+        "zone": zone,
+        "ect_total": ect_total,
+        "vote62_total": 0,
+        "difference": 0,
+        "level": "pending",
+        "turn_out": cons.get("turn_out", 0),
+        "percent_turn_out": cons.get("percent_turn_out", 0),
+        "valid_votes": ect_total,
+        "invalid_votes": cons.get("invalid_votes", 0),
+        "blank_votes": cons.get("blank_votes", 0),
+        "registered_vote": registered_vote,
+        "total_stations": total_stations,
+        "counted_stations": cons.get("counted_vote_stations", 0),
+        "percent_count": cons.get("percent_count", 0),
+        "pause_report": cons.get("pause_report", False),
+        "winner": parties_list[0]["name"] if parties_list else "",
+        "winner_votes": parties_list[0]["ect"] if parties_list else 0,
+        "winner_color": parties_list[0]["color"] if parties_list else "#999",
+        "has_discrepancy": False,
+        "note": "รอข้อมูล Vote62",
+        "candidates": candidates_list,
+        "parties": parties_list,
+    }
 
-            # Constituency static info (total stations, registered, zone)
-            cinfo = cons_map.get(cons_id, {})
-            total_stations = cinfo.get("total_vote_stations", 0)
-            registered_vote = cinfo.get("registered_vote", 0)
-            zone = cinfo.get("zone", [])
-
-            # Candidate results (sorted by rank)
-            candidates = cons.get("candidates", [])
-            candidates_sorted = sorted(candidates, key=lambda x: x.get("mp_app_rank", 999))
-
-            candidates_list = []
-            parties_list = []
-            for cand in candidates_sorted:
-                pid = cand["party_id"]
-                pinfo = party_map.get(pid, {"name": f"party_{pid}", "color": "#999"})
-                cand_id = cand.get("mp_app_id", "")
-                cand_info = candidate_map.get(cand_id, {})
-                cand_entry = {
-                    "candidate_id": cand_id,
-                    "name": cand_info.get("name", ""),
-                    "number": cand_info.get("number", 0),
-                    "party": pinfo["name"],
-                    "party_color": pinfo["color"],
-                    "ect_votes": cand.get("mp_app_vote", 0),
-                    "vote62_votes": 0,
-                    "percent": cand.get("mp_app_vote_percent", 0),
-                    "rank": cand.get("mp_app_rank", 0),
-                }
-                candidates_list.append(cand_entry)
-                parties_list.append({
-                    "name": pinfo["name"],
-                    "color": pinfo["color"],
-                    "candidate_id": cand_id,
-                    "candidate_name": cand_info.get("name", ""),
-                    "ect": cand.get("mp_app_vote", 0),
-                    "vote62": 0,
-                    "percent": cand.get("mp_app_vote_percent", 0),
-                    "rank": cand.get("mp_app_rank", 0),
-                })
-
-            ect_total = cons.get("valid_votes", 0)
-
-            unit_data = {
-                "unit_id": cons_id,
-                "constituency": f"{prov_name} เขต {cons_id.split('_')[1]}",
-                "province": prov_name,
-                "prov_id": prov_id,
-                "zone": zone,
-                "ect_total": ect_total,
-                "vote62_total": 0,
-                "difference": 0,
-                "level": "pending",
-                "turn_out": cons.get("turn_out", 0),
-                "percent_turn_out": cons.get("percent_turn_out", 0),
-                "valid_votes": ect_total,
-                "invalid_votes": cons.get("invalid_votes", 0),
-                "blank_votes": cons.get("blank_votes", 0),
-                "registered_vote": registered_vote,
-                "total_stations": total_stations,
-                "counted_stations": cons.get("counted_vote_stations", 0),
-                "percent_count": cons.get("percent_count", 0),
-                "pause_report": cons.get("pause_report", False),
-                "winner": parties_list[0]["name"] if parties_list else "",
-                "winner_votes": parties_list[0]["ect"] if parties_list else 0,
-                "winner_color": parties_list[0]["color"] if parties_list else "#999",
-                "has_discrepancy": False,
-                "note": "รอข้อมูล Vote62",
-                "candidates": candidates_list,
-                "parties": parties_list,
-            }
-            all_units.append(unit_data)
 
-        province_summary[prov_id] = {
-            "name": prov_name,
-            "prov_id": prov_id,
-            "units": prov_unit_count,
-            "compared": 0,
-            "critical": 0,
-            "turn_out": prov_turnout,
-            "valid_votes": prov_valid,
-            "counted_stations": prov_counted,
-            "total_stations": prov_total_stations,
-            "percent_count": prov_percent,
-            "top_parties": prov_top,
-        }
+def build_province_summary(prov, prov_name, unit_count, party_map):
+    """สรุประดับจังหวัด (รวม 5 พรรคที่ได้คะแนนเขตสูงสุด)"""
+    prov_parties = prov.get("result_party", [])
+    top_prov_parties = sorted(prov_parties, key=lambda x: x.get("party_cons_votes", 0), reverse=True)[:5]
+    prov_top = []
+    for pp in top_prov_parties:
+        pid = pp["party_id"]
+        pinfo = party_map.get(pid, {"name": f"party_{pid}", "color": "#999"})
+        prov_top.append({
+            "name": pinfo["name"],
+            "color": pinfo["color"],
+            "cons_votes": pp.get("party_cons_votes", 0),
+            "party_list_votes": pp.get("party_list_vote", 0),
+        })
+
+    return {
+        "name": prov_name,
+        "prov_id": prov["prov_id"],
+        "units": unit_count,
+        "compared": 0,
+        "critical": 0,
+        "turn_out": prov.get("turn_out", 0),
+        "valid_votes": prov.get("valid_votes", 0),
+        "counted_stations": prov.get("counted_vote_stations", 0),
+        "total_stations": prov.get("total_vote_stations", 0),
+        "percent_count": prov.get("percent_count", 0),
+        "top_parties": prov_top,
+    }
 
-    # National party summary (top 10)
-    national_parties = stats.get("result_province", [])
+
+def build_national_parties(provinces_result, party_map):
+    """National party summary (top 10)"""
     party_totals = {}
     for prov in provinces_result:
         for pp in prov.get("result_party", []):
@@ -248,8 +261,16 @@ def create_dashboard_data(stats, province_map, party_map, cons_map, candidate_ma
             "party_list_votes": totals["party_list_votes"],
             "first_mp_count": totals["first_mp"],
         })
+    return national_top
+
+
+def assemble_dashboard_data(stats, all_units, province_summary, national_top):
+    """ประกอบ election_data.json จากส่วนที่สร้างแล้ว"""
+    last_update = stats.get("last_update", datetime.now().isoformat())
+    percent_count = stats.get("percent_count", 0)
+    total_constituencies = len(all_units)
 
-    dashboard_data = {
+    return {
         "metadata": {
             "last_update": last_update,
             "total_units": total_constituencies,
@@ -260,10 +281,10 @@ def create_dashboard_data(stats, province_map, party_map, cons_map, candidate_ma
                 "vote62": "Waiting for data"
             },
             "national_stats": {
-                "turn_out": national_turnout,
-                "valid_votes": national_valid,
-                "invalid_votes": national_invalid,
-                "blank_votes": national_blank,
+                "turn_out": stats.get("turn_out", 0),
+                "valid_votes": stats.get("valid_votes", 0),
+                "invalid_votes": stats.get("invalid_votes", 0),
+                "blank_votes": stats.get("blank_votes", 0),
                 "percent_count": percent_count,
             },
             "note": "ข้อมูลจาก กกต. แบบ real-time | ยังไม่มีการเปรียบเทียบกับ Vote62"
@@ -295,32 +316,191 @@ def create_dashboard_data(stats, province_map, party_map, cons_map, candidate_ma
         ],
     }
 
-    return dashboard_data
 
+def create_dashboard_data(stats, province_map, party_map, cons_map, candidate_map):
+    """สร้างข้อมูล Dashboard จาก stats_cons.json"""
+    provinces_result = stats.get("result_province", [])
+
+    all_units = []
+    province_summary = {}
+
+    for prov in provinces_result:
+        prov_id = prov["prov_id"]
+        prov_name = province_map.get(prov_id, prov_id)
+        prov_unit_count = 0
+
+        for cons in prov.get("constituencies", []):
+            if is_empty_constituency(cons):
+                continue
+            prov_unit_count += 1
+            all_units.append(build_unit(cons, prov_id, prov_name, party_map, cons_map, candidate_map))
+
+        province_summary[prov_id] = build_province_summary(prov, prov_name, prov_unit_count, party_map)
+
+    national_top = build_national_parties(provinces_result, party_map)
+    return assemble_dashboard_data(stats, all_units, province_summary, national_top)
+
+
+# --- Incremental rebuild ---
+
+def fingerprint(obj):
+    """hash ของ JSON แบบ canonical (sort_keys) ใช้ตรวจว่า record เปลี่ยนหรือไม่"""
+    raw = json.dumps(obj, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def refs_fingerprint(province_map, party_map, cons_map, candidate_map):
+    """hash ของ lookup maps ทั้งหมด — ถ้าเปลี่ยนต้อง rebuild ทุกเขต"""
+    return fingerprint([
+        sorted(province_map.items()),
+        sorted((str(k), v) for k, v in party_map.items()),
+        sorted(cons_map.items()),
+        sorted(candidate_map.items()),
+    ])
+
+
+def province_fingerprint(prov):
+    """hash ของ record จังหวัดโดยไม่รวมรายการเขต"""
+    return fingerprint({k: v for k, v in prov.items() if k != "constituencies"})
+
+
+def load_dashboard_state(path=STATE_PATH):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_dashboard_state(state, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
 
-def save_json(data, filename):
-    """บันทึก JSON"""
+
+def create_dashboard_data_incremental(stats, province_map, party_map, cons_map, candidate_map,
+                                      previous=None, state=None):
+    """
+    สร้างข้อมูล Dashboard โดยใช้ผลรอบก่อนซ้ำสำหรับเขตที่ไม่เปลี่ยน
+
+    previous: election_data.json รอบก่อน (ผ่านการตรวจ sha256 แล้ว), state: fingerprints รอบก่อน
+    คืน (dashboard_data, new_state, dirty_unit_ids) — ผลลัพธ์เท่ากับ create_dashboard_data ทุกประการ
+    """
+    refs = refs_fingerprint(province_map, party_map, cons_map, candidate_map)
+    reusable = bool(previous and state and state.get("refs") == refs)
+    prev_units = {u["unit_id"]: u for u in previous["units"]} if reusable else {}
+    prev_provinces = previous["provinces"] if reusable else {}
+    prev_unit_fp = state.get("units", {}) if reusable else {}
+    prev_prov_fp = state.get("provinces", {}) if reusable else {}
+
+    provinces_result = stats.get("result_province", [])
+    new_state = {"refs": refs, "units": {}, "provinces": {}}
+    all_units = []
+    province_summary = {}
+    dirty_units = []
+    dirty_provinces = 0
+
+    for prov in provinces_result:
+        prov_id = prov["prov_id"]
+        prov_name = province_map.get(prov_id, prov_id)
+        prov_unit_count = 0
+        prov_dirty = False
+
+        for cons in prov.get("constituencies", []):
+            cons_id = cons["cons_id"]
+            fp = fingerprint(cons)
+            new_state["units"][cons_id] = fp
+            if is_empty_constituency(cons):
+                prov_dirty |= cons_id in prev_units
+                continue
+            prov_unit_count += 1
+            unit = prev_units.get(cons_id) if prev_unit_fp.get(cons_id) == fp else None
+            if unit is None:
+                unit = build_unit(cons, prov_id, prov_name, party_map, cons_map, candidate_map)
+                dirty_units.append(cons_id)
+                prov_dirty = True
+            all_units.append(unit)
+
+        prov_fp = province_fingerprint(prov)
+        new_state["provinces"][prov_id] = prov_fp
+        prev_summary = prev_provinces.get(prov_id)
+        if prov_dirty or prev_summary is None or prev_prov_fp.get(prov_id) != prov_fp \
+                or prev_summary.get("units") != prov_unit_count:
+            province_summary[prov_id] = build_province_summary(prov, prov_name, prov_unit_count, party_map)
+            dirty_provinces += 1
+        else:
+            province_summary[prov_id] = prev_summary
+
+    # ผลรวมระดับประเทศคำนวณจาก result_party ของจังหวัด — ใช้ของเดิมถ้าไม่มีจังหวัดใดเปลี่ยน
+    if dirty_provinces or not reusable or len(province_summary) != len(prev_provinces):
+        national_top = build_national_parties(provinces_result, party_map)
+    else:
+        national_top = previous["national_parties"]
+
+    data = assemble_dashboard_data(stats, all_units, province_summary, national_top)
+    return data, new_state, dirty_units
+
+
+def save_json(data, filename, columnar=False):
+    """บันทึก JSON (columnar=True เขียนไฟล์ .ecol + .gz/.br สำหรับหน้าเว็บไว้ข้างกันด้วย)"""
     filepath = os.path.join(DATA_DIR, filename)
     os.makedirs(DATA_DIR, exist_ok=True)
     with open(filepath, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
     print(f"  ✅ บันทึก: {filepath}")
+    if columnar:
+        for path, size in columnar_store.save(data, columnar_store.columnar_path(filepath)).items():
+            print(f"  ✅ บันทึก: {path} ({size / 1024:.1f} KB)")
     return filepath
 
 
-def main():
-    """ฟังก์ชันหลัก"""
+def file_sha256(path):
+    """sha256 ของไฟล์ (hex)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_previous_dashboard(expected_sha256, filename="election_data.json"):
+    """
+    โหลด election_data.json รอบก่อน (ถ้ามี)
+
+    คืน None ถ้า sha256 ของไฟล์ไม่ตรงกับที่บันทึกใน dashboard_state (ไฟล์ถูกแก้/เขียนไม่จบ/ไม่ใช่ของรอบนั้น)
+    ผู้เรียกจะสร้างใหม่ทั้งหมดแทน
+    """
+    path = os.path.join(DATA_DIR, filename)
+    try:
+        if expected_sha256 is None or file_sha256(path) != expected_sha256:
+            if os.path.exists(path):
+                print(f"  ⚠️  {filename} ไม่ตรงกับ dashboard_state — สร้างใหม่ทั้งหมด")
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def main(incremental=False, shard=False, history=False):
+    """ฟังก์ชันหลัก
+
+    incremental: ใช้ผลรอบก่อนซ้ำสำหรับเขตที่ข้อมูลใน stats_cons ไม่เปลี่ยน
+    shard: เขียน data/shards/election/ (manifest + ไฟล์รายจังหวัด) เพิ่มด้วย
+    history: บันทึก stats_cons ลงประวัติ (snapshot_store) ด้วย
+    """
     print("=" * 60)
     print(" สร้างข้อมูล Dashboard จาก ECT API (ข้อมูลจริง)")
     print("=" * 60)
 
     # 1. ดึงข้อมูลจาก API
     print("\n[1/4] ดึงข้อมูลจาก ECT API...")
-    stats = fetch_json(STATS_URL, "ผลคะแนน (stats_cons)")
-    provinces = fetch_json(PROVINCE_URL, "ข้อมูลจังหวัด")
-    parties = fetch_json(PARTY_URL, "ข้อมูลพรรค")
-    constituencies = fetch_json(CONSTITUENCY_URL, "ข้อมูลเขตเลือกตั้ง")
-    candidates = fetch_json(CANDIDATE_URL, "ข้อมูลผู้สมัคร")
+    fetched = fetch_all_json()
+    stats = fetched["stats"]
+    provinces = fetched["provinces"]
+    parties = fetched["parties"]
+    constituencies = fetched["constituencies"]
+    candidates = fetched["candidates"]
 
     if not stats or not provinces or not parties:
         print("\n❌ ไม่สามารถดึงข้อมูลได้ครบ กรุณาตรวจสอบการเชื่อมต่ออินเทอร์เน็ต")
@@ -339,7 +519,12 @@ def main():
 
     # 3. สร้าง dashboard data
     print("\n[3/4] สร้างข้อมูล Dashboard...")
-    dashboard_data = create_dashboard_data(stats, province_map, party_map, cons_map, candidate_map)
+    state = load_dashboard_state() if incremental else None
+    previous = load_previous_dashboard(state.get("output_sha256")) if state else None
+    dashboard_data, new_state, dirty = create_dashboard_data_incremental(
+        stats, province_map, party_map, cons_map, candidate_map, previous, state)
+    if incremental:
+        print(f"  incremental: สร้างใหม่ {len(dirty)} เขต, ใช้ของเดิม {len(dashboard_data['units']) - len(dirty)} เขต")
 
     total_units = dashboard_data["metadata"]["total_units"]
     total_provs = len(dashboard_data["provinces"])
@@ -348,8 +533,22 @@ def main():
 
     # 4. บันทึก
     print("\n[4/4] บันทึกไฟล์...")
-    save_json(dashboard_data, "election_data.json")
+    dashboard_path = save_json(dashboard_data, "election_data.json", columnar=True)
     save_json(stats, "ect_stats_raw.json")
+    new_state["output_sha256"] = file_sha256(dashboard_path)
+    save_dashboard_state(new_state)
+    if history:
+        with SnapshotStore() as store:
+            snapshot_id = store.add(stats)
+        if snapshot_id is None:
+            print(f"  ✅ ประวัติ: stats_cons เหมือนรอบก่อน ไม่ต้องบันทึก")
+        else:
+            print(f"  ✅ ประวัติ: snapshot #{snapshot_id} ({store.path})")
+    if shard:
+        shard_dir = os.path.join(DATA_DIR, "shards", "election")
+        manifest, written = sharding.write_shards(dashboard_data, shard_dir, sharding.ELECTION_SHARD_PATHS,
+                                                  sharding.ELECTION_SUMMARY_PATHS)
+        print(f"  ✅ บันทึก: {shard_dir} ({len(manifest['shards'])} จังหวัด, เขียนใหม่ {written})")
 
     # สรุป
     print("\n" + "=" * 60)
@@ -369,6 +568,7 @@ def main():
 
     print(f"\n📁 ไฟล์ที่สร้าง:")
     print(f"  - data/election_data.json")
+    print(f"  - data/election_data.ecol (+ .gz)")
     print(f"  - data/ect_stats_raw.json")
     print(f"\nขั้นตอนต่อไป:")
     print(f"  git add -A")
@@ -378,4 +578,13 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description="สร้างข้อมูล Dashboard จาก ECT API")
+    parser.add_argument("--incremental", action="store_true",
+                        help="สร้างใหม่เฉพาะเขตที่เปลี่ยนตั้งแต่รอบก่อน")
+    parser.add_argument("--shard", action="store_true",
+                        help="เขียนไฟล์แยกรายจังหวัด + manifest ใน data/shards/election/")
+    parser.add_argument("--history", action="store_true",
+                        help="บันทึก stats_cons ลงประวัติ .cache/ect_history.sqlite (keyframe + delta)")
+    args = parser.parse_args()
+    main(incremental=args.incremental, shard=args.shard, history=args.history)
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Columnar anomaly engine สำหรับ analyze_anomalies.py
+โหลด election_data.json ครั้งเดียวเป็น NumPy arrays แล้วคำนวณ
+อัตรา, z-score, IQR fence และ flag ของทุกตัวชี้วัดในรอบเดียว
+"""
+
+import json
+import math
+
+import numpy as np
+
+from rate_stats import RateAccumulator, scaled_moments
+
+
+# คอลัมน์ตัวเลขจำนวนเต็มของแต่ละหน่วย: name -> (key, default)
+INT_FIELDS = {
+    'turn_out': ('turn_out', None),
+    'valid_votes': ('valid_votes', None),
+    'invalid_votes': ('invalid_votes', None),
+    'blank_votes': ('blank_votes', None),
+    'registered_vote': ('registered_vote', None),
+    'winner_votes': ('winner_votes', None),
+    'total_stations': ('total_stations', 0),
+    'counted_stations': ('counted_stations', 0),
+}
+
+# คอลัมน์ตัวเลขที่อาจเป็น int หรือ float ใน JSON (ต้องรักษาชนิดเดิมไว้ตอนเขียนกลับ)
+NUMBER_FIELDS = {
+    'percent_turn_out': ('percent_turn_out', None),
+    'percent_count': ('percent_count', 0),
+}
+
+STRING_FIELDS = ('unit_id', 'constituency', 'province', 'prov_id', 'winner', 'winner_color')
+
+
+def round_half_even(values, ndigits=2):
+    """
+    round() แบบเดียวกับ Python built-in แต่ทำทั้ง array
+
+    np.round คูณ 10**ndigits ก่อนปัด จึงอาจต่างจาก round() ของ Python
+    เฉพาะค่าที่อยู่ใกล้ .5 มาก — ค่าเหล่านั้นจะถูกปัดด้วย round() ทีละตัว
+    """
+    values = np.asarray(values, dtype=np.float64)
+    scale = 10.0 ** ndigits
+    scaled = values * scale
+    out = np.rint(scaled) / scale
+    near_tie = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    if near_tie.any():
+        out[near_tie] = [round(v, ndigits) for v in values[near_tie].tolist()]
+    return out
+
+
+def to_python(values, int_mask=None):
+    """แปลง array เป็น list ของ Python numbers โดยคืนค่าที่เดิมเป็น int ให้เป็น int"""
+    out = values.tolist()
+    if int_mask is not None and int_mask.any():
+        for i in np.flatnonzero(int_mask).tolist():
+            out[i] = int(out[i])
+    return out
+
+
+def hundredths(values):
+    """อัตราที่ปัด 2 ตำแหน่งแล้ว -> จำนวนเต็มหน่วย 0.01"""
+    return np.rint(np.asarray(values, dtype=np.float64) * 100).astype(np.int64)
+
+
+class UnitColumns:
+    """
+    ข้อมูลหน่วยเลือกตั้งแบบ columnar
+
+    - ตัวเลข: int64 / float64 arrays (ตัวเลขที่อาจเป็น int มี mask `<name>_is_int`)
+    - ข้อความ: dictionary-encoded (int32 codes + self.strings)
+    - ผู้สมัคร: ตารางแบน (cand_*) พร้อม offsets `cand_ptr` แบบ CSR
+    """
+
+    def __init__(self, arrays, strings):
+        self.arrays = arrays
+        self.strings = strings
+        self.string_index = {s: i for i, s in enumerate(strings)}
+        self.n = len(arrays['turn_out'])
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__['arrays'][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __len__(self):
+        return self.n
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_units(json.load(f)['units'])
+
+    @classmethod
+    def from_units(cls, units):
+        """สร้างจาก list ของ unit dicts (รูปแบบ election_data.json)"""
+        strings = []
+        index = {}
+
+        def code(s):
+            c = index.get(s)
+            if c is None:
+                c = index[s] = len(strings)
+                strings.append(s)
+            return c
+
+        arrays = {}
+        for name, (key, default) in INT_FIELDS.items():
+            if default is None:
+                raw = [u[key] for u in units]
+            else:
+                raw = [u.get(key, default) for u in units]
+            arrays[name] = np.array([v or 0 for v in raw], dtype=np.int64)
+
+        for name, (key, default) in NUMBER_FIELDS.items():
+            if default is None:
+                raw = [u[key] for u in units]
+            else:
+                raw = [u.get(key, default) for u in units]
+            arrays[name] = np.array(raw, dtype=np.float64)
+            arrays[name + '_is_int'] = np.array([isinstance(v, int) for v in raw], dtype=bool)
+
+        for name in STRING_FIELDS:
+            arrays[name] = np.array([code(u[name]) for u in units], dtype=np.int32)
+
+        arrays['pause_report'] = np.array([bool(u.get('pause_report', False)) for u in units], dtype=bool)
+
+        cand_ptr = [0]
+        cand_votes = []
+        cand_party = []
+        cand_name = []
+        for u in units:
+            for c in u.get('candidates', []):
+                cand_votes.append(c.get('ect_votes', 0))
+                cand_party.append(code(c.get('party', '')))
+                cand_name.append(code(c.get('name', '')))
+            cand_ptr.append(len(cand_votes))
+        arrays['cand_ptr'] = np.array(cand_ptr, dtype=np.int64)
+        arrays['cand_votes'] = np.array(cand_votes, dtype=np.int64)
+        arrays['cand_party'] = np.array(cand_party, dtype=np.int32)
+        arrays['cand_name'] = np.array(cand_name, dtype=np.int32)
+
+        cols = cls(arrays, strings)
+        cols._derive_candidate_columns()
+        return cols
+
+    def _derive_candidate_columns(self):
+        """คอลัมน์ต่อหน่วยจากตารางผู้สมัคร: จำนวน, ผลรวม, อันดับ 1 และ 2 (ตามลำดับใน list)"""
+        ptr = self.cand_ptr
+        votes = self.cand_votes
+        start = ptr[:-1]
+        n_cands = np.diff(ptr)
+        csum = np.concatenate(([0], np.cumsum(votes)))
+        self.arrays['n_cands'] = n_cands
+        self.arrays['cand_sum'] = csum[ptr[1:]] - csum[start]
+
+        empty = self.code('')
+        for rank, prefix in ((0, 'top1'), (1, 'top2')):
+            has = n_cands > rank
+            pos = np.where(has, start + rank, 0)
+            if len(votes):
+                self.arrays[prefix + '_votes'] = np.where(has, votes[pos], 0)
+                self.arrays[prefix + '_party'] = np.where(has, self.cand_party[pos], empty).astype(np.int32)
+                self.arrays[prefix + '_name'] = np.where(has, self.cand_name[pos], empty).astype(np.int32)
+            else:
+                self.arrays[prefix + '_votes'] = np.zeros(self.n, dtype=np.int64)
+                self.arrays[prefix + '_party'] = np.full(self.n, empty, dtype=np.int32)
+                self.arrays[prefix + '_name'] = np.full(self.n, empty, dtype=np.int32)
+
+    def set_rows(self, positions, units):
+        """เขียนทับหน่วยที่ตำแหน่ง positions (ไม่ซ้ำกัน) ด้วย unit dicts ใหม่ตามลำดับ"""
+        positions = np.asarray(positions, dtype=np.int64)
+        fresh = UnitColumns.from_units(units)
+        remap = np.array([self.code(s) for s in fresh.strings], dtype=np.int32)
+
+        for name in list(INT_FIELDS) + list(NUMBER_FIELDS) + [f + '_is_int' for f in NUMBER_FIELDS] + ['pause_report']:
+            self.arrays[name][positions] = fresh.arrays[name]
+        for name in STRING_FIELDS:
+            self.arrays[name][positions] = remap[fresh.arrays[name]]
+
+        # ต่อตารางผู้สมัครใหม่: แถวของหน่วยที่ไม่เปลี่ยนย้ายตาม offset ใหม่, หน่วยที่เปลี่ยนใช้แถวจาก fresh
+        old_ptr = self.cand_ptr
+        counts = np.diff(old_ptr)
+        old_counts = counts.copy()
+        counts[positions] = np.diff(fresh.cand_ptr)
+        new_ptr = np.concatenate(([0], np.cumsum(counts)))
+        owner = np.repeat(np.arange(self.n), old_counts)
+        keep = np.ones(self.n, dtype=bool)
+        keep[positions] = False
+        kept_rows = np.flatnonzero(keep[owner])
+        kept_dest = new_ptr[owner[kept_rows]] + (kept_rows - old_ptr[owner[kept_rows]])
+        fresh_owner = np.repeat(np.arange(len(positions)), np.diff(fresh.cand_ptr))
+        fresh_rows = np.arange(len(fresh_owner))
+        fresh_dest = new_ptr[positions[fresh_owner]] + (fresh_rows - fresh.cand_ptr[fresh_owner])
+
+        total = int(new_ptr[-1])
+        for name, source in (('cand_votes', fresh.cand_votes),
+                             ('cand_party', remap[fresh.cand_party]),
+                             ('cand_name', remap[fresh.cand_name])):
+            out = np.empty(total, dtype=self.arrays[name].dtype)
+            out[kept_dest] = self.arrays[name][kept_rows]
+            out[fresh_dest] = source
+            self.arrays[name] = out
+        self.arrays['cand_ptr'] = new_ptr
+        self._derive_candidate_columns()
+
+    def code(self, s):
+        """รหัสของข้อความ (เพิ่มเข้า string table ถ้ายังไม่มี)"""
+        c = self.string_index.get(s)
+        if c is None:
+            c = self.string_index[s] = len(self.strings)
+            self.strings.append(s)
+        return c
+
+    def text(self, name, idx=None):
+        """คืนค่าคอลัมน์ข้อความเป็น list ของ str"""
+        codes = self.arrays[name] if idx is None else self.arrays[name][idx]
+        labels = self.__dict__.get('_labels')
+        if labels is None or len(labels) != len(self.strings):
+            labels = self._labels = np.array(self.strings, dtype=object)
+        return labels[codes].tolist()
+
+    def number(self, name, idx=None):
+        """คืนค่าคอลัมน์ตัวเลข (int/float ตามต้นฉบับ) เป็น list"""
+        values = self.arrays[name]
+        mask = self.arrays.get(name + '_is_int')
+        if idx is not None:
+            values = values[idx]
+            mask = mask[idx] if mask is not None else None
+        return to_python(values, mask)
+
+
+# attribute ของ RateColumn ที่ analyzer อ่าน (ส่งข้าม process ได้โดยไม่ต้องคำนวณใหม่)
+RATE_STATE = ('index', 'values', 'int_mask', 'count', 'sorted', 'mean', 'stdev', 'q1', 'median', 'q3',
+              'iqr', 'lower_fence', 'upper_fence', 'z', 'z_is_int', 'below', 'above')
+
+
+class RateColumn:
+    """
+    อัตราหนึ่งตัวชี้วัด (ปัดทศนิยม 2 ตำแหน่งแล้ว) พร้อมสถิติสรุป
+
+    index: ตำแหน่งของหน่วยที่เข้าเงื่อนไข (เรียงตามลำดับหน่วยเดิม)
+    """
+
+    def __init__(self, index, values, int_mask=None):
+        self.index = index
+        self.values = values
+        self.int_mask = int_mask
+        self.count = len(values)
+
+        # accumulator ให้เฉพาะค่าที่เรียงแล้ว / quantile; mean/stdev มาจาก scaled_moments เท่านั้น
+        # (ผลรวมจำนวนเต็มหน่วย 0.01 ตรงกับ IncrementalRate ทุก bit)
+        acc = RateAccumulator(moments=False).update(values)
+        self.sorted = acc.sorted_values()
+        h = hundredths(values)
+        self.mean, self.stdev = scaled_moments(self.count, int(h.sum()), int((h * h).sum()))
+        ps = (0.25, 0.50, 0.75)
+        self.q1, self.median, self.q3 = [self._source_type(p, q) for p, q in zip(ps, acc.quantiles(ps))]
+        self.iqr = self.q3 - self.q1
+        self.lower_fence = self.q1 - 1.5 * self.iqr
+        self.upper_fence = self.q3 + 1.5 * self.iqr
+
+        if self.stdev > 0:
+            self.z = round_half_even((values - self.mean) / self.stdev)
+            self.z_is_int = None
+        else:
+            self.z = np.zeros(self.count)
+            self.z_is_int = np.ones(self.count, dtype=bool)
+        self.below = values < self.lower_fence
+        self.above = values > self.upper_fence
+
+    def _source_type(self, p, q):
+        """quantile ที่ตกบนค่าจริงพอดี คืนเป็น int ถ้าค่านั้นเดิมเป็น int (ลำดับแบบ stable sort)"""
+        k = (self.count - 1) * p
+        if self.int_mask is None or k != math.floor(k):
+            return q
+        ties = np.flatnonzero(self.values == q)
+        first = int(np.searchsorted(self.sorted, q, side='left'))
+        return int(q) if self.int_mask[ties[int(k) - first]] else q
+
+    def state(self):
+        """ผลที่คำนวณแล้วทั้งหมด (array + ค่าเดี่ยว) — สร้าง RateColumn เดิมกลับได้ด้วย from_state"""
+        return {key: getattr(self, key) for key in RATE_STATE}
+
+    @classmethod
+    def from_state(cls, state):
+        """RateColumn จากผลที่คำนวณไว้แล้ว (ไม่คำนวณสถิติใหม่)"""
+        rate = cls.__new__(cls)
+        rate.__dict__.update(state)
+        return rate
+
+    def pyvalues(self):
+        return to_python(self.values, self.int_mask)
+
+    def pyz(self):
+        return to_python(self.z, self.z_is_int)
+
+
+RATE_NAMES = ('turnout', 'invalid', 'blank', 'wasted', 'winner')
+
+
+class AnomalyEngine:
+    """คำนวณอัตราทุกตัวชี้วัดจาก UnitColumns ครั้งเดียว แล้วให้ analyzer แต่ละตัวอ่านผล"""
+
+    def __init__(self, cols):
+        self.cols = cols
+        for name in RATE_NAMES:
+            setattr(self, name, self._build_rate(name))
+        self._derive_winner_margin()
+
+    def state(self):
+        """ผลที่คำนวณแล้วของทุกอัตรา (ไม่รวม cols) สำหรับ from_state"""
+        return {
+            'rates': {name: getattr(self, name).state() for name in RATE_NAMES},
+            'winner_margin': self.winner_margin,
+            'winner_margin_is_int': self.winner_margin_is_int,
+        }
+
+    @classmethod
+    def from_state(cls, cols, state):
+        """AnomalyEngine บน cols จากผลของ engine อื่น (เช่น IncrementalAnomalyEngine) โดยไม่คำนวณใหม่"""
+        engine = cls.__new__(cls)
+        engine.cols = cols
+        for name in RATE_NAMES:
+            setattr(engine, name, RateColumn.from_state(state['rates'][name]))
+        engine.winner_margin = state['winner_margin']
+        engine.winner_margin_is_int = state['winner_margin_is_int']
+        return engine
+
+    def _build_rate(self, name):
+        eligible, values, int_mask = self.rate_values(name)
+        idx = np.flatnonzero(eligible)
+        return RateColumn(idx, values[idx], int_mask[idx] if int_mask is not None else None)
+
+    def rate_values(self, name, pos=None):
+        """
+        (eligible, values, int_mask) ของอัตรา `name` สำหรับหน่วยที่ตำแหน่ง pos (None = ทุกหน่วย)
+
+        values ของหน่วยที่ไม่เข้าเงื่อนไขไม่มีความหมาย; int_mask เป็น None ถ้าอัตรานั้นเป็น float เสมอ
+        """
+        c = self.cols
+
+        def col(key):
+            return c.arrays[key] if pos is None else c.arrays[key][pos]
+
+        turn_out = col('turn_out')
+        has_turnout = turn_out > 0
+        den = np.where(has_turnout, turn_out, 1)
+
+        if name == 'turnout':
+            # ใช้ percent_turn_out ของ กกต. (รักษาชนิด int/float เดิม)
+            pct = col('percent_turn_out')
+            is_int = col('percent_turn_out_is_int')
+            return (has_turnout & (col('registered_vote') > 0),
+                    np.where(is_int, pct, round_half_even(pct)), is_int)
+        if name == 'invalid':
+            return has_turnout, round_half_even(col('invalid_votes') / den * 100), None
+        if name == 'blank':
+            return has_turnout, round_half_even(col('blank_votes') / den * 100), None
+        if name == 'wasted':
+            return has_turnout, round_half_even((col('invalid_votes') + col('blank_votes')) / den * 100), None
+        if name == 'winner':
+            valid = col('valid_votes')
+            eligible = (valid > 0) & (col('winner_votes') > 0)
+            return eligible, round_half_even(col('winner_votes') / np.where(eligible, valid, 1) * 100), None
+        raise KeyError(name)
+
+    def _derive_winner_margin(self):
+        c = self.cols
+        idx = self.winner.index
+        valid = c.valid_votes[idx]
+        has_runner_up = c.n_cands[idx] >= 2
+        margin = (c.winner_votes[idx] - c.top2_votes[idx]) / valid * 100
+        self.winner_margin = np.where(has_runner_up, round_half_even(margin), 0.0)
+        self.winner_margin_is_int = ~has_runner_up
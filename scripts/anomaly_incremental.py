@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+คำนวณ anomaly แบบ incremental เมื่อมีเพียงบางหน่วยเปลี่ยน
+
+  - เก็บ sufficient statistics (count, Σh, Σh² แบบ int) และ index ที่เรียงแล้วของแต่ละอัตรา
+  - หน่วยที่เปลี่ยน: ลบ key เดิม / แทรก key ใหม่ใน index (searchsorted) ไม่ต้องเรียงใหม่ทั้งหมด
+  - flag ประเมินใหม่เฉพาะหน่วยที่เปลี่ยน และหน่วยที่ค่าอยู่ระหว่าง fence เก่ากับ fence ใหม่
+  - ผลลัพธ์ตรงกับการคำนวณใหม่ทั้งหมด (AnomalyEngine) ทุกค่า
+"""
+
+import hashlib
+import json
+import os
+import pickle
+
+import numpy as np
+
+from anomaly_engine import RATE_NAMES, AnomalyEngine, RateColumn, UnitColumns, hundredths, round_half_even
+from rate_stats import interpolated_quantiles, scaled_moments
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = os.path.join(SCRIPT_DIR, '..', '.cache', 'anomaly_state.pkl')
+
+
+def unit_fingerprint(unit):
+    """hash ของ unit dict แบบ canonical (sort_keys)"""
+    raw = json.dumps(unit, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class IncrementalRate(RateColumn):
+    """
+    RateColumn ที่ปรับปรุงได้ทีละหน่วย
+
+    keys: int64 ที่เรียงแล้ว = h * (n + 1) + ตำแหน่งหน่วย (h = อัตรา × 100)
+    จึงเรียงตามค่าแล้วตามลำดับหน่วยเดิม — เหมือน stable sort ของ RateColumn
+    """
+
+    def __init__(self, eligible, values, int_mask=None):
+        self.n = len(eligible)
+        self.eligible = eligible.copy()
+        self.value_full = values.copy()
+        self.int_full = int_mask.copy() if int_mask is not None else None
+        self.h_full = hundredths(values)
+        self.below_full = np.zeros(self.n, dtype=bool)
+        self.above_full = np.zeros(self.n, dtype=bool)
+        self.lower_fence = self.upper_fence = None
+
+        pos = np.flatnonzero(eligible)
+        h = self.h_full[pos]
+        self.keys = np.sort(h * (self.n + 1) + pos)
+        self.total = int(h.sum())
+        self.total_sq = int((h * h).sum())
+        self._refresh(pos)
+
+    def update(self, positions, eligible, values, int_mask=None):
+        """แทนค่าของหน่วยที่ positions ด้วยค่าใหม่ (eligible/values/int_mask เรียงตาม positions)"""
+        positions = np.asarray(positions, dtype=np.int64)
+        m = self.n + 1
+
+        old = positions[self.eligible[positions]]
+        if len(old):
+            h = self.h_full[old]
+            self.keys = np.delete(self.keys, np.searchsorted(self.keys, h * m + old))
+            self.total -= int(h.sum())
+            self.total_sq -= int((h * h).sum())
+
+        self.eligible[positions] = eligible
+        self.value_full[positions] = values
+        self.h_full[positions] = hundredths(values)
+        if self.int_full is not None:
+            self.int_full[positions] = int_mask
+
+        new = positions[eligible]
+        if len(new):
+            h = self.h_full[new]
+            new_keys = np.sort(h * m + new)
+            self.keys = np.insert(self.keys, np.searchsorted(self.keys, new_keys), new_keys)
+            self.total += int(h.sum())
+            self.total_sq += int((h * h).sum())
+
+        self._refresh(positions)
+
+    def _refresh(self, changed):
+        m = self.n + 1
+        self.index = np.flatnonzero(self.eligible)
+        self.values = self.value_full[self.index]
+        self.int_mask = self.int_full[self.index] if self.int_full is not None else None
+        self.count = len(self.keys)
+        self.sorted = (self.keys // m) / 100
+        order = self.keys % m
+
+        self.mean, self.stdev = scaled_moments(self.count, self.total, self.total_sq)
+        ps = (0.25, 0.50, 0.75)
+        self.q1, self.median, self.q3 = [
+            self._source_type(p, q) for p, q in zip(ps, interpolated_quantiles(self.sorted, ps))]
+        self.iqr = self.q3 - self.q1
+        old_fences = (self.lower_fence, self.upper_fence)
+        self.lower_fence = self.q1 - 1.5 * self.iqr
+        self.upper_fence = self.q3 + 1.5 * self.iqr
+
+        # หน่วยที่ flag อาจเปลี่ยน: หน่วยที่เปลี่ยนค่า + หน่วยที่ค่าอยู่ระหว่าง fence เก่ากับใหม่
+        if old_fences[0] is None:
+            recheck = self.index
+        else:
+            parts = [changed[self.eligible[changed]]]
+            for before, after in zip(old_fences, (self.lower_fence, self.upper_fence)):
+                lo = np.searchsorted(self.sorted, min(before, after), side='left')
+                hi = np.searchsorted(self.sorted, max(before, after), side='right')
+                parts.append(order[lo:hi])
+            recheck = np.concatenate(parts)
+            gone = changed[~self.eligible[changed]]
+            self.below_full[gone] = False
+            self.above_full[gone] = False
+        v = self.value_full[recheck]
+        self.below_full[recheck] = v < self.lower_fence
+        self.above_full[recheck] = v > self.upper_fence
+        self.below = self.below_full[self.index]
+        self.above = self.above_full[self.index]
+
+        # z ขึ้นกับ mean/stdev ที่เปลี่ยนทุกครั้ง จึงคำนวณใหม่ทั้งคอลัมน์ (vectorized)
+        if self.stdev > 0:
+            self.z = round_half_even((self.values - self.mean) / self.stdev)
+            self.z_is_int = None
+        else:
+            self.z = np.zeros(self.count)
+            self.z_is_int = np.ones(self.count, dtype=bool)
+
+
+class IncrementalAnomalyEngine(AnomalyEngine):
+    """
+    AnomalyEngine ที่รับหน่วยที่เปลี่ยนแล้วปรับเฉพาะส่วนที่เกี่ยวข้อง
+
+    >>> engine = IncrementalAnomalyEngine.from_units(units)
+    >>> engine.apply([12, 40], [unit_12, unit_40])   # หรือ engine.sync(units_ใหม่ทั้งหมด)
+    >>> analyze_turnout(engine)
+    """
+
+    def __init__(self, cols, unit_ids=None, fingerprints=None):
+        super().__init__(cols)
+        self.unit_ids = unit_ids or []
+        self.fingerprints = fingerprints or []
+
+    @classmethod
+    def from_units(cls, units):
+        return cls(UnitColumns.from_units(units),
+                   [u['unit_id'] for u in units],
+                   [unit_fingerprint(u) for u in units])
+
+    def _build_rate(self, name):
+        return IncrementalRate(*self.rate_values(name))
+
+    def apply(self, positions, units):
+        """เขียนทับหน่วยที่ตำแหน่ง positions แล้วปรับทุกอัตรา"""
+        positions = np.asarray(positions, dtype=np.int64)
+        if len(positions) == 0:
+            return
+        self.cols.set_rows(positions, units)
+        for name in RATE_NAMES:
+            getattr(self, name).update(positions, *self.rate_values(name, positions))
+        self._derive_winner_margin()
+
+    def sync(self, units):
+        """
+        เทียบ units ชุดใหม่กับรอบก่อนด้วย fingerprint แล้ว apply เฉพาะหน่วยที่เปลี่ยน
+        คืนตำแหน่งที่เปลี่ยน หรือ None ถ้าชุดหน่วย (unit_id/ลำดับ) ไม่ตรง ต้องสร้างใหม่ทั้งหมด
+        """
+        if [u['unit_id'] for u in units] != self.unit_ids:
+            return None
+        prints = [unit_fingerprint(u) for u in units]
+        changed = [i for i, (a, b) in enumerate(zip(prints, self.fingerprints)) if a != b]
+        self.apply(changed, [units[i] for i in changed])
+        self.fingerprints = prints
+        return changed
+
+    def save(self, path=STATE_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.tmp{os.getpid()}'
+        with open(tmp, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+
+def load_engine(units, path=STATE_PATH):
+    """
+    engine สำหรับ units: ใช้ state รอบก่อนแล้ว sync ถ้าได้ ไม่เช่นนั้นสร้างใหม่
+    คืน (engine, changed) — changed เป็น None เมื่อคำนวณใหม่ทั้งหมด
+    """
+    try:
+        with open(path, 'rb') as f:
+            engine = pickle.load(f)
+    except (OSError, EOFError, AttributeError, ImportError, pickle.UnpicklingError):
+        engine = None
+    if isinstance(engine, IncrementalAnomalyEngine):
+        changed = engine.sync(units)
+        if changed is not None:
+            return engine, changed
+    return IncrementalAnomalyEngine.from_units(units), None
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+รัน analyzer หลายตัวบน AnomalyEngine เดียวกันแบบขนาน (process pool)
+
+  - แต่ละ analyzer ลงทะเบียนเป็น Task พร้อมคอลัมน์ของ UnitColumns ที่อ่าน (inputs)
+  - คอลัมน์ที่ task ต้องใช้ และอัตราที่ engine คำนวณแล้ว (ค่า, sorted, z, flag) ถูกคัดลอกลง
+    multiprocessing.shared_memory block เดียว ค่าเดี่ยว (mean/stdev/quartile/fence) ไปกับ spec
+  - worker สร้าง AnomalyEngine.from_state บน view (อ่านอย่างเดียว) ของ block นั้น — ไม่คำนวณใหม่
+    และไม่ pickle arrays จึงได้ผลเดียวกับ engine ต้นทางเสมอ (รวมถึง IncrementalAnomalyEngine)
+  - คืนผลของทุก task + เวลาที่ใช้ (wall time) ต่อ task
+
+workers <= 1 รันเรียงกันใน process เดิม (ใช้ engine ที่ส่งเข้ามาโดยตรง)
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from anomaly_engine import AnomalyEngine, UnitColumns
+
+ALIGN = 8
+
+# คอลัมน์ที่ UnitColumns ต้องมีเสมอ (ใช้หาจำนวนหน่วย)
+BASE_INPUTS = ('turn_out',)
+
+
+class Task:
+    """analyzer หนึ่งตัว: func(engine) -> ผลลัพธ์, inputs = ชื่อคอลัมน์ของ UnitColumns ที่อ่าน"""
+
+    def __init__(self, name: str, func: Callable, inputs: Sequence[str] = ()):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+
+    def __repr__(self):
+        return f'Task({self.name!r})'
+
+
+def _flatten(engine: AnomalyEngine, names: Sequence[str]):
+    """(arrays, ค่าเดี่ยว) ของ engine: key = ('cols', ชื่อ) / ('rate', อัตรา, attr) / (ชื่อ,)"""
+    arrays = {('cols', name): engine.cols.arrays[name] for name in names}
+    scalars = {}
+    state = engine.state()
+    for rate, rate_state in state.pop('rates').items():
+        for key, value in rate_state.items():
+            target = arrays if isinstance(value, np.ndarray) else scalars
+            target[('rate', rate, key)] = value
+    for key, value in state.items():
+        target = arrays if isinstance(value, np.ndarray) else scalars
+        target[(key,)] = value
+    return arrays, scalars
+
+
+class SharedEngine:
+    """
+    คอลัมน์ของ UnitColumns + ผลที่คำนวณแล้วของ AnomalyEngine ใน shared memory block เดียว
+
+    spec (pickle ได้, ขนาดเล็ก) ใช้ attach() จาก process อื่น; เจ้าของต้อง close() เพื่อ unlink
+    """
+
+    def __init__(self, engine: AnomalyEngine, names: Sequence[str]):
+        arrays, scalars = _flatten(engine, names)
+        layout = {}
+        offset = 0
+        for key, arr in arrays.items():
+            arr = np.ascontiguousarray(arr)
+            layout[key] = (offset, arr.dtype.str, arr.shape)
+            offset += -(-arr.nbytes // ALIGN) * ALIGN
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for key, (off, dtype, shape) in layout.items():
+            view = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=off)
+            view[...] = arrays[key]
+            del view
+        self.spec = {'name': self.shm.name, 'layout': layout, 'scalars': scalars,
+                     'strings': list(engine.cols.strings)}
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach(spec) -> Tuple[AnomalyEngine, shared_memory.SharedMemory]:
+    """AnomalyEngine แบบอ่านอย่างเดียวบน shared memory (ต้องเก็บ shm ไว้ตราบที่ยังใช้ arrays)"""
+    shm = shared_memory.SharedMemory(name=spec['name'])
+    values = dict(spec['scalars'])
+    for key, (off, dtype, shape) in spec['layout'].items():
+        arr = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=off)
+        arr.flags.writeable = False
+        values[key] = arr
+    arrays = {}
+    state = {'rates': {}}
+    for key, value in values.items():
+        if key[0] == 'cols':
+            arrays[key[1]] = value
+        elif key[0] == 'rate':
+            state['rates'].setdefault(key[1], {})[key[2]] = value
+        else:
+            state[key[0]] = value
+    cols = UnitColumns(arrays, list(spec['strings']))
+    return AnomalyEngine.from_state(cols, state), shm
+
+
+# สถานะของ worker (ตั้งใน _init_worker)
+_worker = {}
+
+
+def _init_worker(spec, tasks):
+    engine, shm = attach(spec)
+    _worker['shm'] = shm
+    _worker['engine'] = engine
+    _worker['tasks'] = {t.name: t for t in tasks}
+
+
+def _run_in_worker(name):
+    start = time.perf_counter()
+    result = _worker['tasks'][name].func(_worker['engine'])
+    return name, result, time.perf_counter() - start, os.getpid()
+
+
+def required_inputs(tasks: Sequence[Task], cols: UnitColumns) -> List[str]:
+    """คอลัมน์ที่ทุก task อ่านรวมกัน — ValueError ถ้า task ใดขอคอลัมน์ที่ไม่มีใน cols"""
+    names = list(BASE_INPUTS)
+    for task in tasks:
+        missing = [n for n in task.inputs if n not in cols.arrays]
+        if missing:
+            raise ValueError(f'task {task.name!r}: ไม่มีคอลัมน์ {", ".join(missing)} ใน UnitColumns')
+        names.extend(n for n in task.inputs if n not in names)
+    return names
+
+
+def run_tasks(tasks: Sequence[Task], engine: AnomalyEngine, workers: int = 1) -> Tuple[Dict, Dict[str, float]]:
+    """
+    รันทุก task คืน ({ชื่อ task: ผลลัพธ์}, {ชื่อ task: วินาที}) เรียงตามลำดับใน tasks
+
+    workers > 1: process pool บน shared memory (ผลลัพธ์เหมือนรันเรียงกันทุกค่า)
+    """
+    results = {}
+    timings = {}
+    if workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            start = time.perf_counter()
+            results[task.name] = task.func(engine)
+            timings[task.name] = time.perf_counter() - start
+        return results, timings
+
+    with SharedEngine(engine, required_inputs(tasks, engine.cols)) as shared:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), initializer=_init_worker,
+                                 initargs=(shared.spec, list(tasks))) as pool:
+            futures = [pool.submit(_run_in_worker, task.name) for task in tasks]
+            for future in as_completed(futures):
+                name, result, elapsed, _ = future.result()
+                results[name] = result
+                timings[name] = elapsed
+    order = [task.name for task in tasks]
+    return {n: results[n] for n in order}, {n: timings[n] for n in order}
+
+
+def format_timings(timings: Dict[str, float], wall: float = None) -> str:
+    """ตารางเวลาต่อ task (เรียงจากช้าสุด)"""
+    width = max((len(n) for n in timings), default=0)
+    lines = [f'  {name:<{width}}  {sec * 1000:8.1f} ms'
+             for name, sec in sorted(timings.items(), key=lambda kv: -kv[1])]
+    if wall is not None:
+        lines.append(f'  {"รวม (wall)":<{width}}  {wall * 1000:8.1f} ms  (ผลรวม task {sum(timings.values()) * 1000:.1f} ms)')
+    return '\n'.join(lines)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Benford's Law แบบ vectorized บน NumPy (แยกหลักด้วยเลขคณิต ไม่แปลงเป็นข้อความ)
+
+การทดสอบ:
+  - first     : หลักแรก 1-9             P(d) = log10(1 + 1/d)
+  - second    : หลักที่สอง 0-9 (2BL)     P(d) = Σ_k log10(1 + 1/(10k + d))
+  - first_two : สองหลักแรก 10-99          P(dd) = log10(1 + 1/dd)
+  - last      : หลักสุดท้าย 0-9           สม่ำเสมอ 10% (ค่าที่ปั้นขึ้นมักลงท้ายด้วยเลขซ้ำ ๆ)
+
+สถิติต่อกลุ่ม: chi-square (+ p-value, ค่าวิกฤตที่ 0.05), MAD ของสัดส่วน (พร้อมระดับของ Nigrini)
+และ Kuiper V = max(F_obs - F_exp) + max(F_exp - F_obs)
+
+benford_groups() แยกหลักครั้งเดียวแล้วนับทุกการจัดกลุ่ม (พรรค / จังหวัด / เขต) ด้วย bincount
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import stats
+
+_POW10 = 10 ** np.arange(19, dtype=np.int64)
+
+
+def _expected_second():
+    d = np.arange(10)
+    k = np.arange(1, 10)[:, None]
+    return np.log10(1 + 1 / (10 * k + d)).sum(axis=0)
+
+
+# ช่วงของหลัก, จำนวนหลักขั้นต่ำของค่า, การแจกแจงที่คาดหวัง
+TESTS = {
+    'first': (np.arange(1, 10), 1, np.log10(1 + 1 / np.arange(1, 10))),
+    'second': (np.arange(10), 2, _expected_second()),
+    'first_two': (np.arange(10, 100), 2, np.log10(1 + 1 / np.arange(10, 100))),
+    'last': (np.arange(10), 2, np.full(10, 0.1)),
+}
+
+# เกณฑ์ MAD ของ Nigrini: (ใกล้เคียงมาก, ยอมรับได้, พอยอมรับได้) เกินกว่านั้น = ไม่สอดคล้อง
+MAD_CONFORMITY = {
+    'first': (0.006, 0.012, 0.015),
+    'second': (0.008, 0.010, 0.012),
+    'first_two': (0.0012, 0.0018, 0.0022),
+}
+CONFORMITY_LABELS = ('close', 'acceptable', 'marginal', 'nonconformity')
+
+
+def digit_codes(values, test: str = 'first', min_value: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (ตำแหน่ง bin ของแต่ละค่า, mask ค่าที่ใช้ได้)
+
+    ค่าที่ใช้ได้: >= min_value และมีจำนวนหลักพอสำหรับการทดสอบ (second / first_two / last ต้อง >= 10)
+    """
+    values = np.asarray(values, dtype=np.int64)
+    bins, min_digits, _ = TESTS[test]
+    valid = values >= max(min_value, int(_POW10[min_digits - 1]))
+    v = np.where(valid, values, _POW10[min_digits - 1])
+    # จำนวนหลัก: ตำแหน่งใน 10^k (เทียบจำนวนเต็มตรง ๆ จึงไม่มีปัญหาปัดเศษของ log10)
+    n_digits = np.searchsorted(_POW10, v, side='right')
+    if test == 'first':
+        code = v // _POW10[n_digits - 1] - 1
+    elif test == 'second':
+        code = (v // _POW10[n_digits - 2]) % 10
+    elif test == 'first_two':
+        code = v // _POW10[n_digits - 2] - 10
+    else:
+        code = v % 10
+    return code.astype(np.int64), valid
+
+
+def _conformity(test, mad):
+    cuts = MAD_CONFORMITY.get(test)
+    if cuts is None:
+        return np.full(mad.shape, None, dtype=object)
+    labels = np.array(CONFORMITY_LABELS, dtype=object)
+    return labels[np.searchsorted(np.array(cuts), mad, side='right')]
+
+
+class BenfordTable:
+    """ผลการทดสอบหนึ่งแบบของทุกกลุ่ม (array ยาว n_groups)"""
+
+    def __init__(self, test: str, counts: np.ndarray, labels: Optional[Sequence] = None):
+        bins, _, expected = TESTS[test]
+        self.test = test
+        self.bins = bins
+        self.expected = expected
+        self.counts = counts
+        self.labels = list(labels) if labels is not None else list(range(len(counts)))
+        self.n = counts.sum(axis=1)
+        self.df = len(bins) - 1
+
+        n = self.n[:, None].astype(np.float64)
+        safe_n = np.where(n > 0, n, 1)
+        observed = counts / safe_n
+        exp_count = expected[None, :] * n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.chi_square = np.where(self.n > 0, ((counts - exp_count) ** 2 / exp_count).sum(axis=1), 0.0)
+        self.p_value = stats.chi2.sf(self.chi_square, self.df)
+        self.mad = np.abs(observed - expected[None, :]).mean(axis=1)
+        gap = np.cumsum(observed, axis=1) - np.cumsum(expected)[None, :]
+        self.kuiper = np.where(self.n > 0, np.maximum(gap.max(axis=1), 0) + np.maximum(-gap.min(axis=1), 0), 0.0)
+        self.conformity = _conformity(test, self.mad)
+        self.observed = observed
+
+    @property
+    def chi_critical_005(self) -> float:
+        return float(stats.chi2.ppf(0.95, self.df))
+
+    def __len__(self):
+        return len(self.labels)
+
+    def row(self, i: int) -> Dict:
+        """สรุปของกลุ่มที่ i"""
+        return {
+            'group': self.labels[i],
+            'n': int(self.n[i]),
+            'chi_square': float(self.chi_square[i]),
+            'p_value': float(self.p_value[i]),
+            'mad': float(self.mad[i]),
+            'conformity': self.conformity[i],
+            'kuiper': float(self.kuiper[i]),
+        }
+
+    def rows(self, min_n: int = 0):
+        return [self.row(i) for i in np.flatnonzero(self.n >= min_n).tolist()]
+
+
+def benford_groups(values, groupings: Optional[Dict[str, Tuple[np.ndarray, Sequence]]] = None,
+                   tests: Sequence[str] = tuple(TESTS), min_value: int = 1) -> Dict[str, Dict[str, BenfordTable]]:
+    """
+    ทดสอบหลายแบบ × หลายการจัดกลุ่มในรอบเดียว
+
+    groupings: {ชื่อ: (รหัสกลุ่ม int ของแต่ละค่า, ชื่อกลุ่มตามรหัส)} — None = ทั้งชุดเป็นกลุ่มเดียว ('all')
+    คืน {ชื่อการจัดกลุ่ม: {test: BenfordTable}}
+    """
+    values = np.asarray(values, dtype=np.int64)
+    if groupings is None:
+        groupings = {'all': (np.zeros(len(values), dtype=np.int64), ['all'])}
+    out = {name: {} for name in groupings}
+    for test in tests:
+        code, valid = digit_codes(values, test, min_value)
+        n_bins = len(TESTS[test][0])
+        code = code[valid]
+        for name, (groups, labels) in groupings.items():
+            g = np.asarray(groups, dtype=np.int64)[valid]
+            n_groups = len(labels)
+            counts = np.bincount(g * n_bins + code, minlength=n_groups * n_bins).reshape(n_groups, n_bins)
+            out[name][test] = BenfordTable(test, counts, labels)
+    return out
+
+
+def benford_test(values, test: str = 'first', min_value: int = 1) -> BenfordTable:
+    """ทดสอบทั้งชุดเป็นกลุ่มเดียว"""
+    return benford_groups(values, tests=(test,), min_value=min_value)['all'][test]
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Checkpoint แบบ append-only JSONL สำหรับการเปรียบเทียบชุดใหญ่ที่อาจถูกขัดจังหวะ
+
+แต่ละบรรทัดคือผลของหนึ่งหน่วย: {"unit_id", "source_hash", ...ผลลัพธ์}
+  - เขียนต่อท้ายทันทีที่ได้ผล (flush ทุกบรรทัด) ถ้าโปรแกรมหยุดกลางทางผลก่อนหน้ายังอยู่
+  - หน่วยเดียวกันถูกเขียนซ้ำได้ บรรทัดหลังสุดชนะ
+  - บรรทัดสุดท้ายที่เขียนไม่จบ (ถูก kill ระหว่างเขียน) จะถูกข้าม
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+
+def source_hash(*payloads) -> str:
+    """hash ของข้อมูลต้นทาง (JSON แบบ canonical) ใช้ตรวจว่าข้อมูลของหน่วยเปลี่ยนหรือไม่"""
+    raw = json.dumps(payloads, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class CheckpointStore:
+    """
+    ที่เก็บผลรายหน่วยแบบ JSONL
+
+    >>> store = CheckpointStore('checkpoint.jsonl')
+    >>> store.get('001001')                 # record ล่าสุดของหน่วย หรือ None
+    >>> store.append({'unit_id': '001001', 'source_hash': h, ...})
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._records: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._file = None
+        self._needs_newline = False
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                # บรรทัดท้ายที่ไม่มี newline = เขียนไม่จบ ต้องขึ้นบรรทัดใหม่ก่อนเขียนต่อ
+                self._needs_newline = not line.endswith('\n')
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                self._records[record['unit_id']] = record
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, unit_id):
+        return unit_id in self._records
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(list(self._records.values()))
+
+    def get(self, unit_id: str) -> Optional[Dict]:
+        return self._records.get(unit_id)
+
+    def is_current(self, unit_id: str, current_hash: Optional[str] = None,
+                   max_age: Optional[float] = None) -> bool:
+        """
+        ผลของหน่วยนี้ยังใช้ได้หรือไม่
+
+        current_hash: source_hash ของข้อมูลปัจจุบัน — ถ้าระบุ ต้องตรงกันเท่านั้น
+        max_age: ถ้าไม่รู้ hash ปัจจุบัน ใช้ได้เมื่อ record อายุ (จาก timestamp) ไม่เกิน max_age วินาที
+        record ที่ไม่มี source_hash หรือไม่มีทั้ง current_hash และ max_age ถือว่าไม่ current เสมอ
+        """
+        record = self._records.get(unit_id)
+        if record is None or not record.get('source_hash'):
+            return False
+        if current_hash is not None:
+            return record['source_hash'] == current_hash
+        if max_age is None:
+            return False
+        try:
+            age = (datetime.now() - datetime.fromisoformat(record['timestamp'])).total_seconds()
+        except (KeyError, TypeError, ValueError):
+            return False
+        return 0 <= age <= max_age
+
+    def append(self, record: Dict):
+        """เขียน record ต่อท้ายไฟล์ทันที (thread-safe)"""
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+                if self._needs_newline:
+                    self._file.write('\n')
+                    self._needs_newline = False
+            self._file.write(line + '\n')
+            self._file.flush()
+            self._records[record['unit_id']] = record
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def compact(self):
+        """เขียนไฟล์ใหม่ให้เหลือ record ล่าสุดของแต่ละหน่วย"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            tmp = f'{self.path}.tmp{os.getpid()}'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                for record in self._records.values():
+                    f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+            os.replace(tmp, self.path)
+            self._needs_newline = False
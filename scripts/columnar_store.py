@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+ไฟล์ข้อมูลแบบ columnar (binary) ที่เขียนคู่กับ election_data.json ให้หน้า dashboard โหลดเร็วขึ้น
+
+  - list ของ dict (units, candidates, parties, national_parties, ...) ถูกแปลงเป็นตารางแบบคอลัมน์
+  - ข้อความทั้งหมดอยู่ใน dictionary กลางชุดเดียว คอลัมน์เก็บเป็นรหัส uint8/uint16/uint32
+  - ตัวเลขเก็บเป็น typed array ขนาดเล็กที่สุดที่พอ (int8..int64, float64)
+  - buffer ที่เหมือนกันทุก byte เก็บครั้งเดียว (เช่น parties ซ้ำกับ candidates ของหน่วยเดียวกัน)
+  - เขียน .gz (และ .br ถ้ามี brotli) ไว้ข้างไฟล์
+
+รูปแบบไฟล์ (little-endian):
+  b'ECOL' | uint32 ความยาว header | header (JSON UTF-8) | padding ถึงขอบ 8 byte | buffers
+  header = {"version", "strings", "buffers": [[offset, length], ...], "tables": [...], "doc"}
+  doc คือเอกสารเดิมที่ list ของ dict ถูกแทนด้วย {"$table": i}
+    dict จริงที่มี key เดียวเป็น "$table" / "$dict" ถูกห่อเป็น {"$dict": {...}} เพื่อไม่ให้สับสนกับการอ้างอิงตาราง
+  ตาราง: {"rows", "columns"} + ถ้าลำดับ key ของบางแถวไม่ตรงกับลำดับคอลัมน์
+    key_orders (ลำดับคอลัมน์แต่ละแบบ) และ key_order (buffer รหัสแบบของแต่ละแถว, dtype ตาม key_order_dtype)
+  คอลัมน์: {"name", "kind", "data", ...} โดย kind เป็น int/float/bool/str/json/table/null
+    missing / null: bitmap (np.packbits) ของแถวที่ไม่มี key / มีค่า null — data เก็บเฉพาะแถวที่มีค่า
+    float: is_int = bitmap ของค่าที่เดิมเป็น int (ให้อ่านกลับได้ชนิดเดิม)
+    table: offsets (uint32, แถว + 1) ชี้เข้าตารางลูก "table"
+"""
+
+import gzip
+import json
+import os
+import struct
+
+import numpy as np
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MAGIC = b'ECOL'
+VERSION = 2
+READ_VERSIONS = (1, 2)   # v1 ไม่มี $dict / key_orders อ่านด้วยตัวถอดรหัสเดียวกันได้
+_RESERVED = ('$table', '$dict')
+ALIGN = 8
+_MISSING = object()
+
+
+def _int_dtype(lo, hi):
+    for dtype in ('<i1', '<i2', '<i4', '<i8'):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return dtype
+    raise OverflowError(f'ค่าเกินช่วง int64: {lo}..{hi}')
+
+
+def _code_dtype(n):
+    return '<u1' if n <= 0xFF else '<u2' if n <= 0xFFFF else '<u4'
+
+
+def _is_table(value):
+    return isinstance(value, list) and len(value) > 0 and all(isinstance(v, dict) for v in value)
+
+
+class _Encoder:
+    def __init__(self):
+        self.strings = []
+        self.string_index = {}
+        self.buffers = []
+        self.buffer_index = {}
+        self.tables = []
+        self._code_columns = []
+
+    def code(self, s):
+        c = self.string_index.get(s)
+        if c is None:
+            c = self.string_index[s] = len(self.strings)
+            self.strings.append(s)
+        return c
+
+    def buffer(self, raw):
+        """เพิ่ม buffer (ถ้ามีตัวที่เหมือนกันแล้วใช้ตัวเดิม) คืน index"""
+        idx = self.buffer_index.get(raw)
+        if idx is None:
+            idx = self.buffer_index[raw] = len(self.buffers)
+            self.buffers.append(raw)
+        return idx
+
+    def bitmap(self, flags):
+        return self.buffer(np.packbits(np.asarray(flags, dtype=bool), bitorder='little').tobytes())
+
+    def walk(self, obj):
+        """แทน list ของ dict ด้วย {"$table": i} ทั่วทั้งเอกสาร"""
+        if _is_table(obj):
+            return {'$table': self.table(obj)}
+        if isinstance(obj, dict):
+            out = {k: self.walk(v) for k, v in obj.items()}
+            if len(out) == 1 and next(iter(out)) in _RESERVED:
+                return {'$dict': out}
+            return out
+        if isinstance(obj, list):
+            return [self.walk(v) for v in obj]
+        return obj
+
+    def table(self, rows):
+        spec = self._table_spec(rows)
+        self.tables.append(spec)
+        return len(self.tables) - 1
+
+    def _table_spec(self, rows):
+        names = {}
+        for r in rows:
+            for k in r:
+                names.setdefault(k, len(names))
+        spec = {'rows': len(rows), 'columns': [self._column(name, rows) for name in names]}
+
+        # ตัวถอดรหัสเติม key ตามลำดับคอลัมน์ — เก็บลำดับของแถวไว้เฉพาะเมื่อมีแถวที่ลำดับต่างออกไป
+        orders = {}
+        codes = []
+        regular = True
+        for r in rows:
+            order = tuple(names[k] for k in r)
+            regular = regular and all(a < b for a, b in zip(order, order[1:]))
+            codes.append(orders.setdefault(order, len(orders)))
+        if not regular:
+            dtype = _code_dtype(len(orders))
+            spec['key_orders'] = [list(order) for order in orders]
+            spec['key_order'] = self.buffer(np.array(codes, dtype=dtype).tobytes())
+            spec['key_order_dtype'] = dtype
+        return spec
+
+    def _column(self, name, rows):
+        raw = [r.get(name, _MISSING) for r in rows]
+        missing = [v is _MISSING for v in raw]
+        null = [v is None for v in raw]
+        values = [v for v in raw if v is not _MISSING and v is not None]
+        col = {'name': name}
+        if any(missing):
+            col['missing'] = self.bitmap(missing)
+        if any(null):
+            col['null'] = self.bitmap(null)
+
+        if not values:
+            col['kind'] = 'null'
+        elif all(isinstance(v, bool) for v in values):
+            col['kind'] = 'bool'
+            col['data'] = self.bitmap(values)
+        elif all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+            dtype = _int_dtype(min(values), max(values))
+            col.update(kind='int', dtype=dtype, data=self.buffer(np.array(values, dtype=dtype).tobytes()))
+        elif all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+            col.update(kind='float', dtype='<f8', data=self.buffer(np.array(values, dtype='<f8').tobytes()))
+            is_int = [isinstance(v, int) for v in values]
+            if any(is_int):
+                col['is_int'] = self.bitmap(is_int)
+        elif all(isinstance(v, str) for v in values):
+            col['kind'] = 'str'
+            self._code_columns.append((col, [self.code(v) for v in values]))
+        elif all(isinstance(v, list) and all(isinstance(x, dict) for x in v) for v in values):
+            col['kind'] = 'table'
+            offsets = np.concatenate(([0], np.cumsum([len(v) for v in values]))).astype('<u4')
+            col['offsets'] = self.buffer(offsets.tobytes())
+            col['table'] = self._table_spec([x for v in values for x in v])
+        else:
+            # ชนิดปน / list ของค่าธรรมดา: เก็บเป็นข้อความ JSON ใน dictionary
+            col['kind'] = 'json'
+            self._code_columns.append(
+                (col, [self.code(json.dumps(v, ensure_ascii=False, separators=(',', ':'))) for v in values]))
+        return col
+
+    def finish(self, doc):
+        # ขนาดรหัสขึ้นกับจำนวนข้อความทั้งหมด จึงเขียน buffer ของคอลัมน์ข้อความตอนท้าย
+        dtype = _code_dtype(len(self.strings))
+        for col, codes in self._code_columns:
+            col['dtype'] = dtype
+            col['data'] = self.buffer(np.array(codes, dtype=dtype).tobytes())
+
+        layout = []
+        offset = 0
+        for raw in self.buffers:
+            layout.append([offset, len(raw)])
+            offset += len(raw) + (-len(raw)) % ALIGN
+        header = json.dumps({
+            'version': VERSION,
+            'strings': self.strings,
+            'buffers': layout,
+            'tables': self.tables,
+            'doc': doc,
+        }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        head = MAGIC + struct.pack('<I', len(header)) + header
+        parts = [head, b'\0' * ((-len(head)) % ALIGN)]
+        for raw in self.buffers:
+            parts.append(raw)
+            parts.append(b'\0' * ((-len(raw)) % ALIGN))
+        return b''.join(parts)
+
+
+def dumps(doc):
+    """เอกสาร JSON (dict/list) -> bytes แบบ columnar"""
+    enc = _Encoder()
+    return enc.finish(enc.walk(doc))
+
+
+class _Decoder:
+    def __init__(self, raw):
+        if raw[:4] != MAGIC:
+            raise ValueError('ไม่ใช่ไฟล์ columnar (magic ไม่ตรง)')
+        (header_len,) = struct.unpack_from('<I', raw, 4)
+        head_end = 8 + header_len
+        self.header = json.loads(raw[8:head_end].decode('utf-8'))
+        if self.header['version'] not in READ_VERSIONS:
+            raise ValueError(f"ไม่รองรับ version {self.header['version']}")
+        self.raw = raw
+        self.base = head_end + (-head_end) % ALIGN
+        self.strings = self.header['strings']
+
+    def buffer(self, idx, dtype):
+        offset, length = self.header['buffers'][idx]
+        return np.frombuffer(self.raw, dtype=dtype, count=length // np.dtype(dtype).itemsize,
+                             offset=self.base + offset)
+
+    def bitmap(self, idx, n):
+        bits = np.unpackbits(self.buffer(idx, '<u1'), count=n, bitorder='little')
+        return bits.astype(bool).tolist()
+
+    def walk(self, obj):
+        if isinstance(obj, dict):
+            if len(obj) == 1 and '$table' in obj:
+                return self.table(self.header['tables'][obj['$table']])
+            if len(obj) == 1 and '$dict' in obj:
+                return {k: self.walk(v) for k, v in obj['$dict'].items()}
+            return {k: self.walk(v) for k, v in obj.items()}
+        if isinstance(obj, list):
+            return [self.walk(v) for v in obj]
+        return obj
+
+    def table(self, spec):
+        n = spec['rows']
+        rows = [{} for _ in range(n)]
+        for col in spec['columns']:
+            name = col['name']
+            missing = self.bitmap(col['missing'], n) if 'missing' in col else [False] * n
+            null = self.bitmap(col['null'], n) if 'null' in col else [False] * n
+            values = iter(self.values(col, n - sum(missing) - sum(null)))
+            for row, is_missing, is_null in zip(rows, missing, null):
+                if is_missing:
+                    continue
+                row[name] = None if is_null else next(values)
+        if 'key_orders' in spec:
+            names = [col['name'] for col in spec['columns']]
+            orders = [[names[i] for i in order] for order in spec['key_orders']]
+            codes = self.buffer(spec['key_order'], spec['key_order_dtype']).tolist()
+            rows = [{k: row[k] for k in orders[c]} for row, c in zip(rows, codes)]
+        return rows
+
+    def values(self, col, count):
+        kind = col['kind']
+        if kind == 'null':
+            return []
+        if kind == 'bool':
+            return self.bitmap(col['data'], count)
+        if kind == 'int':
+            return self.buffer(col['data'], col['dtype']).tolist()
+        if kind == 'float':
+            out = self.buffer(col['data'], col['dtype']).tolist()
+            if 'is_int' in col:
+                for i, is_int in enumerate(self.bitmap(col['is_int'], count)):
+                    if is_int:
+                        out[i] = int(out[i])
+            return out
+        if kind == 'str':
+            return [self.strings[c] for c in self.buffer(col['data'], col['dtype']).tolist()]
+        if kind == 'json':
+            return [json.loads(self.strings[c]) for c in self.buffer(col['data'], col['dtype']).tolist()]
+        if kind == 'table':
+            offsets = self.buffer(col['offsets'], '<u4').tolist()
+            children = self.table(col['table'])
+            return [children[a:b] for a, b in zip(offsets[:-1], offsets[1:])]
+        raise ValueError(f'ไม่รู้จักคอลัมน์ชนิด {kind}')
+
+
+def loads(raw):
+    """bytes แบบ columnar -> เอกสาร JSON เดิม"""
+    dec = _Decoder(raw)
+    return dec.walk(dec.header['doc'])
+
+
+def save(doc, path, compress=True):
+    """
+    เขียนไฟล์ columnar ที่ path (+ path.gz / path.br ถ้า compress)
+    คืน dict ของ path -> ขนาด (bytes)
+    """
+    raw = dumps(doc)
+    outputs = {path: raw}
+    if compress:
+        outputs[path + '.gz'] = gzip.compress(raw, compresslevel=9, mtime=0)
+        if brotli is not None:
+            outputs[path + '.br'] = brotli.compress(raw, quality=11)
+    for out_path, content in outputs.items():
+        tmp = f'{out_path}.tmp{os.getpid()}'
+        with open(tmp, 'wb') as f:
+            f.write(content)
+        os.replace(tmp, out_path)
+    return {out_path: len(content) for out_path, content in outputs.items()}
+
+
+def load(path):
+    """อ่านไฟล์ columnar (รองรับ .gz / .br ตามนามสกุล)"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if path.endswith('.gz'):
+        raw = gzip.decompress(raw)
+    elif path.endswith('.br'):
+        if brotli is None:
+            raise ImportError('ต้องติดตั้ง brotli เพื่ออ่านไฟล์ .br')
+        raw = brotli.decompress(raw)
+    return loads(raw)
+
+
+def columnar_path(json_path):
+    """election_data.json -> election_data.ecol"""
+    return os.path.splitext(json_path)[0] + '.ecol'
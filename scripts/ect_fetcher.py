@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+ดึง JSON หลาย endpoint ของ กกต. พร้อมกัน ผ่าน requests.Session เดียว (keep-alive)
+  - timeout แยกต่อ endpoint
+  - retry จำกัดจำนวนครั้ง พร้อม backoff แบบสุ่ม (full jitter)
+  - รายงานเวลาที่ใช้ของแต่ละ endpoint
+"""
+
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import HTTPCache
+
+# status ที่ควรลองใหม่ (server ล่ม/ถูกจำกัด rate ชั่วคราว)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class Endpoint:
+    """endpoint หนึ่งรายการ: key ใช้อ้างอิงผล, timeout = (connect, read) วินาที, cache = ใช้ HTTPCache"""
+    key: str
+    url: str
+    label: str
+    timeout: Any = (5, 30)
+    cache: bool = False
+
+
+@dataclass
+class FetchResult:
+    """ผลการดึงข้อมูลหนึ่ง endpoint"""
+    key: str
+    label: str
+    url: str
+    data: Optional[Any] = None
+    status: Optional[int] = None
+    attempts: int = 0
+    elapsed: float = 0.0
+    error: Optional[str] = None
+    bytes: int = 0
+    cache: Optional[str] = None
+    attempt_times: List[float] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def make_session(pool_size: int = 10) -> requests.Session:
+    """Session ที่มี connection pool ขนาดพอสำหรับทุก worker (retry จัดการเองใน fetcher)"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class ConcurrentFetcher:
+    """ดึงหลาย endpoint พร้อมกันด้วย thread pool บน session เดียว"""
+
+    def __init__(self, session: Optional[requests.Session] = None, max_workers: int = 5,
+                 retries: int = 3, backoff: float = 0.5, max_backoff: float = 8.0,
+                 cache: Optional[HTTPCache] = None):
+        self.session = session or make_session(max_workers)
+        self.cache = cache
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def _sleep_before_retry(self, attempt: int):
+        # full jitter: สุ่มระหว่าง 0 ถึง backoff * 2^attempt (ไม่เกิน max_backoff)
+        time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+
+    def get(self, endpoint: Endpoint) -> requests.Response:
+        """ส่ง GET หนึ่งครั้ง (ผ่าน HTTPCache ถ้า endpoint เปิด cache ไว้)"""
+        if self.cache is not None and endpoint.cache:
+            return self.cache.get(self.session, endpoint.url, timeout=endpoint.timeout)
+        return self.session.get(endpoint.url, timeout=endpoint.timeout)
+
+    def parse(self, endpoint: Endpoint, response: requests.Response) -> Any:
+        return response.json()
+
+    def fetch_one(self, endpoint: Endpoint) -> FetchResult:
+        """ดึง endpoint เดียว พร้อม retry"""
+        result = FetchResult(endpoint.key, endpoint.label, endpoint.url)
+        start = time.perf_counter()
+        for attempt in range(self.retries + 1):
+            result.attempts = attempt + 1
+            t0 = time.perf_counter()
+            try:
+                r = self.get(endpoint)
+                result.status = r.status_code
+                if r.status_code in RETRY_STATUS:
+                    raise requests.HTTPError(f'HTTP {r.status_code}', response=r)
+                r.raise_for_status()
+                result.data = self.parse(endpoint, r)
+                result.bytes = len(r.content)
+                result.cache = getattr(r, 'from_cache', None)
+                result.error = None
+                result.attempt_times.append(time.perf_counter() - t0)
+                break
+            except requests.JSONDecodeError as e:
+                # JSON เสีย ไม่ลองใหม่ (ต้องมาก่อน RequestException เพราะเป็น subclass ของมันด้วย)
+                result.attempt_times.append(time.perf_counter() - t0)
+                result.error = f'JSON ไม่ถูกต้อง: {e}'
+                break
+            except requests.RequestException as e:
+                # ConnectionError / Timeout / ChunkedEncodingError / ContentDecodingError / HTTP 5xx ฯลฯ
+                result.attempt_times.append(time.perf_counter() - t0)
+                result.error = str(e) or type(e).__name__
+                # URL ผิดรูปแบบ (InvalidURL / MissingSchema เป็น ValueError ด้วย) และ HTTP 4xx ลองใหม่ก็ไม่หาย
+                retryable = (not isinstance(e, ValueError)
+                             and (not isinstance(e, requests.HTTPError) or result.status in RETRY_STATUS))
+                if not retryable or attempt == self.retries:
+                    break
+                self._sleep_before_retry(attempt)
+            except Exception as e:
+                # OSError จากการเขียน HTTPCache ลงดิสก์ หรือ error อื่น: เก็บไว้ในผล ไม่ให้หลุดจาก fetch_all
+                result.attempt_times.append(time.perf_counter() - t0)
+                result.error = f'{type(e).__name__}: {e}'
+                break
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    def fetch_all(self, endpoints: List[Endpoint]) -> Dict[str, FetchResult]:
+        """ดึงทุก endpoint พร้อมกัน คืน dict key -> FetchResult (ลำดับเดียวกับที่ส่งเข้า)"""
+        workers = max(1, min(self.max_workers, len(endpoints)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(self.fetch_one, endpoints))
+        return {r.key: r for r in results}
+
+
+def timing_report(results: Dict[str, FetchResult], wall_time: Optional[float] = None) -> str:
+    """สรุปเวลาที่ใช้ของแต่ละ endpoint เทียบกับเวลาจริงทั้งหมด"""
+    lines = [f"  {'endpoint':<28} {'status':>11} {'ครั้ง':>5} {'เวลา(s)':>8} {'ขนาด(KB)':>9}"]
+    for r in results.values():
+        status = r.cache or (r.status if r.status is not None else '-')
+        lines.append(f"  {r.label[:28]:<28} {status:>11} {r.attempts:>5} {r.elapsed:>8.2f} {r.bytes / 1024:>9.1f}")
+    serial = sum(r.elapsed for r in results.values())
+    if wall_time is not None:
+        lines.append(f"  รวมแบบทีละรายการ ~{serial:.2f}s | ใช้จริง {wall_time:.2f}s")
+    return '\n'.join(lines)
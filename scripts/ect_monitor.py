@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+เฝ้าดูผล กกต. แบบ real-time: poll stats_cons.json เป็นรอบ แล้วบันทึกการเปลี่ยนแปลงเป็น event
+
+  - conditional GET (If-None-Match / If-Modified-Since) ได้ 304 หรือ body เดิม = ไม่มีงาน
+  - hash record ของแต่ละเขต (fingerprint เดียวกับ --incremental) แล้ว diff เฉพาะเขตที่ hash เปลี่ยน
+  - event ต่อท้ายไฟล์ JSONL ทันที (flush ทุกบรรทัด):
+      votes_increased / votes_decreased  คะแนนรวมหรือรายผู้สมัครเพิ่ม/ลด
+      counted_stations_backward          จำนวนหน่วยที่นับแล้วลดลง
+      pause_report_toggled               pause_report เปลี่ยนค่า
+      constituency_added / constituency_removed
+  - รอบ poll เดินตามเวลา monotonic คงที่ (ไม่สะสม drift) timeout ของ request น้อยกว่า interval
+    เวลาตั้งแต่เริ่ม poll ถึงเขียน event (latency_ms) บันทึกในทุก event และสรุป p50/p95/max
+
+ใช้งาน:
+    python ect_monitor.py --interval 300
+    python ect_monitor.py --once            # poll รอบเดียว (เช่นจาก cron)
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional
+
+import requests
+
+from analyze_ect_only import STATS_URL, fingerprint
+from ect_fetcher import ConcurrentFetcher, Endpoint
+from rate_stats import interpolated_quantiles
+from snapshot_store import SnapshotStore
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MONITOR_DIR = os.path.join(SCRIPT_DIR, '..', '.cache', 'ect_monitor')
+EVENTS_PATH = os.path.join(MONITOR_DIR, 'events.jsonl')
+STATE_PATH = os.path.join(MONITOR_DIR, 'state.json')
+
+DEFAULT_INTERVAL = 300
+
+VOTES_INCREASED = 'votes_increased'
+VOTES_DECREASED = 'votes_decreased'
+STATIONS_BACKWARD = 'counted_stations_backward'
+PAUSE_TOGGLED = 'pause_report_toggled'
+CONS_ADDED = 'constituency_added'
+CONS_REMOVED = 'constituency_removed'
+
+
+def _write_atomic(path, data):
+    tmp = f'{path}.tmp{os.getpid()}'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def cons_snapshot(cons, prov_id) -> Dict:
+    """ค่าที่ใช้ diff ของหนึ่งเขต (เก็บแทน record เต็ม)"""
+    return {
+        'prov_id': prov_id,
+        'valid_votes': cons.get('valid_votes', 0),
+        'counted_stations': cons.get('counted_vote_stations', 0),
+        'pause_report': cons.get('pause_report', False),
+        'candidates': {str(c.get('mp_app_id', '')): c.get('mp_app_vote', 0)
+                       for c in cons.get('candidates', [])},
+    }
+
+
+def diff_constituency(cons_id: str, old: Optional[Dict], new: Optional[Dict]) -> List[Dict]:
+    """event ของเขตหนึ่งเขตจาก snapshot เก่า -> ใหม่ (ยังไม่มีเวลา/poll_id)"""
+    if old is None:
+        return [{'type': CONS_ADDED, 'cons_id': cons_id, 'prov_id': new['prov_id']}]
+    if new is None:
+        return [{'type': CONS_REMOVED, 'cons_id': cons_id, 'prov_id': old['prov_id']}]
+
+    events = []
+    base = {'cons_id': cons_id, 'prov_id': new['prov_id']}
+
+    # คะแนนรายผู้สมัครแยกตามทิศทาง (ผู้สมัครที่หายไปนับเป็นลดลงเหลือ 0)
+    increased, decreased = {}, {}
+    old_c, new_c = old['candidates'], new['candidates']
+    for cand_id in new_c.keys() | old_c.keys():
+        delta = new_c.get(cand_id, 0) - old_c.get(cand_id, 0)
+        if delta > 0:
+            increased[cand_id] = delta
+        elif delta < 0:
+            decreased[cand_id] = delta
+    total_delta = new['valid_votes'] - old['valid_votes']
+    for event_type, candidates, moved in ((VOTES_INCREASED, increased, total_delta > 0),
+                                          (VOTES_DECREASED, decreased, total_delta < 0)):
+        if candidates or moved:
+            events.append(dict(base, type=event_type, before=old['valid_votes'],
+                               after=new['valid_votes'], delta=total_delta,
+                               candidates=dict(sorted(candidates.items()))))
+
+    if new['counted_stations'] < old['counted_stations']:
+        events.append(dict(base, type=STATIONS_BACKWARD, before=old['counted_stations'],
+                           after=new['counted_stations'],
+                           delta=new['counted_stations'] - old['counted_stations']))
+    if new['pause_report'] != old['pause_report']:
+        events.append(dict(base, type=PAUSE_TOGGLED, before=old['pause_report'], after=new['pause_report']))
+    return events
+
+
+class EventSink:
+    """ไฟล์ event แบบ append-only JSONL (flush ทุกบรรทัด)"""
+
+    def __init__(self, path: str = EVENTS_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def write(self, event: Dict):
+        self._file.write(json.dumps(event, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class _ConditionalFetcher(ConcurrentFetcher):
+    """
+    ConcurrentFetcher ที่ส่ง validators ของรอบก่อน และคืน body ดิบ (None เมื่อได้ 304)
+
+    validators ของ response ใหม่รอใน pending จนกว่าผู้เรียกจะ commit() หลังตรวจ body แล้ว
+    (ถ้าเก็บทันที body ที่เสียจะได้ 304 ตลอดไป)
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(max_workers=1, **kwargs)
+        self.etag = None
+        self.last_modified = None
+        self.pending = None
+
+    def get(self, endpoint):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return self.session.get(endpoint.url, timeout=endpoint.timeout, headers=headers)
+
+    def parse(self, endpoint, response):
+        if response.status_code == 304:
+            return None
+        self.pending = (response.headers.get('ETag', self.etag),
+                        response.headers.get('Last-Modified', self.last_modified))
+        return response.content
+
+    def commit(self):
+        """ใช้ validators ของ response ล่าสุดในรอบถัดไป"""
+        if self.pending is not None:
+            self.etag, self.last_modified = self.pending
+            self.pending = None
+
+
+class ECTMonitor:
+    """
+    daemon สำหรับ poll stats_cons.json
+
+    >>> monitor = ECTMonitor(interval=300)
+    >>> monitor.run()                     # จนกว่าจะ Ctrl-C หรือ monitor.stop()
+    """
+
+    def __init__(self, url: str = STATS_URL, interval: float = DEFAULT_INTERVAL,
+                 events_path: str = EVENTS_PATH, state_path: Optional[str] = STATE_PATH,
+                 session: Optional[requests.Session] = None, on_event=None, retries: int = 2,
+                 history=None):
+        """
+        Args:
+            interval: วินาทีระหว่างการเริ่ม poll แต่ละรอบ
+            state_path: snapshot ของรอบล่าสุด (None = ไม่เก็บ รอบแรกหลังเริ่มใหม่เป็น baseline)
+            on_event: callback(event) เพิ่มเติมหลังเขียนลงไฟล์ (เช่น แจ้งเตือน)
+            retries: จำนวนครั้งที่ลองใหม่ต่อรอบ (backoff ไม่เกิน interval / 4)
+            history: SnapshotStore สำหรับบันทึก stats_cons ทุกครั้งที่เนื้อหาเปลี่ยน
+        """
+        self.url = url
+        self.interval = interval
+        self.state_path = state_path
+        self.on_event = on_event
+        self.history = history
+        # request หนึ่งครั้งต้องจบก่อนถึงรอบถัดไป
+        read_timeout = max(1.0, min(60.0, interval / 2))
+        self.endpoint = Endpoint('stats', url, 'ผลคะแนน (stats_cons)', timeout=(5, read_timeout))
+        self.fetcher = _ConditionalFetcher(session=session, retries=retries,
+                                           max_backoff=max(0.5, interval / 4))
+        self.sink = EventSink(events_path)
+        self.fingerprints: Dict[str, str] = {}
+        self.snapshots: Dict[str, Dict] = {}
+        self.body_hash = None
+        self.poll_id = 0
+        self.latencies = deque(maxlen=10000)
+        self.stats = {'polls': 0, 'not_modified': 0, 'unchanged': 0, 'changed_units': 0,
+                      'events': 0, 'errors': 0, 'overruns': 0}
+        self._stop = threading.Event()
+        self._load_state()
+
+    # --- state ---
+
+    def _load_state(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get('url') != self.url:
+            return
+        self.fingerprints = state.get('fingerprints', {})
+        self.snapshots = state.get('snapshots', {})
+        self.body_hash = state.get('body_hash')
+        self.poll_id = state.get('poll_id', 0)
+        self.fetcher.etag = state.get('etag')
+        self.fetcher.last_modified = state.get('last_modified')
+
+    def _save_state(self):
+        if not self.state_path:
+            return
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        state = {
+            'url': self.url,
+            'poll_id': self.poll_id,
+            'body_hash': self.body_hash,
+            'etag': self.fetcher.etag,
+            'last_modified': self.fetcher.last_modified,
+            'fingerprints': self.fingerprints,
+            'snapshots': self.snapshots,
+        }
+        _write_atomic(self.state_path, json.dumps(state, ensure_ascii=False).encode('utf-8'))
+
+    # --- poll ---
+
+    def _emit(self, event: Dict, started: float):
+        event['detected_at'] = datetime.now().isoformat()
+        event['latency_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        self.sink.write(event)
+        self.latencies.append(event['latency_ms'])
+        self.stats['events'] += 1
+        if self.on_event is not None:
+            self.on_event(event)
+
+    def apply(self, stats: Dict, started: Optional[float] = None, source_time: Optional[str] = None) -> List[Dict]:
+        """
+        diff stats_cons ที่ parse แล้วกับรอบก่อน เขียน event และคืนรายการ event
+
+        รอบแรก (ยังไม่มี snapshot) เก็บเป็น baseline โดยไม่สร้าง event
+        """
+        started = time.perf_counter() if started is None else started
+        baseline = not self.fingerprints
+        fingerprints = {}
+        changed = []
+        for prov in stats.get('result_province', []):
+            for cons in prov.get('constituencies', []):
+                cons_id = cons['cons_id']
+                fp = fingerprint(cons)
+                fingerprints[cons_id] = fp
+                if self.fingerprints.get(cons_id) != fp:
+                    changed.append((cons_id, cons_snapshot(cons, prov['prov_id'])))
+        removed = [cons_id for cons_id in self.fingerprints if cons_id not in fingerprints]
+
+        events = []
+        for cons_id, snapshot in changed:
+            if not baseline:
+                events.extend(diff_constituency(cons_id, self.snapshots.get(cons_id), snapshot))
+            self.snapshots[cons_id] = snapshot
+        for cons_id in removed:
+            events.extend(diff_constituency(cons_id, self.snapshots.pop(cons_id, None), None))
+        self.fingerprints = fingerprints
+        self.stats['changed_units'] += len(changed) + len(removed)
+
+        for event in events:
+            event['poll_id'] = self.poll_id
+            if source_time:
+                event['source_time'] = source_time
+            self._emit(event, started)
+        return events
+
+    def poll(self) -> List[Dict]:
+        """poll หนึ่งรอบ คืน event ที่เกิดขึ้น"""
+        started = time.perf_counter()
+        self.poll_id += 1
+        self.stats['polls'] += 1
+        result = self.fetcher.fetch_one(self.endpoint)
+        if not result.ok:
+            self.stats['errors'] += 1
+            print(f"  ❌ poll #{self.poll_id} ล้มเหลว: {result.error}")
+            return []
+        if result.data is None:
+            self.stats['not_modified'] += 1
+            return []
+        body_hash = hashlib.sha1(result.data).hexdigest()
+        if body_hash == self.body_hash:
+            self.fetcher.commit()
+            self.stats['unchanged'] += 1
+            return []
+        try:
+            stats = json.loads(result.data)
+        except ValueError as e:
+            self.fetcher.pending = None
+            self.stats['errors'] += 1
+            print(f"  ❌ poll #{self.poll_id} JSON ไม่ถูกต้อง: {e}")
+            return []
+        self.fetcher.commit()
+
+        source_time = None
+        if self.fetcher.last_modified:
+            try:
+                source_time = parsedate_to_datetime(self.fetcher.last_modified).isoformat()
+            except (TypeError, ValueError):
+                source_time = None
+        events = self.apply(stats, started, source_time)
+        if self.history is not None:
+            self.history.add(stats, source_time=source_time)
+        self.body_hash = body_hash
+        self._save_state()
+        return events
+
+    def latency_summary(self) -> Dict:
+        """สรุป latency (ms) จาก poll เริ่มต้นถึงเขียน event"""
+        if not self.latencies:
+            return {'count': 0}
+        s = sorted(self.latencies)
+        p50, p95 = interpolated_quantiles(s, (0.5, 0.95))
+        return {'count': len(s), 'p50_ms': round(p50, 3), 'p95_ms': round(p95, 3), 'max_ms': s[-1]}
+
+    # --- daemon ---
+
+    def stop(self):
+        self._stop.set()
+
+    def _safe_poll(self) -> List[Dict]:
+        """
+        poll() ที่ไม่ล้ม daemon: error ใดๆ (เครือข่าย, JSON, เขียน sink/history ไม่ได้) นับใน stats['errors']
+        แล้วคืนสถานะก่อน poll (fingerprints, snapshots, validators) เพื่อให้รอบถัดไปตรวจการเปลี่ยนแปลงเดิมซ้ำ
+        """
+        saved = (self.fingerprints, dict(self.snapshots), self.body_hash,
+                 self.fetcher.etag, self.fetcher.last_modified)
+        try:
+            return self.poll()
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"  ❌ poll #{self.poll_id} ล้มเหลว: {type(e).__name__}: {e}")
+            (self.fingerprints, self.snapshots, self.body_hash,
+             self.fetcher.etag, self.fetcher.last_modified) = saved
+            self.fetcher.pending = None
+            return []
+
+    def run(self, max_polls: Optional[int] = None):
+        """poll ทุก interval วินาที จนกว่าจะ stop() / Ctrl-C / ครบ max_polls"""
+        print(f"👀 เริ่มเฝ้าดู {self.url} ทุก {self.interval:g} วินาที -> {self.sink.path}")
+        next_at = time.monotonic()
+        polls = 0
+        try:
+            while not self._stop.is_set():
+                events = self._safe_poll()
+                polls += 1
+                if events:
+                    print(f"  🔔 poll #{self.poll_id}: {len(events)} event")
+                if max_polls is not None and polls >= max_polls:
+                    break
+                next_at += self.interval
+                now = time.monotonic()
+                if now >= next_at:
+                    # poll ใช้เวลานานกว่า interval: เริ่มรอบถัดไปทันทีและไม่ไล่ตามรอบที่พลาด
+                    self.stats['overruns'] += 1
+                    next_at = now
+                self._stop.wait(next_at - now)
+        except KeyboardInterrupt:
+            print("\n⏹️  หยุดเฝ้าดู")
+        finally:
+            self.sink.close()
+        print(f"  สถิติ: {self.stats}")
+        print(f"  latency: {self.latency_summary()}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="เฝ้าดูการเปลี่ยนแปลงผล กกต. (stats_cons.json)")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                        help="วินาทีระหว่างแต่ละรอบ (ค่าเริ่มต้น 300)")
+    parser.add_argument("--events", default=EVENTS_PATH, help="ไฟล์ JSONL สำหรับ event")
+    parser.add_argument("--once", action="store_true", help="poll รอบเดียวแล้วจบ")
+    parser.add_argument("--max-polls", type=int, default=None)
+    parser.add_argument("--history", action="store_true",
+                        help="บันทึก stats_cons ลงประวัติ .cache/ect_history.sqlite ด้วย")
+    args = parser.parse_args()
+
+    history = None
+    if args.history:
+        history = SnapshotStore()
+    try:
+        monitor = ECTMonitor(interval=args.interval, events_path=args.events, history=history)
+        monitor.run(1 if args.once else args.max_polls)
+    finally:
+        if history is not None:
+            history.close()
@@ -11,6 +11,8 @@ from datetime import datetime
 from typing import Dict, List, Any
 import numpy as np
 
+from regression_detector import SnapshotArrays, detect_regressions
+
 class ElectionDataVerifier:
     """คลาสหลักสำหรับตรวจสอบข้อมูลการเลือกตั้ง"""
     
@@ -123,7 +125,34 @@ class ElectionDataVerifier:
                 print(f"  Step 2: {item['step2_value']}")
         
         return inconsistencies
-    
+
+    def detect_regressions(self, snapshots, times: List[str] = None, cons_map: Dict = None) -> List[Dict]:
+        """
+        ตรวจลำดับ snapshot ของ stats_cons.json ทั้งชุด (ดู regression_detector)
+        - คะแนน / turn_out / counted_vote_stations ที่ลดลง
+        - คะแนนที่เพิ่มมากเกินกว่าหน่วยที่นับเพิ่ม
+        - คะแนนต่อหน่วยที่ผิดปกติเทียบกับประวัติของเขตเดียวกัน
+
+        snapshots: list ของ stats_cons (เรียงตามเวลา) หรือ SnapshotStore
+        """
+        if isinstance(snapshots, list):
+            arrays = SnapshotArrays.from_snapshots(snapshots, times)
+        else:
+            arrays = SnapshotArrays.from_store(snapshots)
+        flags = detect_regressions(arrays, cons_map=cons_map)
+
+        print(f"\n=== ตรวจ {len(arrays)} snapshot, {len(arrays.cons_ids)} เขต: พบความผิดปกติ {len(flags)} รายการ ===")
+        for flag_type, count in flags['type'].value_counts().items():
+            print(f"  {flag_type}: {count}")
+
+        self.audit_trail.append({
+            'check': 'regressions',
+            'timestamp': datetime.now().isoformat(),
+            'snapshots': len(arrays),
+            'flags': len(flags)
+        })
+        return flags.to_dict('records')
+
     def analyze_timing_anomalies(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         วิเคราะห์ความผิดปกติของเวลาในการส่งข้อมูล
@@ -9,6 +9,7 @@ import os
 from datetime import datetime
 import pandas as pd
 from vote62_comparator import Vote62Comparator, DiscrepancyLevel
+from ect_monitor import ECTMonitor
 
 
 def example_1_single_unit():
@@ -103,7 +104,8 @@ def example_3_province_wide():
     print("ตัวอย่างที่ 3: ตรวจสอบระดับจังหวัด")
     print("="*80)
     
-    comparator = Vote62Comparator()
+    # หน่วยจำนวนมาก: ดึงข้อมูลพร้อมกัน 16 thread แต่ไม่เกิน 8 request ต่อ server
+    comparator = Vote62Comparator(max_workers=16, per_host_limit=8)
     
     # โหลดรายการหน่วยทั้งหมดจากไฟล์ (ควรเตรียมไฟล์ CSV ไว้)
     # Format: unit_id,constituency
@@ -124,8 +126,9 @@ def example_3_province_wide():
         
         print(f"📊 พบ {len(unit_ids)} หน่วยเลือกตั้ง")
         
-        # เปรียบเทียบทั้งหมด
-        results_df = comparator.batch_compare(unit_ids, constituencies)
+        # เปรียบเทียบทั้งหมด (ถ้าถูกขัดจังหวะ รันใหม่จะทำต่อจาก checkpoint)
+        results_df = comparator.batch_compare(unit_ids, constituencies,
+                                              checkpoint="province_units.checkpoint.jsonl")
         
         # สร้างรายงานสรุป
         comparator.print_summary()
@@ -228,14 +231,19 @@ def example_5_realtime_monitoring():
     print("  - การตรวจจับการทุจริตแบบทันที")
     
     print("\n⏱️  รูปแบบการทำงาน:")
-    print("  1. ตรวจสอบข้อมูลใหม่ทุก 5 นาที")
-    print("  2. เปรียบเทียบกับข้อมูลครั้งก่อน")
-    print("  3. แจ้งเตือนหากพบการเปลี่ยนแปลง")
-    
-    print("\n⚠️  หมายเหตุ: ฟีเจอร์นี้ต้องการการพัฒนาเพิ่มเติม")
-    print("  - WebSocket connection")
-    print("  - Database สำหรับเก็บประวัติ")
-    print("  - Alert system (Email, LINE, etc.)")
+    print("  1. ตรวจสอบข้อมูลใหม่ทุก 5 นาที (conditional GET ถ้าไม่เปลี่ยนได้ 304)")
+    print("  2. เปรียบเทียบกับข้อมูลครั้งก่อนเฉพาะเขตที่ hash เปลี่ยน")
+    print("  3. บันทึก event (คะแนนเพิ่ม/ลด, หน่วยที่นับแล้วลดลง, pause_report) ลงไฟล์ JSONL")
+    print("\n(กด Ctrl-C เพื่อหยุด)")
+    
+    def alert(event):
+        if event['type'] in ('votes_decreased', 'counted_stations_backward'):
+            print(f"  🚨 {event['cons_id']}: {event['type']} ({event.get('delta')})")
+        else:
+            print(f"  🔔 {event['cons_id']}: {event['type']}")
+    
+    monitor = ECTMonitor(interval=300, on_event=alert)
+    monitor.run()
 
 
 def main():
@@ -248,7 +256,7 @@ def main():
     print("2. ตรวจสอบทั้งเขตเลือกตั้ง")
     print("3. ตรวจสอบระดับจังหวัด")
     print("4. สืบสวนหน่วยที่มีข่าวลือ")
-    print("5. การติดตามแบบ Real-time (Coming soon)")
+    print("5. การติดตามแบบ Real-time")
     print("0. ออก")
     
     choice = input("\nกรุณาเลือก (0-5): ").strip()
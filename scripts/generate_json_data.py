@@ -10,6 +10,8 @@ from typing import List, Dict
 import sys
 import os
 
+import columnar_store
+
 # Import comparator
 try:
     from vote62_comparator import Vote62Comparator, DiscrepancyLevel
@@ -123,8 +125,8 @@ class JSONDataGenerator:
         
         return data
     
-    def save_json(self, data: Dict, filename: str):
-        """บันทึกไฟล์ JSON"""
+    def save_json(self, data: Dict, filename: str, columnar: bool = False):
+        """บันทึกไฟล์ JSON (columnar=True เขียนไฟล์ .ecol + .gz/.br ไว้ข้างกันด้วย)"""
         
         # สร้าง directory ถ้ายังไม่มี
         os.makedirs(self.output_dir, exist_ok=True)
@@ -139,6 +141,11 @@ class JSONDataGenerator:
         # แสดงขนาดไฟล์
         file_size = os.path.getsize(filepath)
         print(f"   ขนาดไฟล์: {file_size:,} bytes ({file_size/1024:.2f} KB)")
+
+        if columnar:
+            for path, size in columnar_store.save(data, columnar_store.columnar_path(filepath)).items():
+                print(f"✅ บันทึกไฟล์: {path}")
+                print(f"   ขนาดไฟล์: {size:,} bytes ({size/1024:.2f} KB)")
     
     def generate_province_data(self) -> Dict[str, Dict]:
         """สร้างข้อมูลแยกตามจังหวัด"""
@@ -205,7 +212,7 @@ class JSONDataGenerator:
         # 1. Main data
         print("\n[1/3] สร้างไฟล์ข้อมูลหลัก...")
         main_data = self.generate_main_data()
-        self.save_json(main_data, "election_data.json")
+        self.save_json(main_data, "election_data.json", columnar=True)
         
         # 2. Province data
         print("\n[2/3] สร้างไฟล์ข้อมูลรายจังหวัด...")
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+สถิติรายกลุ่มของอัตรา (ทั้งประเทศ / ภาค / จังหวัด / พรรคผู้ชนะ) ในรอบเดียว
+
+เรียงค่าตาม (กลุ่ม, ค่า) ครั้งเดียว แล้วตัดเป็นช่วงต่อกลุ่ม (sort-and-segment):
+  - count / mean / sample stdev ด้วย bincount
+  - quantile แบบ linear interpolation (สูตรเดียวกับ rate_stats.interpolated_quantiles)
+    หยิบจากตำแหน่ง start + (n - 1) * p ของทุกกลุ่มพร้อมกัน
+  - IQR fences แล้วเทียบแต่ละหน่วยกับกลุ่มของตัวเอง (peer group)
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# ภาคตามการแบ่ง 6 ภาคทางภูมิศาสตร์ (prov_id -> ภาค)
+REGIONS = {
+    'เหนือ': ('CMI', 'CRI', 'LPG', 'LPN', 'MSN', 'NAN', 'PYO', 'PRE', 'UTT'),
+    'ตะวันออกเฉียงเหนือ': ('ACR', 'BKN', 'BRM', 'CPM', 'KSN', 'KKN', 'LEI', 'MKM', 'MDH', 'NPM',
+                            'NMA', 'NBP', 'NKI', 'RET', 'SNK', 'SRN', 'SSK', 'UBN', 'UDN', 'YST'),
+    'กลาง': ('ATG', 'AYA', 'BKK', 'CNT', 'KPT', 'LRI', 'NYK', 'NBI', 'NSN', 'NPT', 'PTE',
+             'PCT', 'PLK', 'PNB', 'SPK', 'SKM', 'SKN', 'SBR', 'STI', 'SPB', 'SRI', 'UTI'),
+    'ตะวันออก': ('CCO', 'CBI', 'CTI', 'PRI', 'RYG', 'SKW', 'TRT'),
+    'ตะวันตก': ('KRI', 'PBI', 'PKN', 'RBR', 'TAK'),
+    'ใต้': ('CPN', 'KBI', 'NST', 'NWT', 'PTN', 'PNA', 'PLG', 'PKT', 'RNG', 'STN', 'SKA',
+            'SNI', 'TRG', 'YLA'),
+}
+REGION_BY_PROV_ID = {prov_id: region for region, ids in REGIONS.items() for prov_id in ids}
+UNKNOWN_REGION = 'ไม่ทราบภาค'
+
+LEVELS = ('national', 'region', 'province', 'winner_party')
+
+
+def encode(labels) -> Tuple[np.ndarray, List]:
+    """(รหัสกลุ่ม int64, ชื่อกลุ่มตามรหัส) เรียงตามลำดับที่พบครั้งแรก"""
+    labels = np.asarray(labels)
+    uniq, first, inverse = np.unique(labels, return_index=True, return_inverse=True)
+    rank = np.empty(len(uniq), dtype=np.int64)
+    by_first = np.argsort(first, kind='stable')
+    rank[by_first] = np.arange(len(uniq))
+    return rank[inverse.ravel()], uniq[by_first].tolist()
+
+
+def unit_groupings(cols, idx=None) -> Dict[str, Tuple[np.ndarray, List]]:
+    """
+    การจัดกลุ่มของหน่วยที่ตำแหน่ง idx (None = ทุกหน่วย) ตาม LEVELS
+
+    cols: anomaly_engine.UnitColumns — คืน {level: (รหัสกลุ่ม, ชื่อกลุ่ม)}
+    """
+    if idx is None:
+        idx = np.arange(cols.n)
+    strings = cols.strings
+    out = {'national': (np.zeros(len(idx), dtype=np.int64), ['ทั้งประเทศ'])}
+
+    prov_codes, prov_first = np.unique(cols.prov_id[idx], return_inverse=True)
+    region_of = np.array([REGION_BY_PROV_ID.get(strings[c], UNKNOWN_REGION) for c in prov_codes.tolist()],
+                         dtype=object)
+    out['region'] = encode(region_of[prov_first.ravel()].astype(str))
+
+    codes, labels = encode(cols.province[idx])
+    out['province'] = (codes, [strings[c] for c in labels])
+    codes, labels = encode(cols.winner[idx])
+    out['winner_party'] = (codes, [strings[c] for c in labels])
+    return out
+
+
+class GroupedStats:
+    """
+    สถิติของค่าหนึ่งชุดแยกตามกลุ่ม (array ยาว n_groups ทุกตัว)
+
+    >>> gs = GroupedStats(rate.values, prov_codes, labels=prov_names)
+    >>> gs.mean, gs.stdev, gs.q1, gs.median, gs.q3, gs.upper_fence
+    >>> z, below, above = gs.flags()       # เทียบแต่ละค่ากับกลุ่มของตัวเอง
+
+    กลุ่มที่ไม่มีค่า: mean/stdev = 0, quantile/fence = NaN
+    """
+
+    def __init__(self, values, groups, n_groups: Optional[int] = None,
+                 labels: Optional[Sequence] = None, k: float = 1.5):
+        self.values = np.asarray(values, dtype=np.float64)
+        self.groups = np.asarray(groups, dtype=np.int64)
+        if n_groups is None:
+            n_groups = len(labels) if labels is not None else int(self.groups.max()) + 1 if len(self.groups) else 0
+        self.n_groups = n_groups
+        self.labels = list(labels) if labels is not None else list(range(n_groups))
+
+        self.count = np.bincount(self.groups, minlength=n_groups)
+        self.ends = np.cumsum(self.count)
+        self.starts = self.ends - self.count
+        # เรียงตามค่าก่อน แล้วเรียงตามกลุ่มแบบ stable (radix sort เมื่อรหัสกลุ่มพอดี uint16)
+        order = np.argsort(self.values)
+        by_group = self.groups[order]
+        if n_groups <= np.iinfo(np.uint16).max:
+            by_group = by_group.astype(np.uint16)
+        self.order = order[np.argsort(by_group, kind='stable')]
+        self.sorted = self.values[self.order]
+
+        has = self.count > 0
+        total = np.bincount(self.groups, weights=self.values, minlength=n_groups)
+        self.mean = np.where(has, total / np.where(has, self.count, 1), 0.0)
+        dev = self.values - self.mean[self.groups]
+        m2 = np.bincount(self.groups, weights=dev * dev, minlength=n_groups)
+        many = self.count > 1
+        self.stdev = np.where(many, np.sqrt(m2 / np.where(many, self.count - 1, 1)), 0.0)
+
+        self.min = self._at(self.starts)
+        self.max = self._at(self.ends - 1)
+        self.q1, self.median, self.q3 = self.quantiles((0.25, 0.50, 0.75))
+        self.iqr = self.q3 - self.q1
+        self.lower_fence = self.q1 - k * self.iqr
+        self.upper_fence = self.q3 + k * self.iqr
+
+    def _at(self, pos):
+        has = self.count > 0
+        if not len(self.sorted):
+            return np.full(self.n_groups, np.nan)
+        return np.where(has, self.sorted[np.where(has, pos, 0)], np.nan)
+
+    def quantiles(self, ps) -> List[np.ndarray]:
+        """Quantiles แบบ linear interpolation ของทุกกลุ่ม (หนึ่ง array ต่อ p)"""
+        out = []
+        n1 = np.maximum(self.count - 1, 0)
+        for p in ps:
+            k = n1 * p
+            f = np.floor(k).astype(np.int64)
+            c = np.ceil(k).astype(np.int64)
+            lo = self._at(self.starts + f)
+            hi = self._at(self.starts + c)
+            out.append(np.where(f == c, lo, lo * (c - k) + hi * (k - f)))
+        return out
+
+    def flags(self, values=None, groups=None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(z-score, ต่ำกว่า lower fence, สูงกว่า upper fence) ของแต่ละค่าเทียบกับกลุ่มของตัวเอง"""
+        values = self.values if values is None else np.asarray(values, dtype=np.float64)
+        groups = self.groups if groups is None else np.asarray(groups, dtype=np.int64)
+        sd = self.stdev[groups]
+        z = np.where(sd > 0, (values - self.mean[groups]) / np.where(sd > 0, sd, 1), 0.0)
+        return z, values < self.lower_fence[groups], values > self.upper_fence[groups]
+
+    def members(self, g: int) -> np.ndarray:
+        """ตำแหน่งของค่าในกลุ่ม g (เรียงตามค่า)"""
+        return self.order[self.starts[g]:self.ends[g]]
+
+    def __len__(self):
+        return self.n_groups
+
+    def row(self, g: int) -> Dict:
+        """สรุปของกลุ่มที่ g"""
+        return {
+            'group': self.labels[g],
+            'count': int(self.count[g]),
+            'mean': float(self.mean[g]),
+            'stdev': float(self.stdev[g]),
+            'min': float(self.min[g]),
+            'q1': float(self.q1[g]),
+            'median': float(self.median[g]),
+            'q3': float(self.q3[g]),
+            'max': float(self.max[g]),
+            'lower_fence': float(self.lower_fence[g]),
+            'upper_fence': float(self.upper_fence[g]),
+        }
+
+    def rows(self, min_count: int = 1) -> List[Dict]:
+        return [self.row(g) for g in np.flatnonzero(self.count >= min_count).tolist()]
+
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+สร้าง histogram ด้วย binary search (searchsorted) แทนการวนทุกค่าต่อทุก bin
+รองรับ bin แบบกำหนดเอง และแบบปรับตามข้อมูล (Freedman–Diaconis, quantile bins)
+
+ขอบ bin: bin i นับค่า lo <= v < hi ยกเว้น bin สุดท้ายที่นับ lo <= v <= hi
+ค่าที่อยู่นอกช่วงขอบทั้งหมดไม่ถูกนับ (เหมือน build_histogram เดิม)
+
+freedman_diaconis_edges / quantile_edges เป็น API สำหรับผู้เรียกที่อยากได้ bin ตามข้อมูล
+(เช่นวิเคราะห์เฉพาะกิจใน notebook) — analyze_anomalies ใช้ bin คงที่เพื่อให้ dashboard เทียบข้ามรอบได้
+ขอบล่างสุดปัดลงและขอบบนสุดปัดขึ้นตาม ndigits จึงครอบทุกค่าเสมอ
+"""
+
+import numpy as np
+
+from rate_stats import interpolated_quantiles
+
+
+def bin_labels(edges, unit='%'):
+    """ป้ายชื่อ bin แบบ '<lo>-<hi>%'"""
+    return [f'{lo}-{hi}{unit}' for lo, hi in zip(edges[:-1], edges[1:])]
+
+
+def bin_counts(values, edges):
+    """
+    นับจำนวนค่าในแต่ละ bin จากค่าที่ยังไม่เรียง — O(n log b)
+
+    แต่ละค่าหา bin ของตัวเองด้วย searchsorted บนขอบ bin
+    """
+    values = np.asarray(values, dtype=np.float64)
+    e = np.asarray(edges, dtype=np.float64)
+    n_bins = len(e) - 1
+    pos = np.searchsorted(e, values, side='right') - 1
+    # ค่าที่เท่ากับขอบบนสุดพอดีนับเข้า bin สุดท้าย
+    pos[values == e[-1]] = n_bins - 1
+    inside = (pos >= 0) & (pos < n_bins)
+    return np.bincount(pos[inside], minlength=n_bins)[:n_bins]
+
+
+def sorted_bin_counts(sorted_values, edges):
+    """นับจำนวนค่าในแต่ละ bin จากค่าที่เรียงแล้ว — O(b log n)"""
+    e = np.asarray(edges, dtype=np.float64)
+    left = np.searchsorted(sorted_values, e, side='left')
+    counts = np.diff(left)
+    if len(counts):
+        counts[-1] += np.searchsorted(sorted_values, e[-1], side='right') - left[-1]
+    return counts
+
+
+def build_histogram(values, bins):
+    """สร้าง histogram data (labels + counts) จากค่าที่ยังไม่เรียง"""
+    return {'labels': bin_labels(bins), 'counts': bin_counts(values, bins).tolist()}
+
+
+def freedman_diaconis_edges(sorted_values, max_bins=100, ndigits=2):
+    """ขอบ bin ตามกฎ Freedman–Diaconis: ความกว้าง = 2·IQR / n^(1/3)"""
+    s = sorted_values
+    n = len(s)
+    if n == 0:
+        return [0, 0]
+    lo = _round_down(float(s[0]), ndigits)
+    hi = _round_up(float(s[-1]), ndigits)
+    q1, q3 = interpolated_quantiles(s, (0.25, 0.75))
+    width = 2 * (q3 - q1) / n ** (1 / 3)
+    if width <= 0 or hi <= lo:
+        return [lo, hi]
+    n_bins = min(max_bins, max(1, int(np.ceil((hi - lo) / width))))
+    inner = [round(float(e), ndigits) for e in np.linspace(lo, hi, n_bins + 1)[1:-1]]
+    return _increasing([lo] + inner + [hi])
+
+
+def quantile_edges(sorted_values, n_bins=10, ndigits=2):
+    """ขอบ bin ที่แบ่งข้อมูลให้แต่ละ bin มีจำนวนใกล้เคียงกัน (ตัดขอบซ้ำออก)"""
+    s = sorted_values
+    if len(s) == 0:
+        return [0, 0]
+    qs = interpolated_quantiles(s, [i / n_bins for i in range(n_bins + 1)])
+    inner = [round(q, ndigits) for q in qs[1:-1]]
+    edges = _increasing([_round_down(qs[0], ndigits)] + inner + [_round_up(qs[-1], ndigits)])
+    if len(edges) == 1:
+        edges.append(edges[0])
+    return edges
+
+
+def _round_down(x, ndigits):
+    """ปัดลงที่ ndigits ตำแหน่ง (ผลไม่เกิน x เสมอ)"""
+    r = round(x, ndigits)
+    return r if r <= x else round(r - 10 ** -ndigits, ndigits)
+
+
+def _round_up(x, ndigits):
+    """ปัดขึ้นที่ ndigits ตำแหน่ง (ผลไม่น้อยกว่า x เสมอ)"""
+    r = round(x, ndigits)
+    return r if r >= x else round(r + 10 ** -ndigits, ndigits)
+
+
+def _increasing(edges):
+    """ตัดขอบที่ไม่มากกว่าขอบก่อนหน้าออก (ขอบบนสุดคงไว้เสมอ)"""
+    out = [edges[0]]
+    for e in edges[1:-1]:
+        if out[-1] < e < edges[-1]:
+            out.append(e)
+    if edges[-1] > out[-1]:
+        out.append(edges[-1])
+    return out
+
+
+class SortedSample:
+    """
+    ค่าชุดเดียวที่เรียงไว้ครั้งเดียว แล้วสร้างได้หลาย histogram
+
+    >>> sample = SortedSample(rates)
+    >>> sample.histogram([0, 1, 2, 5])
+    >>> sample.histogram(sample.freedman_diaconis_edges())
+    """
+
+    def __init__(self, values, presorted=False):
+        values = np.asarray(values, dtype=np.float64)
+        self.sorted = values if presorted else np.sort(values)
+
+    def __len__(self):
+        return len(self.sorted)
+
+    def counts(self, edges):
+        return sorted_bin_counts(self.sorted, edges)
+
+    def histogram(self, edges, unit='%'):
+        return {'labels': bin_labels(edges, unit), 'counts': self.counts(edges).tolist()}
+
+    def histograms(self, named_edges, unit='%'):
+        """หลาย histogram บนข้อมูลชุดเดียว: {name: edges} -> {name: histogram}"""
+        return {name: self.histogram(edges, unit) for name, edges in named_edges.items()}
+
+    def freedman_diaconis_edges(self, max_bins=100, ndigits=2):
+        return freedman_diaconis_edges(self.sorted, max_bins, ndigits)
+
+    def quantile_edges(self, n_bins=10, ndigits=2):
+        return quantile_edges(self.sorted, n_bins, ndigits)
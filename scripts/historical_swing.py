@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+เปรียบเทียบผลปัจจุบันกับการเลือกตั้งครั้งก่อนหลายครั้งพร้อมกัน (swing รายพรรค + turnout)
+
+แหล่งข้อมูลใน data/history/:
+  - <election>.json : รูปแบบเดียวกับ election_data.json (units + candidates)
+  - <election>.csv  : แบบยาว constituency_id, party, votes[, turn_out, registered_vote, valid_votes]
+  - boundary_map.csv: election, old_id, new_id, weight — แบ่งเขต: คะแนนของเขตเดิมกระจายไปเขตปัจจุบัน
+                      ตามสัดส่วน weight (เขตที่ไม่อยู่ในตาราง = id เดิม)
+
+ElectionHistory:
+  - joined(): DataFrame กว้าง index = constituency_id (เขตปัจจุบัน), columns = (election, kind, name)
+    kind = 'total' (turn_out / registered_vote / valid_votes) หรือ 'votes' (ชื่อพรรค)
+    cache ไว้ใน .cache/history/ ตาม hash ของไฟล์ต้นทาง รอบถัดไปไม่ต้องอ่าน/map/merge ใหม่
+  - swings(units): ส่วนแบ่งคะแนนรายพรรคและ turnout ของทุกการเลือกตั้งเทียบกับปัจจุบัน
+    ในรอบเดียวบน array (election × เขต × พรรค)
+
+CLI:
+  python historical_swing.py                       # เทียบ election_data.json กับทุกไฟล์ใน data/history/
+  python historical_swing.py --elections 2562 2566 --top 30
+"""
+
+import glob
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from robust_outliers import MAD_THRESHOLD, mad_scores
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(SCRIPT_DIR, '..', 'data')
+HISTORY_DIR = os.path.join(DATA_DIR, 'history')
+CACHE_DIR = os.path.join(SCRIPT_DIR, '..', '.cache', 'history')
+BOUNDARY_MAP = 'boundary_map.csv'
+CACHE_VERSION = 1
+
+TOTAL_FIELDS = ('turn_out', 'registered_vote', 'valid_votes')
+
+
+def _write_atomic_pickle(obj, path):
+    tmp = f'{path}.tmp{os.getpid()}'
+    pd.to_pickle(obj, tmp)
+    os.replace(tmp, path)
+
+
+def frames_from_units(units: Sequence[Dict]):
+    """(คะแนนแบบยาว [constituency_id, party, votes], ยอดรวมต่อเขต index = constituency_id) จาก unit dicts"""
+    rows = [(u['unit_id'], c.get('party', ''), c.get('ect_votes', c.get('votes', 0)) or 0)
+            for u in units for c in u.get('candidates', [])]
+    votes = pd.DataFrame(rows, columns=['constituency_id', 'party', 'votes'])
+    totals = pd.DataFrame(
+        [[u.get(f) or 0 for f in TOTAL_FIELDS] for u in units],
+        index=pd.Index([u['unit_id'] for u in units], name='constituency_id'),
+        columns=list(TOTAL_FIELDS), dtype=np.float64)
+    return votes, totals
+
+
+def frames_from_csv(path: str):
+    """ไฟล์ CSV แบบยาว: ยอดรวมต่อเขตใช้ค่าแรกของแต่ละเขต (valid_votes ว่าง = ผลรวมคะแนนพรรค)"""
+    df = pd.read_csv(path, dtype={'constituency_id': str, 'party': str})
+    votes = df[['constituency_id', 'party', 'votes']].copy()
+    votes['votes'] = votes['votes'].fillna(0)
+    totals = df.groupby('constituency_id', sort=False).first().reindex(columns=list(TOTAL_FIELDS))
+    summed = votes.groupby('constituency_id', sort=False)['votes'].sum()
+    totals['valid_votes'] = totals['valid_votes'].fillna(summed)
+    return votes, totals.fillna(0).astype(np.float64)
+
+
+def remap(votes: pd.DataFrame, totals: pd.DataFrame, mapping: Optional[pd.DataFrame]):
+    """ย้ายคะแนนและยอดรวมจากเขตเดิมไปเขตปัจจุบันตาม boundary mapping (old_id, new_id, weight)"""
+    if mapping is None or mapping.empty:
+        return votes, totals
+    m = mapping[['old_id', 'new_id', 'weight']]
+    v = votes.merge(m, how='left', left_on='constituency_id', right_on='old_id')
+    v['constituency_id'] = v['new_id'].fillna(v['constituency_id'])
+    v['votes'] = v['votes'] * v['weight'].fillna(1.0)
+    votes = v.groupby(['constituency_id', 'party'], sort=False, as_index=False)['votes'].sum()
+
+    t = totals.reset_index().merge(m, how='left', left_on='constituency_id', right_on='old_id')
+    t['constituency_id'] = t['new_id'].fillna(t['constituency_id'])
+    t[list(TOTAL_FIELDS)] = t[list(TOTAL_FIELDS)].mul(t['weight'].fillna(1.0), axis=0)
+    totals = t.groupby('constituency_id', sort=False)[list(TOTAL_FIELDS)].sum()
+    return votes, totals
+
+
+def wide(votes: pd.DataFrame, totals: pd.DataFrame) -> pd.DataFrame:
+    """คอลัมน์ (kind, name) ของการเลือกตั้งหนึ่งครั้ง: ('total', field) และ ('votes', party)"""
+    by_party = votes.pivot_table(index='constituency_id', columns='party', values='votes',
+                                 aggfunc='sum', fill_value=0.0)
+    index = totals.index.append(by_party.index.difference(totals.index))
+    return pd.concat({'total': totals.reindex(index), 'votes': by_party.reindex(index, fill_value=0.0)}, axis=1)
+
+
+class SwingResult:
+    """
+    ผลเทียบกับทุกการเลือกตั้ง (array ขนาด E × C × P / E × C)
+
+    share_now: C × P, share_then: E × C × P, swing = share_now - share_then (NaN = เขตไม่มีข้อมูลครั้งนั้น)
+    turnout_now: C, turnout_then: E × C, turnout_delta = turnout_now - turnout_then
+    """
+
+    def __init__(self, elections, ids, parties, share_now, share_then, turnout_now, turnout_then):
+        self.elections = list(elections)
+        self.ids = list(ids)
+        self.parties = list(parties)
+        self.share_now = share_now
+        self.share_then = share_then
+        self.swing = share_now[None, :, :] - share_then
+        self.turnout_now = turnout_now
+        self.turnout_then = turnout_then
+        self.turnout_delta = turnout_now[None, :] - turnout_then
+
+    def party_summary(self) -> pd.DataFrame:
+        """swing เฉลี่ย / มัธยฐานทั้งประเทศต่อ (election, party)"""
+        with np.errstate(invalid='ignore'):
+            mean = np.nanmean(self.swing, axis=1) if self.swing.size else np.zeros((len(self.elections), 0))
+            median = np.nanmedian(self.swing, axis=1) if self.swing.size else mean
+        idx = pd.MultiIndex.from_product([self.elections, self.parties], names=['election', 'party'])
+        return pd.DataFrame({'mean_swing': mean.ravel(), 'median_swing': median.ravel()}, index=idx)
+
+    def swing_frame(self, min_share: float = 0.0) -> pd.DataFrame:
+        """แบบยาว: constituency_id, election, party, share_now, share_then, swing, robust_z"""
+        e, c, p = np.meshgrid(np.arange(len(self.elections)), np.arange(len(self.ids)),
+                              np.arange(len(self.parties)), indexing='ij')
+        now = np.broadcast_to(self.share_now[None, :, :], self.swing.shape)
+        keep = ~np.isnan(self.swing) & ((now > min_share) | (self.share_then > min_share))
+        e, c, p = e[keep], c[keep], p[keep]
+        swing = self.swing[keep]
+        robust_z = mad_scores(swing, e * len(self.parties) + p)[0]
+        return pd.DataFrame({
+            'constituency_id': np.asarray(self.ids, dtype=object)[c],
+            'election': np.asarray(self.elections, dtype=object)[e],
+            'party': np.asarray(self.parties, dtype=object)[p],
+            'share_now': now[keep],
+            'share_then': self.share_then[keep],
+            'swing': swing,
+            'robust_z': robust_z,
+        })
+
+    def turnout_frame(self) -> pd.DataFrame:
+        """แบบยาว: constituency_id, election, turnout_now, turnout_then, delta, robust_z"""
+        e, c = np.meshgrid(np.arange(len(self.elections)), np.arange(len(self.ids)), indexing='ij')
+        keep = ~np.isnan(self.turnout_delta)
+        e, c = e[keep], c[keep]
+        delta = self.turnout_delta[keep]
+        return pd.DataFrame({
+            'constituency_id': np.asarray(self.ids, dtype=object)[c],
+            'election': np.asarray(self.elections, dtype=object)[e],
+            'turnout_now': self.turnout_now[c],
+            'turnout_then': self.turnout_then[keep],
+            'delta': delta,
+            'robust_z': mad_scores(delta, e)[0],
+        })
+
+    def outliers(self, threshold: float = MAD_THRESHOLD, min_share: float = 1.0,
+                 min_swing: float = 5.0) -> pd.DataFrame:
+        """
+        swing ที่ |robust z| เกิน threshold ภายใน (election, party) เดียวกัน เรียงจากมากไปน้อย
+
+        min_swing: ตัด swing ที่เล็กกว่านี้ (จุด %) — พรรคที่แทบไม่เปลี่ยนมี MAD เล็กมากจน z สูงเกินจริง
+        """
+        df = self.swing_frame(min_share)
+        df = df[(df['robust_z'].abs() > threshold) & (df['swing'].abs() >= min_swing)]
+        return df.reindex(df['robust_z'].abs().sort_values(ascending=False).index)
+
+
+class ElectionHistory:
+    """
+    คลังผลการเลือกตั้งครั้งก่อน (ต่อเขตปัจจุบัน) + cache ของตารางที่ join แล้ว
+
+    >>> history = ElectionHistory()                 # อ่าน data/history/
+    >>> result = history.swings(units)              # units ของ election_data.json
+    >>> result.outliers().head(20)
+    """
+
+    def __init__(self, history_dir: str = HISTORY_DIR, cache_dir: Optional[str] = CACHE_DIR):
+        self.history_dir = history_dir
+        self.cache_dir = cache_dir
+        self.sources = {}
+        for path in sorted(glob.glob(os.path.join(history_dir, '*.json')) +
+                           glob.glob(os.path.join(history_dir, '*.csv'))):
+            name = os.path.splitext(os.path.basename(path))[0]
+            if os.path.basename(path) != BOUNDARY_MAP:
+                self.sources[name] = path
+        mapping_path = os.path.join(history_dir, BOUNDARY_MAP)
+        self.mapping_path = mapping_path if os.path.exists(mapping_path) else None
+        self._frames = {}
+        self._joined = None
+
+    @property
+    def elections(self) -> List[str]:
+        return list(self.sources) + [name for name in self._frames if name not in self.sources]
+
+    def add(self, name: str, units: Sequence[Dict], mapping: Optional[pd.DataFrame] = None):
+        """เพิ่มการเลือกตั้งจาก unit dicts ในหน่วยความจำ (ไม่ผ่าน cache บนดิสก์)"""
+        votes, totals = frames_from_units(units)
+        self._frames[name] = wide(*remap(votes, totals, mapping))
+        self._joined = None
+
+    def _cache_key(self) -> str:
+        h = hashlib.sha1(f'v{CACHE_VERSION}'.encode())
+        for path in list(self.sources.values()) + ([self.mapping_path] if self.mapping_path else []):
+            st = os.stat(path)
+            h.update(f'{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}'.encode('utf-8'))
+        return h.hexdigest()[:16]
+
+    def _load_sources(self) -> Dict[str, pd.DataFrame]:
+        mapping = pd.read_csv(self.mapping_path, dtype={'election': str, 'old_id': str, 'new_id': str}) \
+            if self.mapping_path else None
+        frames = {}
+        for name, path in self.sources.items():
+            if path.endswith('.csv'):
+                votes, totals = frames_from_csv(path)
+            else:
+                with open(path, 'r', encoding='utf-8') as f:
+                    votes, totals = frames_from_units(json.load(f)['units'])
+            m = mapping[mapping['election'] == name] if mapping is not None else None
+            frames[name] = wide(*remap(votes, totals, m))
+        return frames
+
+    def joined(self, refresh: bool = False) -> pd.DataFrame:
+        """ตารางกว้างของทุกการเลือกตั้ง (อ่านจาก cache ถ้าไฟล์ต้นทางไม่เปลี่ยน)"""
+        if self._joined is not None and not refresh:
+            return self._joined
+        stored = None
+        cache_path = None
+        if self.sources and self.cache_dir:
+            cache_path = os.path.join(self.cache_dir, f'joined-{self._cache_key()}.pkl')
+            if not refresh and os.path.exists(cache_path):
+                stored = pd.read_pickle(cache_path)
+        if stored is None:
+            frames = self._load_sources()
+            stored = pd.concat(frames, axis=1) if frames else pd.DataFrame()
+            if cache_path:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                for old in glob.glob(os.path.join(self.cache_dir, 'joined-*.pkl')):
+                    os.remove(old)
+                _write_atomic_pickle(stored, cache_path)
+        if self._frames:
+            extra = pd.concat(self._frames, axis=1)
+            stored = pd.concat([stored, extra], axis=1) if len(stored.columns) else extra
+        self._joined = stored
+        return stored
+
+    def swings(self, units: Sequence[Dict], elections: Optional[Sequence[str]] = None) -> SwingResult:
+        """เทียบ units ปัจจุบันกับทุกการเลือกตั้ง (หรือเฉพาะ elections) ในรอบเดียว"""
+        joined = self.joined()
+        elections = list(elections) if elections is not None else list(dict.fromkeys(
+            joined.columns.get_level_values(0))) if len(joined.columns) else []
+        current = wide(*frames_from_units(units))
+        ids = current.index
+
+        parties = list(current['votes'].columns)
+        for name in elections:
+            parties.extend(p for p in joined[name]['votes'].columns if p not in parties)
+
+        def shares(frame):
+            votes = frame['votes'].reindex(index=ids, columns=parties).to_numpy(dtype=np.float64)
+            totals = frame['total'].reindex(ids)
+            valid = totals['valid_votes'].to_numpy(dtype=np.float64)
+            registered = totals['registered_vote'].to_numpy(dtype=np.float64)
+            turn_out = totals['turn_out'].to_numpy(dtype=np.float64)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                share = np.where(valid[:, None] > 0, votes / valid[:, None] * 100, np.nan)
+                turnout = np.where(registered > 0, turn_out / registered * 100, np.nan)
+            # พรรคที่ไม่ได้ส่งในเขตที่มีข้อมูล = 0%
+            share = np.where(np.isnan(share) & (valid[:, None] > 0), 0.0, share)
+            return share, turnout
+
+        share_now, turnout_now = shares(current)
+        then = [shares(joined[name].dropna(how='all')) for name in elections]
+        share_then = np.stack([s for s, _ in then]) if then else np.zeros((0,) + share_now.shape)
+        turnout_then = np.stack([t for _, t in then]) if then else np.zeros((0, len(ids)))
+        return SwingResult(elections, ids, parties, share_now, share_then, turnout_now, turnout_then)
+
+
+def main(elections=None, top=20, refresh=False):
+    with open(os.path.join(DATA_DIR, 'election_data.json'), 'r', encoding='utf-8') as f:
+        units = json.load(f)['units']
+    history = ElectionHistory()
+    if not history.sources:
+        print(f'ไม่พบข้อมูลการเลือกตั้งครั้งก่อนใน {HISTORY_DIR}')
+        return None
+    history.joined(refresh=refresh)
+    result = history.swings(units, elections)
+    print(f'เทียบกับ {len(result.elections)} ครั้ง: {", ".join(result.elections)} ({len(result.ids)} เขต)')
+
+    summary = result.party_summary().dropna()
+    for name in result.elections:
+        print(f'\n=== {name} ===')
+        top_parties = summary.loc[name].reindex(
+            summary.loc[name]['mean_swing'].abs().sort_values(ascending=False).index).head(5)
+        for party, row in top_parties.iterrows():
+            print(f'  {party}: swing เฉลี่ย {row["mean_swing"]:+.2f} จุด (มัธยฐาน {row["median_swing"]:+.2f})')
+        delta = result.turnout_delta[result.elections.index(name)]
+        if np.isfinite(delta).any():
+            print(f'  turnout เปลี่ยนเฉลี่ย {np.nanmean(delta):+.2f} จุด')
+
+    outliers = result.outliers()
+    print(f'\nswing ผิดปกติ (|robust z| > {MAD_THRESHOLD}): {len(outliers)} รายการ')
+    if len(outliers):
+        print(outliers.head(top).to_string(index=False))
+    return result
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='เปรียบเทียบ swing กับการเลือกตั้งครั้งก่อน')
+    parser.add_argument('--elections', nargs='*', help='เฉพาะการเลือกตั้งเหล่านี้ (ชื่อไฟล์ใน data/history/)')
+    parser.add_argument('--top', type=int, default=20, help='จำนวน swing ผิดปกติที่แสดง')
+    parser.add_argument('--refresh', action='store_true', help='ไม่ใช้ cache ของตารางที่ join แล้ว')
+    args = parser.parse_args()
+    main(args.elections, args.top, args.refresh)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+HTTP cache บนดิสก์สำหรับไฟล์อ้างอิงของ กกต. ที่แทบไม่เปลี่ยน
+(info_province / info_party_overview / info_constituency / info_mp_candidate)
+
+  - เก็บ body + validators (ETag, Last-Modified) แยกตาม URL
+  - ถ้ายังไม่เกิน max_age ใช้จากดิสก์เลยโดยไม่ต่อเน็ต
+  - ถ้าเกิน ส่ง If-None-Match / If-Modified-Since แล้วใช้ body เดิมเมื่อได้ 304
+  - จำกัดขนาดรวม ลบรายการที่ไม่ได้ใช้นานที่สุดก่อน (LRU)
+"""
+
+import hashlib
+import json
+import os
+import time
+
+import requests
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(SCRIPT_DIR, '..', '.cache', 'http')
+
+
+def _write_atomic(path, data):
+    tmp = f'{path}.tmp{os.getpid()}'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class HTTPCache:
+    """Cache แบบ conditional GET เก็บไฟล์ <sha256(url)>.body / .meta.json"""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_age=3600, max_bytes=200 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return base + '.body', base + '.meta.json'
+
+    def lookup(self, url):
+        """คืน meta ของ URL ถ้ามีใน cache (และไฟล์ body ยังอยู่)"""
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(body_path):
+            return None
+        return meta
+
+    def is_fresh(self, meta):
+        return time.time() - meta['fetched_at'] < self.max_age
+
+    def conditional_headers(self, meta):
+        headers = {}
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def store(self, url, response):
+        """บันทึก response 200 ลงดิสก์"""
+        body_path, meta_path = self._paths(url)
+        content = response.content
+        now = time.time()
+        meta = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_type': response.headers.get('Content-Type'),
+            'size': len(content),
+            'fetched_at': now,
+            'last_used': now,
+        }
+        _write_atomic(body_path, content)
+        self._write_meta(meta_path, meta)
+        self.evict()
+        return meta
+
+    def _write_meta(self, meta_path, meta):
+        _write_atomic(meta_path, json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+
+    def revalidated(self, url, meta, response):
+        """ได้ 304 — ต่ออายุ entry และอัปเดต validators ถ้า server ส่งมาใหม่"""
+        meta['fetched_at'] = time.time()
+        meta['etag'] = response.headers.get('ETag', meta.get('etag'))
+        meta['last_modified'] = response.headers.get('Last-Modified', meta.get('last_modified'))
+        self._write_meta(self._paths(url)[1], meta)
+
+    def response(self, url, meta, status):
+        """สร้าง requests.Response จาก body บนดิสก์ (status = 200 fresh / 304 revalidated)"""
+        body_path, meta_path = self._paths(url)
+        with open(body_path, 'rb') as f:
+            content = f.read()
+        meta['last_used'] = time.time()
+        self._write_meta(meta_path, meta)
+
+        r = requests.Response()
+        r.status_code = status
+        r.url = url
+        r._content = content
+        r.encoding = 'utf-8'
+        if meta.get('content_type'):
+            r.headers['Content-Type'] = meta['content_type']
+        r.from_cache = 'fresh' if status == 200 else 'revalidated'
+        return r
+
+    def evict(self):
+        """ลบ entry ที่ไม่ได้ใช้นานที่สุดจนขนาดรวมไม่เกิน max_bytes"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.meta.json'):
+                continue
+            meta_path = os.path.join(self.cache_dir, name)
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            entries.append((meta.get('last_used', 0), meta.get('size', 0), meta_path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, meta_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            body_path = meta_path[:-len('.meta.json')] + '.body'
+            for path in (meta_path, body_path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass  # อีก process ลบไปก่อนแล้ว
+            total -= size
+
+    def get(self, session, url, timeout=30):
+        """GET ผ่าน cache: fresh -> จากดิสก์, stale -> conditional GET"""
+        meta = self.lookup(url)
+        if meta and self.is_fresh(meta):
+            return self.response(url, meta, 200)
+        r = session.get(url, timeout=timeout, headers=self.conditional_headers(meta))
+        if r.status_code == 304 and meta:
+            self.revalidated(url, meta, r)
+            return self.response(url, meta, 304)
+        if r.status_code == 200:
+            self.store(url, r)
+        return r
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Accumulator สำหรับสถิติของอัตรา (rate) ที่ใช้ร่วมกันทุก analyzer
+  - count / mean / variance แบบ Welford (รวม chunk ด้วยสูตรของ Chan et al.) — ปิดได้ด้วย moments=False
+  - quantile แบบ exact: เก็บค่าเป็น float64 arrays แล้วเรียงครั้งเดียวเมื่อถูกถาม
+  - quantile แบบประมาณ: KLL sketch ใช้หน่วยความจำจำกัด (สำหรับข้อมูลหลายการเลือกตั้ง/ระดับหน่วย)
+"""
+
+import math
+from array import array
+from fractions import Fraction
+
+import numpy as np
+
+
+def interpolated_quantiles(s, ps):
+    """Quantiles แบบ linear interpolation บน array ที่เรียงแล้ว (array ว่างได้ NaN)"""
+    n = len(s)
+    if n == 0:
+        return [math.nan] * len(ps)
+    out = []
+    for p in ps:
+        k = (n - 1) * p
+        f = math.floor(k)
+        c = math.ceil(k)
+        if f == c:
+            out.append(float(s[int(k)]))
+        else:
+            out.append(float(s[f]) * (c - k) + float(s[c]) * (k - f))
+    return out
+
+
+def scaled_moments(count, total, total_sq, scale=100):
+    """
+    (mean, sample stdev) แบบ exact จากผลรวมจำนวนเต็มของค่าที่คูณ scale แล้ว
+
+    ใช้กับอัตราที่ปัดทศนิยม 2 ตำแหน่ง: เก็บ Σh, Σh² (h = ค่า × 100) เป็น int
+    แล้วเพิ่ม/ลบค่าได้โดยไม่มี rounding error สะสม
+    """
+    if count == 0:
+        return 0.0, 0.0
+    mean = float(Fraction(total, count * scale))
+    if count < 2:
+        return mean, 0.0
+    variance = Fraction(count * total_sq - total * total, count * (count - 1) * scale * scale)
+    return mean, math.sqrt(variance)
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang & Liberty 2016) แบบย่อ
+
+    ชั้น h เก็บค่าที่มีน้ำหนัก 2**h; เมื่อชั้นใดเต็มจะเรียงแล้วเลื่อนค่าเว้นค่า
+    ขึ้นไปชั้นถัดไป หน่วยความจำ ~ O(k log(n/k))
+    """
+
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, h):
+        depth = len(self.levels) - h - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        self.count += len(values)
+        self.levels[0] = np.concatenate((self.levels[0], values))
+        self._compress()
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate((self.levels[h], items))
+        self.count += other.count
+        self._compress()
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if len(items) > self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # ถ้าจำนวนคี่ เก็บค่าแรกไว้ในชั้นเดิม
+                keep = items[:len(items) % 2]
+                rest = items[len(items) % 2:]
+                promoted = rest[self._rng.integers(2)::2]
+                self.levels[h] = keep
+                self.levels[h + 1] = np.concatenate((self.levels[h + 1], promoted))
+            h += 1
+
+    @property
+    def size(self):
+        """จำนวนค่าที่เก็บจริง (หน่วยความจำที่ใช้)"""
+        return sum(len(items) for items in self.levels)
+
+    def quantiles(self, ps):
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** h, dtype=np.float64)
+                                  for h, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        values = values[order]
+        cum = np.cumsum(weights[order])
+        total = cum[-1]
+        ranks = np.asarray(ps, dtype=np.float64) * total
+        pos = np.minimum(np.searchsorted(cum, ranks, side='left'), len(values) - 1)
+        return values[pos].tolist()
+
+
+class RateAccumulator:
+    """
+    สะสมค่าของอัตราหนึ่งตัว แล้วให้ count, mean, variance, quantiles, IQR fences
+
+    >>> acc = RateAccumulator()
+    >>> acc.update(invalid_rates)          # array/list ทั้งก้อน หรือเรียกซ้ำทีละ chunk
+    >>> acc.add(3.25)                      # หรือทีละค่า
+    >>> acc.mean, acc.stdev, acc.quantiles((0.25, 0.5, 0.75))
+
+    approximate=True จะไม่เก็บค่าทั้งหมด แต่ใช้ KLLSketch (ขนาด sketch_k) แทน
+    moments=False ไม่คำนวณ mean/variance (ผู้ใช้มีแหล่งอื่นที่ exact กว่า เช่น scaled_moments)
+    เหลือเฉพาะ count / min / max / ค่าที่เรียงแล้ว / quantiles
+    """
+
+    def __init__(self, approximate=False, sketch_k=200, moments=True):
+        self.count = 0
+        self.moments = moments
+        self.mean = 0.0 if moments else None
+        self.m2 = 0.0 if moments else None
+        self.min = math.inf
+        self.max = -math.inf
+        self.approximate = approximate
+        self._sketch = KLLSketch(sketch_k) if approximate else None
+        self._chunks = []
+        self._pending = array('d')
+        self._sorted = None
+
+    def add(self, value):
+        """เพิ่มทีละค่า (Welford)"""
+        value = float(value)
+        self.count += 1
+        if self.moments:
+            delta = value - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self._pending.append(value)
+        if len(self._pending) >= 4096:
+            self._flush()
+        self._sorted = None
+
+    def update(self, values):
+        """เพิ่มทั้ง chunk แล้วรวม moments แบบ Chan et al."""
+        x = np.asarray(values, dtype=np.float64).ravel()
+        n_b = len(x)
+        if n_b == 0:
+            return self
+        if self.moments:
+            mean_b = float(x.mean())
+            m2_b = float(((x - mean_b) ** 2).sum())
+            if self.count == 0:
+                self.mean, self.m2 = mean_b, m2_b
+            else:
+                n = self.count + n_b
+                delta = mean_b - self.mean
+                self.mean += delta * n_b / n
+                self.m2 += m2_b + delta * delta * self.count * n_b / n
+        self.count += n_b
+        self.min = min(self.min, float(x.min()))
+        self.max = max(self.max, float(x.max()))
+        self._flush()
+        if self.approximate:
+            self._sketch.update(x)
+        else:
+            self._chunks.append(x)
+        self._sorted = None
+        return self
+
+    def merge(self, other):
+        """รวม accumulator อีกตัว (เช่นจากอีก process หรืออีกจังหวัด)"""
+        other._flush()
+        if other.count == 0:
+            return self
+        self._flush()
+        n_a, n_b = self.count, other.count
+        if self.moments and not other.moments:
+            raise ValueError('ไม่สามารถรวม accumulator ที่ไม่มี moments เข้ากับตัวที่มี')
+        if self.moments:
+            if n_a == 0:
+                self.mean, self.m2 = other.mean, other.m2
+            else:
+                n = n_a + n_b
+                delta = other.mean - self.mean
+                self.mean += delta * n_b / n
+                self.m2 += other.m2 + delta * delta * n_a * n_b / n
+        self.count = n_a + n_b
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if self.approximate:
+            if other.approximate:
+                self._sketch.merge(other._sketch)
+            else:
+                for chunk in other._chunks:
+                    self._sketch.update(chunk)
+        else:
+            if other.approximate:
+                raise ValueError('ไม่สามารถรวม sketch แบบประมาณเข้ากับ accumulator แบบ exact')
+            self._chunks.extend(other._chunks)
+        self._sorted = None
+        return self
+
+    def _flush(self):
+        if self._pending:
+            x = np.frombuffer(self._pending, dtype=np.float64).copy()
+            self._pending = array('d')
+            if self.approximate:
+                self._sketch.update(x)
+            else:
+                self._chunks.append(x)
+
+    @property
+    def variance(self):
+        """Sample variance (n - 1)"""
+        if not self.moments:
+            raise ValueError('accumulator นี้สร้างด้วย moments=False')
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stdev(self):
+        return math.sqrt(self.variance)
+
+    def sorted_values(self):
+        """ค่าทั้งหมดที่เรียงแล้ว (เรียงครั้งเดียวแล้ว cache ไว้) — เฉพาะโหมด exact"""
+        if self.approximate:
+            raise ValueError('โหมด approximate ไม่ได้เก็บค่าทั้งหมด')
+        self._flush()
+        if self._sorted is None:
+            if len(self._chunks) > 1:
+                self._chunks = [np.concatenate(self._chunks)]
+            self._sorted = np.sort(self._chunks[0]) if self._chunks else np.empty(0)
+        return self._sorted
+
+    def quantile(self, p):
+        return self.quantiles((p,))[0]
+
+    def quantiles(self, ps):
+        """Quantiles แบบ linear interpolation (accumulator ว่างได้ NaN)"""
+        if self.count == 0:
+            return [math.nan] * len(ps)
+        if self.approximate:
+            self._flush()
+            return self._sketch.quantiles(ps)
+        return interpolated_quantiles(self.sorted_values(), ps)
+
+    def fences(self, k=1.5):
+        """IQR fences: (q1, q3, iqr, lower_fence, upper_fence)"""
+        q1, q3 = self.quantiles((0.25, 0.75))
+        iqr = q3 - q1
+        return q1, q3, iqr, q1 - k * iqr, q3 + k * iqr
+
+    def describe(self):
+        q1, median, q3 = self.quantiles((0.25, 0.5, 0.75))
+        iqr = q3 - q1
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'stdev': self.stdev,
+            'min': self.min,
+            'max': self.max,
+            'q1': q1,
+            'median': median,
+            'q3': q3,
+            'iqr': iqr,
+            'lower_fence': q1 - 1.5 * iqr,
+            'upper_fence': q3 + 1.5 * iqr,
+        }
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+ตรวจจับความผิดปกติตามเวลาในลำดับ snapshot ของ stats_cons.json ด้วย NumPy
+
+  - decrease        : คะแนนผู้สมัคร, turn_out หรือ counted_vote_stations ลดลงจาก snapshot ก่อน
+  - implausible_jump: turn_out เพิ่มมากกว่าที่หน่วยที่นับเพิ่มจะรองรับได้
+                      (หรือเพิ่มทั้งที่ไม่มีหน่วยนับเพิ่มเลย)
+  - rate_outlier    : คะแนนต่อหน่วยที่นับเพิ่ม (Δturn_out / Δstations) ห่างจากค่ากลางของเขตนั้น
+                      ทั้งช่วงเวลา (robust z ด้วย median / MAD) เกิน z_threshold
+
+ข้อมูลถูกจัดเป็น array [snapshot, เขต] และ [snapshot, ผู้สมัคร] แล้วคำนวณทั้งชุดพร้อมกัน
+ค่าที่หายไปใน snapshot ใด (เขตถูกถอดออกชั่วคราว) เทียบกับค่าที่พบล่าสุดก่อนหน้า
+"""
+
+from array import array
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+DECREASE = 'decrease'
+IMPLAUSIBLE_JUMP = 'implausible_jump'
+RATE_OUTLIER = 'rate_outlier'
+
+# จำนวนผู้มีสิทธิต่อหน่วยเลือกตั้งสูงสุดโดยประมาณ (ใช้เมื่อไม่มี cons_map)
+DEFAULT_MAX_VOTES_PER_STATION = 800
+Z_THRESHOLD = 3.5
+MIN_HISTORY = 5
+
+FLAG_COLUMNS = ['type', 'snapshot', 'time', 'cons_id', 'field', 'before', 'after', 'delta',
+                'new_stations', 'limit', 'rate', 'z']
+
+
+class _Scatter:
+    """สะสม (snapshot, คอลัมน์, ค่า) แบบ sparse ก่อนสร้าง array"""
+
+    def __init__(self):
+        self.t = array('q')
+        self.col = array('q')
+        self.value = array('q')
+        self.present = array('b')
+
+    def add(self, t, col, value):
+        self.t.append(t)
+        self.col.append(col)
+        if value is None:
+            self.value.append(0)
+            self.present.append(0)
+        else:
+            self.value.append(int(value))
+            self.present.append(1)
+
+    def dense(self, n_times, n_cols):
+        """array [T, N] เฉพาะจุดที่มีข้อมูล (values, observed, present)"""
+        values = np.zeros((n_times, n_cols), dtype=np.int64)
+        observed = np.zeros((n_times, n_cols), dtype=bool)
+        present = np.zeros((n_times, n_cols), dtype=bool)
+        t = np.frombuffer(self.t, dtype=np.int64)
+        col = np.frombuffer(self.col, dtype=np.int64)
+        values[t, col] = np.frombuffer(self.value, dtype=np.int64)
+        observed[t, col] = True
+        present[t, col] = np.frombuffer(self.present, dtype=np.int8).astype(bool)
+        return values, observed, present
+
+
+def _forward_fill(values, observed, present):
+    """ขยายค่าที่บันทึกเฉพาะจุดเปลี่ยนเป็นทุก snapshot"""
+    n_times = values.shape[0]
+    idx = np.where(observed, np.arange(n_times)[:, None], -1)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    has = idx >= 0
+    safe = np.where(has, idx, 0)
+    cols = np.arange(values.shape[1])[None, :]
+    return values[safe, cols], has & present[safe, cols]
+
+
+def _previous(values, present):
+    """ค่าที่พบล่าสุดก่อน snapshot t (prev_value, has_prev)"""
+    n_times = values.shape[0]
+    idx = np.where(present, np.arange(n_times)[:, None], -1)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    prev_idx = np.vstack([np.full((1, values.shape[1]), -1), idx[:-1]])
+    has_prev = prev_idx >= 0
+    cols = np.arange(values.shape[1])[None, :]
+    return values[np.where(has_prev, prev_idx, 0), cols], has_prev
+
+
+class SnapshotArrays:
+    """
+    ค่าของทุกเขต/ผู้สมัครในทุก snapshot
+
+    turn_out, stations: [T, เขต] votes: [T, ผู้สมัคร] พร้อม mask *_present
+    """
+
+    def __init__(self, times, cons_ids, cand_ids, cand_cons,
+                 turn_out, stations, cons_present, votes, votes_present):
+        self.times = list(times)
+        self.cons_ids = list(cons_ids)
+        self.cand_ids = list(cand_ids)
+        self.cand_cons = np.asarray(cand_cons, dtype=np.int64)
+        self.turn_out = turn_out
+        self.stations = stations
+        self.cons_present = cons_present
+        self.votes = votes
+        self.votes_present = votes_present
+
+    def __len__(self):
+        return len(self.times)
+
+    @classmethod
+    def from_snapshots(cls, snapshots, times: Optional[List[str]] = None) -> 'SnapshotArrays':
+        """จาก list ของ stats_cons (เรียงตามเวลา)"""
+        cons_index: Dict[str, int] = {}
+        cand_index: Dict[str, int] = {}
+        cand_cons = []
+        turn_out, stations, votes = _Scatter(), _Scatter(), _Scatter()
+        n_times = 0
+        for t, stats in enumerate(snapshots):
+            n_times += 1
+            for prov in stats.get('result_province', []):
+                for cons in prov.get('constituencies', []):
+                    cons_id = cons['cons_id']
+                    c = cons_index.setdefault(cons_id, len(cons_index))
+                    turn_out.add(t, c, cons.get('turn_out', 0))
+                    stations.add(t, c, cons.get('counted_vote_stations', 0))
+                    for cand in cons.get('candidates', []):
+                        cand_id = str(cand.get('mp_app_id', ''))
+                        m = cand_index.get(cand_id)
+                        if m is None:
+                            m = cand_index[cand_id] = len(cand_index)
+                            cand_cons.append(c)
+                        votes.add(t, m, cand.get('mp_app_vote', 0))
+
+        turn_out, _, cons_present = turn_out.dense(n_times, len(cons_index))
+        stations, _, _ = stations.dense(n_times, len(cons_index))
+        votes, _, votes_present = votes.dense(n_times, len(cand_index))
+        times = list(times) if times is not None else [str(t) for t in range(n_times)]
+        return cls(times, cons_index, cand_index, cand_cons,
+                   turn_out, stations, cons_present, votes, votes_present)
+
+    @classmethod
+    def from_store(cls, store) -> 'SnapshotArrays':
+        """จาก snapshot_store.SnapshotStore โดยใช้ series (ไม่ต้องประกอบ snapshot ใดเลย)"""
+        snapshots = store.conn.execute('SELECT id, fetched_at FROM snapshots ORDER BY id').fetchall()
+        position = {snapshot_id: t for t, (snapshot_id, _) in enumerate(snapshots)}
+        n_times = len(snapshots)
+
+        cons_index: Dict[str, int] = {}
+        turn_out, stations = _Scatter(), _Scatter()
+        for cons_id, snapshot_id, t_out, counted in store.conn.execute(
+                'SELECT cons_id, snapshot_id, turn_out, counted_stations FROM cons_series '
+                'ORDER BY cons_id, snapshot_id'):
+            c = cons_index.setdefault(cons_id, len(cons_index))
+            turn_out.add(position[snapshot_id], c, t_out)
+            stations.add(position[snapshot_id], c, counted)
+
+        cand_index: Dict[str, int] = {}
+        cand_cons = []
+        votes = _Scatter()
+        for cand_id, snapshot_id, cons_id, v in store.conn.execute(
+                'SELECT cand_id, snapshot_id, cons_id, votes FROM candidate_series ORDER BY cand_id, snapshot_id'):
+            m = cand_index.get(cand_id)
+            if m is None:
+                m = cand_index[cand_id] = len(cand_index)
+                cand_cons.append(cons_index.setdefault(cons_id, len(cons_index)))
+            votes.add(position[snapshot_id], m, v)
+
+        n_cons = len(cons_index)
+        turn_out, cons_present = _forward_fill(*turn_out.dense(n_times, n_cons))
+        stations, _ = _forward_fill(*stations.dense(n_times, n_cons))
+        votes, votes_present = _forward_fill(*votes.dense(n_times, len(cand_index)))
+        return cls([fetched_at for _, fetched_at in snapshots], cons_index, cand_index, cand_cons,
+                   turn_out, stations, cons_present, votes, votes_present)
+
+
+def _station_limits(arrays: SnapshotArrays, cons_map: Optional[Dict], slack: float) -> np.ndarray:
+    """คะแนนสูงสุดต่อหน่วยที่นับเพิ่มของแต่ละเขต (ผู้มีสิทธิเฉลี่ยต่อหน่วย × slack)"""
+    limits = np.full(len(arrays.cons_ids), float(DEFAULT_MAX_VOTES_PER_STATION))
+    if cons_map:
+        for i, cons_id in enumerate(arrays.cons_ids):
+            info = cons_map.get(cons_id) or {}
+            registered = info.get('registered_vote', 0)
+            total_stations = info.get('total_vote_stations', 0)
+            if registered and total_stations:
+                limits[i] = registered / total_stations * slack
+    return limits
+
+
+def _decreases(values, present, times, cons_of_col, field_of_col):
+    """ค่าที่ลดลงจากค่าที่พบล่าสุด (cons_of_col / field_of_col: เขตและชื่อฟิลด์ของแต่ละคอลัมน์)"""
+    prev, has_prev = _previous(values, present)
+    t, i = np.nonzero(present & has_prev & (values < prev))
+    return pd.DataFrame({
+        'type': DECREASE,
+        'snapshot': t,
+        'time': times[t],
+        'cons_id': cons_of_col[i],
+        'field': field_of_col[i],
+        'before': prev[t, i],
+        'after': values[t, i],
+        'delta': values[t, i] - prev[t, i],
+    })
+
+
+def detect_regressions(arrays: SnapshotArrays, cons_map: Optional[Dict] = None,
+                       slack: float = 2.0, z_threshold: float = Z_THRESHOLD,
+                       min_history: int = MIN_HISTORY) -> pd.DataFrame:
+    """
+    คืน DataFrame หนึ่งแถวต่อความผิดปกติ (คอลัมน์ FLAG_COLUMNS) เรียงตาม snapshot
+
+    cons_map: ผลของ analyze_ect_only.build_constituency_map ใช้คำนวณผู้มีสิทธิต่อหน่วยของแต่ละเขต
+    slack: ตัวคูณของผู้มีสิทธิเฉลี่ยต่อหน่วย (หน่วยใหญ่กว่าค่าเฉลี่ยได้)
+    """
+    times = np.asarray(arrays.times, dtype=object)
+    cons_ids = np.asarray(arrays.cons_ids, dtype=object)
+    cand_ids = np.asarray(arrays.cand_ids, dtype=object)
+    n_cons = len(cons_ids)
+    frames = [
+        _decreases(arrays.turn_out, arrays.cons_present, times, cons_ids,
+                   np.full(n_cons, 'turn_out', dtype=object)),
+        _decreases(arrays.stations, arrays.cons_present, times, cons_ids,
+                   np.full(n_cons, 'counted_vote_stations', dtype=object)),
+        _decreases(arrays.votes, arrays.votes_present, times, cons_ids[arrays.cand_cons], cand_ids),
+    ]
+
+    # การเพิ่มของ turn_out เทียบกับหน่วยที่นับเพิ่ม
+    prev_votes, has_prev = _previous(arrays.turn_out, arrays.cons_present)
+    prev_stations, _ = _previous(arrays.stations, arrays.cons_present)
+    step = arrays.cons_present & has_prev
+    dv = np.where(step, arrays.turn_out - prev_votes, 0)
+    ds = np.where(step, arrays.stations - prev_stations, 0)
+    limit = np.maximum(ds, 0) * _station_limits(arrays, cons_map, slack)[None, :]
+    t, c = np.nonzero(step & (dv > 0) & (dv > limit))
+    frames.append(pd.DataFrame({
+        'type': IMPLAUSIBLE_JUMP,
+        'snapshot': t,
+        'time': times[t],
+        'cons_id': cons_ids[c],
+        'field': 'turn_out',
+        'before': prev_votes[t, c],
+        'after': arrays.turn_out[t, c],
+        'delta': dv[t, c],
+        'new_stations': ds[t, c],
+        'limit': limit[t, c],
+    }))
+
+    # คะแนนต่อหน่วยที่นับเพิ่ม เทียบกับประวัติของเขตเดียวกัน
+    counted = step & (ds > 0)
+    rate = np.where(counted, dv / np.where(counted, ds, 1), np.nan)
+    history = counted.sum(axis=0)
+    if rate.size and history.max(initial=0) > 0:
+        with np.errstate(invalid='ignore'):
+            usable = history > 0
+            median = np.full(rate.shape[1], np.nan)
+            mad = np.full(rate.shape[1], np.nan)
+            median[usable] = np.nanmedian(rate[:, usable], axis=0)
+            mad[usable] = np.nanmedian(np.abs(rate[:, usable] - median[usable]), axis=0)
+            z = np.where(mad > 0, 0.6745 * (rate - median) / np.where(mad > 0, mad, 1), np.nan)
+            outlier = counted & (history >= min_history)[None, :] & (np.abs(z) > z_threshold)
+        t, c = np.nonzero(outlier)
+        frames.append(pd.DataFrame({
+            'type': RATE_OUTLIER,
+            'snapshot': t,
+            'time': times[t],
+            'cons_id': cons_ids[c],
+            'field': 'turn_out',
+            'before': prev_votes[t, c],
+            'after': arrays.turn_out[t, c],
+            'delta': dv[t, c],
+            'new_stations': ds[t, c],
+            'rate': rate[t, c],
+            'z': z[t, c],
+        }))
+
+    frames = [f for f in frames if len(f)]
+    if not frames:
+        return pd.DataFrame(columns=FLAG_COLUMNS)
+    flags = pd.concat(frames, ignore_index=True).reindex(columns=FLAG_COLUMNS)
+    return flags.sort_values(['snapshot', 'cons_id', 'type'], kind='stable').reset_index(drop=True)
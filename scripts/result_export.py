@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+เขียนผลการเปรียบเทียบ กกต. vs Vote62 ลงไฟล์แบบ streaming (ทีละหน่วย ไม่สะสมใน DataFrame)
+
+รูปแบบเลือกตามนามสกุล:
+  - .csv     : utf-8-sig เหมือน export_to_csv เดิม
+  - .jsonl   : หนึ่งแถวต่อบรรทัด
+  - .parquet : ต้องมี pyarrow เขียนเป็น row group ทีละ row_group_size แถว
+
+CSV / JSONL flush ทุกหน่วย ถ้าการรันหยุดกลางทางไฟล์ยังใช้ได้ถึงหน่วยล่าสุด
+(Parquet อ่านได้เมื่อ close แล้วเท่านั้น เพราะ footer เขียนตอนปิดไฟล์)
+
+details=True จะเขียนแถวรายผู้สมัครลงอีกไฟล์ <ชื่อไฟล์>.details<นามสกุล>
+"""
+
+import csv
+import json
+import os
+from typing import Dict, Iterable, Iterator, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+SUMMARY_FIELDS = ('unit_id', 'constituency', 'ect_total', 'vote62_total',
+                  'difference', 'discrepancy_level', 'timestamp')
+DETAIL_FIELDS = ('unit_id', 'name', 'status', 'ect_votes', 'vote62_votes', 'difference')
+
+# ชนิดของแต่ละคอลัมน์ (ใช้กับ Parquet)
+_INT_FIELDS = {'ect_total', 'vote62_total', 'difference', 'ect_votes', 'vote62_votes'}
+
+
+def summary_row(result) -> Dict:
+    """แถวสรุปของหนึ่งหน่วย (คอลัมน์เดียวกับ export_to_csv)"""
+    return {
+        'unit_id': result.unit_id,
+        'constituency': result.constituency,
+        'ect_total': result.ect_total,
+        'vote62_total': result.vote62_total,
+        'difference': result.difference,
+        'discrepancy_level': result.discrepancy_level.value,
+        'timestamp': result.timestamp
+    }
+
+
+def detail_rows(result) -> Iterator[Dict]:
+    """
+    แถวรายผู้สมัครของหนึ่งหน่วย
+
+    status: matching / discrepant / missing_in_ect / missing_in_vote62
+    (รายการที่หายไปในแหล่งหนึ่งอยู่ใน discrepant_candidates ด้วย จึงเขียนครั้งเดียว)
+    """
+    details = result.details or {}
+    missing_in_ect = set(details.get('missing_in_ect', []))
+    missing_in_vote62 = set(details.get('missing_in_vote62', []))
+    for c in details.get('matching_candidates', []):
+        yield {'unit_id': result.unit_id, 'name': c['name'], 'status': 'matching',
+               'ect_votes': c['votes'], 'vote62_votes': c['votes'], 'difference': 0}
+    for c in details.get('discrepant_candidates', []):
+        if c['name'] in missing_in_ect:
+            status = 'missing_in_ect'
+        elif c['name'] in missing_in_vote62:
+            status = 'missing_in_vote62'
+        else:
+            status = 'discrepant'
+        yield {'unit_id': result.unit_id, 'name': c['name'], 'status': status,
+               'ect_votes': c['ect_votes'], 'vote62_votes': c['vote62_votes'],
+               'difference': c['difference']}
+
+
+def details_path(path: str) -> str:
+    """path ของไฟล์รายผู้สมัครที่คู่กับ path"""
+    stem, ext = os.path.splitext(path)
+    return f'{stem}.details{ext}'
+
+
+class _CsvSink:
+    def __init__(self, path, fields):
+        self._file = open(path, 'w', encoding='utf-8-sig', newline='')
+        self._writer = csv.writer(self._file, lineterminator='\n')
+        self._writer.writerow(fields)
+        self._fields = fields
+
+    def write(self, rows):
+        self._writer.writerows([row[k] for k in self._fields] for row in rows)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class _JsonlSink:
+    def __init__(self, path, fields):
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write(self, rows):
+        for row in rows:
+            self._file.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class _ParquetSink:
+    def __init__(self, path, fields, row_group_size):
+        if pq is None:
+            raise ImportError('ต้องติดตั้ง pyarrow เพื่อเขียนไฟล์ Parquet')
+        self._fields = fields
+        self._schema = pa.schema([(k, pa.int64() if k in _INT_FIELDS else pa.string()) for k in fields])
+        self._writer = pq.ParquetWriter(path, self._schema)
+        self._row_group_size = row_group_size
+        self._buffer = {k: [] for k in fields}
+        self._pending = 0
+
+    def write(self, rows):
+        for row in rows:
+            for k in self._fields:
+                self._buffer[k].append(row[k])
+            self._pending += 1
+        if self._pending >= self._row_group_size:
+            self._write_group()
+
+    def _write_group(self):
+        if self._pending:
+            self._writer.write_table(pa.Table.from_pydict(self._buffer, schema=self._schema))
+            self._buffer = {k: [] for k in self._fields}
+            self._pending = 0
+
+    def flush(self):
+        # row group เขียนเมื่อครบ row_group_size เท่านั้น (row group เล็กเกินไปทำให้อ่านช้า)
+        pass
+
+    def close(self):
+        self._write_group()
+        self._writer.close()
+
+
+def _open_sink(path, fields, row_group_size):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        return _CsvSink(path, fields)
+    if ext == '.jsonl':
+        return _JsonlSink(path, fields)
+    if ext == '.parquet':
+        return _ParquetSink(path, fields, row_group_size)
+    raise ValueError(f'ไม่รองรับไฟล์ {ext} (ใช้ .csv, .jsonl หรือ .parquet)')
+
+
+class ResultWriter:
+    """
+    เขียน VerificationResult ต่อท้ายไฟล์ทีละหน่วย
+
+    >>> with ResultWriter('results.csv', details=True) as writer:
+    ...     writer.write(result)        # results.csv + results.details.csv
+    """
+
+    def __init__(self, path: str, details=False, row_group_size: int = 10000):
+        """
+        Args:
+            path: ไฟล์สรุปรายหน่วย (.csv / .jsonl / .parquet)
+            details: True = เขียนแถวรายผู้สมัครลง details_path(path), หรือระบุ path เอง
+            row_group_size: จำนวนแถวต่อ row group ของ Parquet
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.details_path: Optional[str] = None
+        if details:
+            self.details_path = details if isinstance(details, str) else details_path(path)
+        self.rows = 0
+        self._summary = _open_sink(path, SUMMARY_FIELDS, row_group_size)
+        self._details = None
+        if self.details_path:
+            try:
+                self._details = _open_sink(self.details_path, DETAIL_FIELDS, row_group_size)
+            except BaseException:
+                self._summary.close()
+                raise
+
+    def write(self, result):
+        self._summary.write([summary_row(result)])
+        self._summary.flush()
+        if self._details is not None:
+            self._details.write(list(detail_rows(result)))
+            self._details.flush()
+        self.rows += 1
+
+    def write_many(self, results: Iterable):
+        for result in results:
+            self.write(result)
+
+    def close(self):
+        self._summary.close()
+        if self._details is not None:
+            self._details.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+ที่เก็บ VerificationResult แบบประหยัดหน่วยความจำ (ใช้เป็น Vote62Comparator.discrepancies)
+
+  - ตัวเลขเก็บใน array แบบ typed (ect_total, vote62_total, difference)
+  - ระดับความร้ายแรงเป็นรหัส int8, เขตเลือกตั้งเป็นรหัสเข้าตารางข้อความที่ intern แล้ว
+  - timestamp เก็บเป็น microseconds (int64) แทนข้อความ ISO
+  - details เก็บเฉพาะหน่วยที่มีความแตกต่าง (มีรายการ discrepant / missing)
+    หน่วยอื่นคืน details ที่ทุก list ว่าง (ไม่เก็บ matching_candidates)
+
+ยังใช้เหมือน list ของ VerificationResult ได้: append / len / วนลูป / index
+"""
+
+import threading
+from array import array
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+
+if TYPE_CHECKING:
+    from vote62_comparator import DiscrepancyLevel, VerificationResult
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_NO_TIME = -(2 ** 63)
+_HASH_BYTES = 20
+
+DETAIL_KEYS = ('matching_candidates', 'discrepant_candidates', 'missing_in_ect', 'missing_in_vote62')
+
+
+def _empty_details() -> Dict:
+    return {key: [] for key in DETAIL_KEYS}
+
+
+def has_discrepancy_details(details: Optional[Dict]) -> bool:
+    """details มีรายการที่ต่างกัน/หายไปหรือไม่ (ถ้าไม่มี ไม่ต้องเก็บ)"""
+    if not details:
+        return False
+    return any(details.get(key) for key in DETAIL_KEYS[1:])
+
+
+class ResultStore:
+    """
+    ผลการตรวจสอบแบบ columnar
+
+    >>> store = ResultStore()
+    >>> store.append(result)
+    >>> store.level_counts()            # {'CRITICAL': 3, ...} โดยไม่ต้องสร้าง object
+    >>> for r in store: ...             # ได้ VerificationResult กลับมา
+    """
+
+    def __init__(self):
+        from vote62_comparator import DiscrepancyLevel
+        self._levels: List['DiscrepancyLevel'] = list(DiscrepancyLevel)
+        self._level_code = {level: i for i, level in enumerate(self._levels)}
+
+        self.unit_ids: List[str] = []
+        self.ect_total = array('q')
+        self.vote62_total = array('q')
+        self.difference = array('q')
+        self.level = array('b')
+        self.constituency = array('i')
+        self.timestamp = array('q')
+        self.has_hash = array('b')
+        self._hashes = bytearray()
+        self._strings: List[str] = []
+        self._string_index: Dict[str, int] = {}
+        self._details: Dict[int, Dict] = {}
+        # ค่าที่เก็บแบบย่อไม่ได้ (timestamp ที่ไม่ใช่ ISO แบบ naive, hash ที่ไม่ใช่ sha1 hex)
+        self._raw_timestamps: Dict[int, str] = {}
+        self._raw_hashes: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.unit_ids)
+
+    def __bool__(self):
+        return len(self.unit_ids) > 0
+
+    def _code(self, s: str) -> int:
+        c = self._string_index.get(s)
+        if c is None:
+            c = self._string_index[s] = len(self._strings)
+            self._strings.append(s)
+        return c
+
+    def append(self, result: 'VerificationResult'):
+        with self._lock:
+            i = len(self.unit_ids)
+            self.unit_ids.append(result.unit_id)
+            self.ect_total.append(result.ect_total)
+            self.vote62_total.append(result.vote62_total)
+            self.difference.append(result.difference)
+            self.level.append(self._level_code[result.discrepancy_level])
+            self.constituency.append(self._code(result.constituency))
+
+            try:
+                ts = datetime.fromisoformat(result.timestamp)
+                if ts.tzinfo is not None:
+                    raise ValueError
+                self.timestamp.append((ts - _EPOCH) // _MICROSECOND)
+            except (TypeError, ValueError):
+                self.timestamp.append(_NO_TIME)
+                self._raw_timestamps[i] = result.timestamp
+
+            digest = None
+            if result.source_hash:
+                try:
+                    digest = bytes.fromhex(result.source_hash)
+                except ValueError:
+                    digest = None
+                if digest is None or len(digest) != _HASH_BYTES:
+                    self._raw_hashes[i] = result.source_hash
+                    digest = None
+            self.has_hash.append(digest is not None)
+            self._hashes += digest or bytes(_HASH_BYTES)
+
+            if has_discrepancy_details(result.details):
+                self._details[i] = result.details
+
+    def extend(self, results):
+        for result in results:
+            self.append(result)
+
+    # --- อ่านแบบ column (ไม่ต้องสร้าง VerificationResult) ---
+
+    def level_of(self, i: int) -> 'DiscrepancyLevel':
+        return self._levels[self.level[i]]
+
+    def constituency_of(self, i: int) -> str:
+        return self._strings[self.constituency[i]]
+
+    def timestamp_of(self, i: int) -> str:
+        us = self.timestamp[i]
+        if us == _NO_TIME:
+            return self._raw_timestamps[i]
+        return (_EPOCH + us * _MICROSECOND).isoformat()
+
+    def source_hash_of(self, i: int) -> Optional[str]:
+        if self.has_hash[i]:
+            return self._hashes[i * _HASH_BYTES:(i + 1) * _HASH_BYTES].hex()
+        return self._raw_hashes.get(i)
+
+    def details_of(self, i: int) -> Dict:
+        details = self._details.get(i)
+        return details if details is not None else _empty_details()
+
+    def level_counts(self) -> Dict[str, int]:
+        counts = [0] * len(self._levels)
+        for code in self.level:
+            counts[code] += 1
+        return {level.name: counts[i] for i, level in enumerate(self._levels)}
+
+    def indices(self, level: Optional['DiscrepancyLevel'] = None) -> Iterator[int]:
+        """ตำแหน่งของผล (เฉพาะระดับ level ถ้าระบุ)"""
+        if level is None:
+            return iter(range(len(self)))
+        code = self._level_code[level]
+        return (i for i, c in enumerate(self.level) if c == code)
+
+    def rows(self, level: Optional['DiscrepancyLevel'] = None) -> Iterator[Dict]:
+        """dict สั้น {unit_id, constituency, difference} สำหรับรายงาน"""
+        for i in self.indices(level):
+            yield {
+                'unit_id': self.unit_ids[i],
+                'constituency': self.constituency_of(i),
+                'difference': self.difference[i]
+            }
+
+    def columns(self) -> Dict[str, list]:
+        """คอลัมน์สำหรับ DataFrame (รูปแบบเดียวกับ export_to_csv)"""
+        return {
+            'unit_id': self.unit_ids,
+            'constituency': [self._strings[c] for c in self.constituency],
+            'ect_total': self.ect_total.tolist(),
+            'vote62_total': self.vote62_total.tolist(),
+            'difference': self.difference.tolist(),
+            'discrepancy_level': [self._levels[c].value for c in self.level],
+            'timestamp': [self.timestamp_of(i) for i in range(len(self))],
+        }
+
+    # --- ใช้แทน list ของ VerificationResult ---
+
+    def __getitem__(self, i: int) -> 'VerificationResult':
+        from vote62_comparator import VerificationResult
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return VerificationResult(
+            unit_id=self.unit_ids[i],
+            constituency=self.constituency_of(i),
+            ect_total=self.ect_total[i],
+            vote62_total=self.vote62_total[i],
+            difference=self.difference[i],
+            discrepancy_level=self.level_of(i),
+            details=self.details_of(i),
+            timestamp=self.timestamp_of(i),
+            source_hash=self.source_hash_of(i)
+        )
+
+    def __iter__(self) -> Iterator['VerificationResult']:
+        for i in range(len(self)):
+            yield self[i]
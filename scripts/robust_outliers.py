@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+ตัวตรวจ outlier แบบทนทาน (robust) สำหรับอัตราของหน่วยเลือกตั้ง — ไม่พึ่ง mean/stdev ของทั้งประเทศ
+
+  - mad_scores     : modified z = 0.6745 (x - median) / MAD ต่อกลุ่ม (Iglewicz & Hoaglin, เกณฑ์ 3.5)
+  - hampel         : median / MAD ของหน้าต่างเพื่อนบ้านที่เรียงลำดับแล้วภายในกลุ่ม (เช่นเขตที่ติดกันในจังหวัด)
+  - trimmed_scores : trimmed mean + winsorized stdev ต่อกลุ่ม (ตัด/ดึงปลายสองด้าน proportion)
+
+ทุกตัวทำงานบน array ทั้งชุด (หน้าต่างเป็น index matrix ขนาด n × (2k + 1)) จึงโตแบบเชิงเส้น
+และใช้กับข้อมูลระดับหน่วยเลือกตั้งย่อยได้
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+from group_stats import GroupedStats
+
+MAD_Z = 0.6745          # Φ⁻¹(0.75): ทำให้ MAD เทียบเท่า stdev ของการแจกแจงปกติ
+MAD_THRESHOLD = 3.5
+HAMPEL_SCALE = 1.4826   # 1 / Φ⁻¹(0.75)
+
+
+def _single_group(values, groups):
+    values = np.asarray(values, dtype=np.float64)
+    if groups is None:
+        groups = np.zeros(len(values), dtype=np.int64)
+    return values, np.asarray(groups, dtype=np.int64)
+
+
+def mad_scores(values, groups=None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (modified z, median ของกลุ่ม, MAD ของกลุ่ม) ของแต่ละค่า
+
+    กลุ่มที่ MAD = 0 (ค่าเกินครึ่งเท่ากัน) ได้ z = 0 — ไม่มีสเกลให้เทียบ
+    """
+    values, groups = _single_group(values, groups)
+    n_groups = int(groups.max()) + 1 if len(groups) else 0
+    centre = GroupedStats(values, groups, n_groups).median[groups]
+    spread = GroupedStats(np.abs(values - centre), groups, n_groups).median[groups]
+    ok = spread > 0
+    z = np.where(ok, MAD_Z * (values - centre) / np.where(ok, spread, 1), 0.0)
+    return z, centre, spread
+
+
+def _windows(groups, order, k):
+    """
+    index matrix (n × 2k+1) ของเพื่อนบ้านตามลำดับ order ภายในกลุ่มเดียวกัน, -1 = ไม่มี
+
+    แถวที่ i เป็นหน้าต่างของค่าที่ตำแหน่ง order[i]
+    """
+    n = len(order)
+    g = groups[order]
+    counts = np.bincount(g) if n else np.zeros(0, dtype=np.int64)
+    starts = np.cumsum(counts) - counts
+    # order ต้องเรียงตามกลุ่มก่อน: ตำแหน่งในกลุ่ม = i - start ของกลุ่ม
+    if n and np.any(np.diff(g) < 0):
+        raise ValueError('order ต้องเรียงตามกลุ่มก่อน')
+    pos = np.arange(n)
+    offsets = np.arange(-k, k + 1)
+    nb = pos[:, None] + offsets[None, :]
+    lo = starts[g][:, None]
+    hi = (starts[g] + counts[g])[:, None]
+    return np.where((nb >= lo) & (nb < hi), nb, -1)
+
+
+def hampel(values, groups=None, order=None, k: int = 2, t: float = 3.0,
+           min_window: int = 3) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Hampel filter ภายในกลุ่ม: (median ของหน้าต่าง, score, flag) ของแต่ละค่า
+
+    order: ลำดับเพื่อนบ้าน (เรียงตามกลุ่มก่อน แล้วตามลำดับภายในกลุ่ม) — None = lexsort ตาม (ตำแหน่ง, กลุ่ม)
+    หน้าต่าง = ค่าเดิม ± k ตำแหน่ง (ถูกตัดที่ขอบกลุ่ม); score = |x - median| / (1.4826 × MAD ของหน้าต่าง)
+    flag เมื่อ score > t และหน้าต่างมีอย่างน้อย min_window ค่า
+    """
+    values, groups = _single_group(values, groups)
+    n = len(values)
+    if order is None:
+        order = np.lexsort((np.arange(n), groups))
+    order = np.asarray(order, dtype=np.int64)
+    win = _windows(groups, order, k)
+    valid = win >= 0
+
+    ordered = values[order]
+    w = np.where(valid, ordered[np.where(valid, win, 0)], np.nan)
+    size = valid.sum(axis=1)
+    with np.errstate(invalid='ignore'):
+        med = np.nanmedian(w, axis=1) if n else np.zeros(0)
+        scale = HAMPEL_SCALE * np.nanmedian(np.abs(w - med[:, None]), axis=1) if n else np.zeros(0)
+    dev = np.abs(ordered - med)
+    ok = (scale > 0) & (size >= min_window)
+    score = np.where(ok, dev / np.where(ok, scale, 1), 0.0)
+
+    out_med = np.empty(n)
+    out_score = np.empty(n)
+    out_med[order] = med
+    out_score[order] = score
+    return out_med, out_score, out_score > t
+
+
+def trimmed_scores(values, groups=None, proportion: float = 0.1) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (z เทียบ trimmed mean/winsorized stdev, trimmed mean ของกลุ่ม, winsorized stdev ของกลุ่ม) ของแต่ละค่า
+
+    ตัด floor(n × proportion) ค่าจากแต่ละปลายของแต่ละกลุ่ม (แบบ scipy.stats.trim_mean)
+    stdev ใช้ค่าที่ดึงปลายเข้ามาเท่าค่าที่เหลือสุดขอบ (winsorize) แทนการตัดทิ้ง ซึ่งจะแคบเกินจริง
+    """
+    values, groups = _single_group(values, groups)
+    n_groups = int(groups.max()) + 1 if len(groups) else 0
+    gs = GroupedStats(values, groups, n_groups)
+    cut = np.floor(gs.count * proportion).astype(np.int64)
+
+    sorted_groups = gs.groups[gs.order]
+    rank = np.arange(len(values)) - gs.starts[sorted_groups]
+    keep = (rank >= cut[sorted_groups]) & (rank < (gs.count - cut)[sorted_groups])
+    kept = GroupedStats(gs.sorted[keep], sorted_groups[keep], n_groups)
+
+    winsorized = GroupedStats(np.clip(values, kept.min[groups], kept.max[groups]), groups, n_groups)
+
+    mean = kept.mean[groups]
+    sd = winsorized.stdev[groups]
+    ok = sd > 0
+    z = np.where(ok, (values - mean) / np.where(ok, sd, 1), 0.0)
+    return z, kept.mean, winsorized.stdev
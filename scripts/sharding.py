@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+แบ่งไฟล์ข้อมูลเป็นรายจังหวัด (shard ตาม prov_id) + manifest ขนาดเล็ก
+
+  - manifest.json: เฉพาะ metadata / summary (ตาม MANIFEST_PATHS) และรายการ shard พร้อม sha256 / ขนาด / จำนวน record
+    แถวสรุปรายจังหวัด (ตาม *_SUMMARY_PATHS) อยู่ใน shards[prov_id]['summary'] ของจังหวัดนั้น
+  - <prov_id>.json: ข้อมูลรายหน่วยของจังหวัดนั้น โครงสร้างเดียวกับเอกสารเดิมตาม path ที่แบ่ง
+  - national.json: ส่วนที่เหลือที่ไม่แบ่งตามจังหวัด (distribution, รายการที่เรียงอันดับแล้ว, peer_groups.levels, ...)
+  - เขียนใหม่เฉพาะ shard ที่เนื้อหาเปลี่ยน และลบ shard ของจังหวัดที่ไม่มีแล้ว
+
+หน้าเว็บโหลด manifest ก่อน แล้วค่อยโหลด <prov_id>.json?v=<sha256[:12]> เมื่อผู้ใช้เลือกจังหวัด
+(national.json?v=... เมื่อต้องการรายละเอียดระดับประเทศ)
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+SHARD_VERSION = 3
+MANIFEST_NAME = 'manifest.json'
+NATIONAL_NAME = 'national.json'
+
+# path (คั่นด้วย '.') ของข้อมูลรายหน่วยที่แบ่งตามจังหวัด
+ELECTION_SHARD_PATHS = ('units',)
+ANOMALY_SHARD_PATHS = ('turnout.all', 'winner_dominance.all', 'peer_groups.flags', 'robust_flags.flags', 'all_flags', 'flags_by_unit')
+
+# path ของแถวสรุปรายจังหวัด (dict ที่ key เป็น prov_id หรือ list ของ record ที่มี prov_id) — เก็บใน manifest รายจังหวัด
+ELECTION_SUMMARY_PATHS = ('provinces',)
+ANOMALY_SUMMARY_PATHS = ('province_patterns.monopoly', 'province_patterns.high_variation')
+
+# path ที่เก็บไว้ใน manifest (ยอดรวม/สรุป) — '*' แทน key ใดก็ได้ในระดับนั้น ที่เหลือไปอยู่ national.json
+MANIFEST_PATHS = ('metadata', 'statistics', 'national_parties', '*.summary')
+
+
+def unit_province(unit_id):
+    """prov_id จาก unit_id รูปแบบ '<prov_id>_<เขต>'"""
+    return unit_id.rsplit('_', 1)[0]
+
+
+def record_province(record):
+    """prov_id ของ record: ใช้ฟิลด์ prov_id ถ้ามี ไม่เช่นนั้นดูจาก unit_id"""
+    prov_id = record.get('prov_id')
+    if prov_id:
+        return prov_id
+    return unit_province(record['unit_id'])
+
+
+def _encode(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _write_atomic(path, data):
+    tmp = f'{path}.tmp{os.getpid()}'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def split_document(doc, paths):
+    """
+    แยกเอกสารเป็น (manifest_doc, {prov_id: shard_doc})
+
+    list ของ record แบ่งด้วย record_province, dict (เช่น flags_by_unit) แบ่งด้วย unit_province(key)
+    (key ที่เป็น prov_id อยู่แล้ว เช่น provinces ได้จังหวัดของตัวเอง)
+    ลำดับภายในแต่ละ shard คงตามลำดับเดิม
+    """
+    base = dict(doc)
+    shards = OrderedDict()
+    for path in paths:
+        keys = path.split('.')
+        parent = base
+        for k in keys[:-1]:
+            if k not in parent:
+                parent = None
+                break
+            parent[k] = dict(parent[k])
+            parent = parent[k]
+        if parent is None or keys[-1] not in parent:
+            continue
+        value = parent.pop(keys[-1])
+
+        if isinstance(value, dict):
+            items = ((unit_province(k), (k, v)) for k, v in value.items())
+            empty = dict
+        else:
+            items = ((record_province(r), r) for r in value)
+            empty = list
+        for prov_id, item in items:
+            node = shards.setdefault(prov_id, {'prov_id': prov_id})
+            for k in keys[:-1]:
+                node = node.setdefault(k, {})
+            bucket = node.setdefault(keys[-1], empty())
+            if isinstance(bucket, dict):
+                bucket[item[0]] = item[1]
+            else:
+                bucket.append(item)
+    return base, shards
+
+
+def _match(keys, pattern):
+    parts = pattern.split('.')
+    return len(keys) >= len(parts) and all(p in ('*', k) for p, k in zip(parts, keys))
+
+
+def split_manifest(base, manifest_paths=MANIFEST_PATHS):
+    """
+    แยกส่วนที่ไม่ได้แบ่งตามจังหวัดเป็น (ข้อมูลใน manifest, national doc)
+
+    key ที่ตรงกับ manifest_paths อยู่ใน manifest ทั้งก้อน; dict อื่นถูกไล่ลงไปแยกต่อ; ที่เหลือไป national
+    """
+    def walk(node, keys):
+        keep, rest = {}, {}
+        for k, v in node.items():
+            path = keys + [k]
+            if any(_match(path, p) for p in manifest_paths):
+                keep[k] = v
+            elif isinstance(v, dict) and any(len(p.split('.')) > len(path) for p in manifest_paths):
+                sub_keep, sub_rest = walk(v, path)
+                if sub_keep:
+                    keep[k] = sub_keep
+                if sub_rest:
+                    rest[k] = sub_rest
+            else:
+                rest[k] = v
+        return keep, rest
+    return walk(base, [])
+
+
+def _merge(dst, src):
+    for k, v in src.items():
+        if isinstance(v, dict) and isinstance(dst.get(k), dict):
+            _merge(dst[k], v)
+        else:
+            dst[k] = v
+    return dst
+
+
+def _count_records(shard, paths):
+    total = 0
+    for path in paths:
+        node = shard
+        for k in path.split('.'):
+            node = node.get(k) if isinstance(node, dict) else None
+        if node is not None:
+            total += len(node)
+    return total
+
+
+def write_shards(doc, out_dir, paths, summary_paths=(), manifest_paths=MANIFEST_PATHS):
+    """
+    เขียน manifest + shard รายจังหวัด + national.json ลง out_dir
+    คืน (manifest, จำนวนไฟล์ shard ที่เขียนใหม่)
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            old_manifest = json.load(f)
+    except (OSError, ValueError):
+        old_manifest = {}
+    previous = old_manifest.get('shards', {})
+
+    base, shards = split_document(doc, paths)
+    base, summaries = split_document(base, summary_paths)
+    data, national = split_manifest(base, manifest_paths)
+    written = 0
+
+    def put(filename, shard, old):
+        nonlocal written
+        raw = _encode(shard)
+        digest = hashlib.sha256(raw).hexdigest()
+        path = os.path.join(out_dir, filename)
+        if not old or old.get('sha256') != digest or not os.path.exists(path):
+            _write_atomic(path, raw)
+            written += 1
+        return {'file': filename, 'sha256': digest, 'bytes': len(raw)}
+
+    entries = OrderedDict()
+    for prov_id in sorted(set(shards) | set(summaries)):
+        if prov_id in shards:
+            entries[prov_id] = put(f'{prov_id}.json', shards[prov_id], previous.get(prov_id))
+            entries[prov_id]['records'] = _count_records(shards[prov_id], paths)
+        else:
+            entries[prov_id] = {'records': 0}
+        if prov_id in summaries:
+            summary = summaries[prov_id]
+            del summary['prov_id']
+            entries[prov_id]['summary'] = summary
+    national_entry = put(NATIONAL_NAME, national, old_manifest.get('national'))
+
+    for prov_id, old in previous.items():
+        if 'file' in old and 'file' not in entries.get(prov_id, {}):
+            stale = os.path.join(out_dir, old['file'])
+            if os.path.exists(stale):
+                os.remove(stale)
+
+    manifest = {
+        'version': SHARD_VERSION,
+        'sharded_paths': list(paths),
+        'summary_paths': list(summary_paths),
+        'national': national_entry,
+        'shards': entries,
+        'data': data,
+    }
+    _write_atomic(manifest_path, _encode(manifest))
+    return manifest, written
+
+
+def _read_shard(out_dir, entry, name):
+    with open(os.path.join(out_dir, entry['file']), 'rb') as f:
+        raw = f.read()
+    if hashlib.sha256(raw).hexdigest() != entry['sha256']:
+        raise ValueError(f'shard {name} ไม่ตรงกับ sha256 ใน manifest')
+    return json.loads(raw)
+
+
+def _put_back(doc, shard, paths):
+    """ใส่ข้อมูลตาม paths จาก shard กลับเข้า doc (list ต่อท้าย, dict update)"""
+    for path in paths:
+        keys = path.split('.')
+        src = shard
+        for k in keys:
+            src = src.get(k) if isinstance(src, dict) else None
+        if src is None:
+            continue
+        dst = doc
+        for k in keys[:-1]:
+            dst = dst.setdefault(k, {})
+        if isinstance(src, dict):
+            dst.setdefault(keys[-1], {}).update(src)
+        else:
+            dst.setdefault(keys[-1], []).extend(src)
+
+
+def load_sharded(out_dir, prov_ids=None):
+    """
+    ประกอบเอกสารกลับจาก manifest + shard (prov_ids=None คือทุกจังหวัด) ตรวจ sha256 ทุกไฟล์
+    record ที่ถูกแบ่งจะเรียงตาม prov_id แล้วตามลำดับเดิมภายในจังหวัด (แถวสรุปรายจังหวัดใส่ครบทุกจังหวัดเสมอ)
+    """
+    with open(os.path.join(out_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    doc = manifest['data']
+    if 'national' in manifest:
+        _merge(doc, _read_shard(out_dir, manifest['national'], 'national'))
+    for prov_id, entry in manifest['shards'].items():
+        _put_back(doc, entry.get('summary', {}), manifest.get('summary_paths', ()))
+        if 'file' not in entry or (prov_ids is not None and prov_id not in prov_ids):
+            continue
+        _put_back(doc, _read_shard(out_dir, entry, prov_id), manifest['sharded_paths'])
+    return doc
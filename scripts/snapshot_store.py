@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+ประวัติผล กกต. (stats_cons.json) ทุกครั้งที่ดึง เก็บใน SQLite แบบ keyframe + delta
+
+  - record แยกเป็น __meta__ (ค่าระดับประเทศ), __layout__ (ลำดับจังหวัด/เขต),
+    prov:<prov_id> (record จังหวัดไม่รวมเขต) และ cons:<cons_id> (record เขต) เก็บเป็น JSON บีบอัด
+  - keyframe เก็บทุก record, snapshot อื่นเก็บเฉพาะ record ที่เปลี่ยน (data = NULL คือถูกลบ)
+    สร้าง keyframe ใหม่ทุก keyframe_every snapshot หรือเมื่อเปลี่ยนเกินครึ่ง
+  - ประกอบ snapshot ใด ๆ กลับ = keyframe + delta ไม่เกิน keyframe_every รายการ
+  - cons_series / candidate_series เก็บค่าตัวเลขเฉพาะจุดที่เปลี่ยน (index ตาม id)
+    query ย้อนหลังของเขต/ผู้สมัครเดียวจึงไม่ต้องเปิด snapshot ใดเลย
+
+>>> store = SnapshotStore()
+>>> store.add(stats)                                  # หลังดึง stats_cons.json
+>>> store.at('2026-02-08T21:00:00')                   # stats_cons ณ เวลานั้น
+>>> store.constituency_series('10_1')
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import zlib
+from datetime import datetime
+from typing import Dict, List, Optional
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+HISTORY_PATH = os.path.join(SCRIPT_DIR, '..', '.cache', 'ect_history.sqlite')
+
+KEYFRAME_EVERY = 24
+
+META_KEY = '__meta__'
+LAYOUT_KEY = '__layout__'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    fetched_at TEXT NOT NULL,
+    source_time TEXT,
+    content_sha1 TEXT NOT NULL,
+    keyframe_id INTEGER NOT NULL,
+    changed INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_fetched_at ON snapshots (fetched_at);
+CREATE TABLE IF NOT EXISTS records (
+    snapshot_id INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    data BLOB,
+    PRIMARY KEY (snapshot_id, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS cons_series (
+    cons_id TEXT NOT NULL,
+    snapshot_id INTEGER NOT NULL,
+    prov_id TEXT,
+    valid_votes INTEGER,
+    turn_out INTEGER,
+    counted_stations INTEGER,
+    percent_count REAL,
+    pause_report INTEGER,
+    PRIMARY KEY (cons_id, snapshot_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS candidate_series (
+    cand_id TEXT NOT NULL,
+    snapshot_id INTEGER NOT NULL,
+    cons_id TEXT NOT NULL,
+    votes INTEGER,
+    PRIMARY KEY (cand_id, snapshot_id)
+) WITHOUT ROWID;
+"""
+
+_CONS_FIELDS = ('valid_votes', 'turn_out', 'counted_stations', 'percent_count', 'pause_report')
+
+
+def _encode(obj) -> bytes:
+    return json.dumps(obj, sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def split_stats(stats: Dict) -> Dict[str, object]:
+    """stats_cons -> {key: record}"""
+    records = {META_KEY: {k: v for k, v in stats.items() if k != 'result_province'}}
+    layout = []
+    for prov in stats.get('result_province', []):
+        prov_id = prov['prov_id']
+        cons_ids = []
+        for cons in prov.get('constituencies', []):
+            cons_ids.append(cons['cons_id'])
+            records[f"cons:{cons['cons_id']}"] = cons
+        records[f'prov:{prov_id}'] = {k: v for k, v in prov.items() if k != 'constituencies'}
+        layout.append([prov_id, cons_ids, 'constituencies' in prov])
+    records[LAYOUT_KEY] = layout
+    return records
+
+
+def join_stats(records: Dict[str, object]) -> Dict:
+    """{key: record} -> stats_cons (ลำดับจังหวัด/เขตตาม __layout__)"""
+    stats = dict(records[META_KEY])
+    provinces = []
+    for prov_id, cons_ids, has_constituencies in records[LAYOUT_KEY]:
+        prov = dict(records[f'prov:{prov_id}'])
+        if has_constituencies:
+            prov['constituencies'] = [records[f'cons:{cons_id}'] for cons_id in cons_ids]
+        provinces.append(prov)
+    stats['result_province'] = provinces
+    return stats
+
+
+def _cons_row(cons) -> tuple:
+    return (
+        cons.get('valid_votes', 0),
+        cons.get('turn_out', 0),
+        cons.get('counted_vote_stations', 0),
+        cons.get('percent_count', 0),
+        int(bool(cons.get('pause_report', False))),
+    )
+
+
+class SnapshotStore:
+    """ที่เก็บประวัติ stats_cons.json (SQLite ไฟล์เดียว)"""
+
+    def __init__(self, path: str = HISTORY_PATH, keyframe_every: int = KEYFRAME_EVERY):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.keyframe_every = keyframe_every
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_SCHEMA)
+        # hash ของแต่ละ record ใน snapshot ล่าสุด (โหลดเมื่อจำเป็น)
+        self._hashes: Optional[Dict[str, str]] = None
+        self._cons_rows: Optional[Dict[str, tuple]] = None
+        self._cand_votes: Optional[Dict[str, tuple]] = None
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM snapshots').fetchone()[0]
+
+    def latest(self) -> Optional[Dict]:
+        row = self.conn.execute(
+            'SELECT id, fetched_at, source_time, content_sha1, keyframe_id, changed '
+            'FROM snapshots ORDER BY id DESC LIMIT 1').fetchone()
+        return self._snapshot_info(row) if row else None
+
+    def snapshots(self) -> List[Dict]:
+        rows = self.conn.execute(
+            'SELECT id, fetched_at, source_time, content_sha1, keyframe_id, changed FROM snapshots ORDER BY id')
+        return [self._snapshot_info(row) for row in rows]
+
+    @staticmethod
+    def _snapshot_info(row) -> Dict:
+        keys = ('id', 'fetched_at', 'source_time', 'content_sha1', 'keyframe_id', 'changed')
+        return dict(zip(keys, row))
+
+    # --- เขียน ---
+
+    def _load_latest_state(self):
+        """hash ของ record และค่าล่าสุดใน series ของ snapshot ล่าสุด"""
+        latest = self.latest()
+        self._hashes, self._cons_rows, self._cand_votes = {}, {}, {}
+        if latest is None:
+            return
+        for key, raw in self._raw_records(latest['id']).items():
+            self._hashes[key] = hashlib.sha1(raw).hexdigest()
+        for cons_id, *values in self.conn.execute(
+                'SELECT cons_id, prov_id, valid_votes, turn_out, counted_stations, percent_count, pause_report '
+                'FROM cons_series s WHERE snapshot_id = '
+                '(SELECT MAX(snapshot_id) FROM cons_series WHERE cons_id = s.cons_id)'):
+            self._cons_rows[cons_id] = tuple(values)
+        for cand_id, cons_id, votes in self.conn.execute(
+                'SELECT cand_id, cons_id, votes FROM candidate_series s WHERE snapshot_id = '
+                '(SELECT MAX(snapshot_id) FROM candidate_series WHERE cand_id = s.cand_id)'):
+            self._cand_votes[cand_id] = (cons_id, votes)
+
+    def add(self, stats: Dict, fetched_at: Optional[str] = None,
+            source_time: Optional[str] = None) -> Optional[int]:
+        """
+        บันทึก stats_cons หนึ่งครั้ง คืน snapshot id
+        (คืน None ถ้าเนื้อหาเหมือน snapshot ล่าสุดทุกประการ)
+        """
+        if self._hashes is None:
+            self._load_latest_state()
+        fetched_at = fetched_at or datetime.now().isoformat()
+        records = split_stats(stats)
+        encoded = {key: _encode(record) for key, record in records.items()}
+        hashes = {key: hashlib.sha1(raw).hexdigest() for key, raw in encoded.items()}
+        changed = [key for key, h in hashes.items() if self._hashes.get(key) != h]
+        removed = [key for key in self._hashes if key not in hashes]
+        if not changed and not removed:
+            return None
+
+        content_sha1 = hashlib.sha1(b''.join(h.encode() for h in sorted(hashes.values()))).hexdigest()
+        latest = self.latest()
+        since_keyframe = 0
+        if latest is not None:
+            since_keyframe = self.conn.execute(
+                'SELECT COUNT(*) FROM snapshots WHERE keyframe_id = ?', (latest['keyframe_id'],)).fetchone()[0]
+        keyframe = (latest is None or since_keyframe >= self.keyframe_every
+                    or len(changed) + len(removed) > len(hashes) // 2)
+
+        with self.conn:
+            cur = self.conn.execute(
+                'INSERT INTO snapshots (fetched_at, source_time, content_sha1, keyframe_id, changed) '
+                'VALUES (?, ?, ?, 0, ?)', (fetched_at, source_time, content_sha1, len(changed) + len(removed)))
+            snapshot_id = cur.lastrowid
+            keyframe_id = snapshot_id if keyframe else latest['keyframe_id']
+            self.conn.execute('UPDATE snapshots SET keyframe_id = ? WHERE id = ?', (keyframe_id, snapshot_id))
+
+            keys = list(hashes) if keyframe else changed
+            self.conn.executemany(
+                'INSERT INTO records (snapshot_id, key, data) VALUES (?, ?, ?)',
+                [(snapshot_id, key, zlib.compress(encoded[key], 6)) for key in keys])
+            if not keyframe:
+                self.conn.executemany(
+                    'INSERT INTO records (snapshot_id, key, data) VALUES (?, ?, NULL)',
+                    [(snapshot_id, key) for key in removed])
+            self._add_series(snapshot_id, stats, changed, removed)
+
+        self._hashes = hashes
+        return snapshot_id
+
+    def _add_series(self, snapshot_id, stats, changed, removed):
+        """เพิ่มแถวใน series เฉพาะเขต/ผู้สมัครที่ค่าเปลี่ยน"""
+        changed_cons = {key[5:] for key in changed if key.startswith('cons:')}
+        previous_cands = {}
+        if changed_cons:
+            for cand_id, (cons_id, votes) in self._cand_votes.items():
+                if votes is not None and cons_id in changed_cons:
+                    previous_cands.setdefault(cons_id, []).append(cand_id)
+        cons_rows, cand_rows = [], []
+        for prov in stats.get('result_province', []):
+            for cons in prov.get('constituencies', []):
+                cons_id = cons['cons_id']
+                if cons_id not in changed_cons:
+                    continue
+                row = (prov['prov_id'],) + _cons_row(cons)
+                if self._cons_rows.get(cons_id) != row:
+                    cons_rows.append((cons_id, snapshot_id) + row)
+                    self._cons_rows[cons_id] = row
+                present = set()
+                for cand in cons.get('candidates', []):
+                    cand_id = str(cand.get('mp_app_id', ''))
+                    present.add(cand_id)
+                    value = (cons_id, cand.get('mp_app_vote', 0))
+                    if self._cand_votes.get(cand_id) != value:
+                        cand_rows.append((cand_id, snapshot_id) + value)
+                        self._cand_votes[cand_id] = value
+                # ผู้สมัครที่หายไปจากเขต: บันทึก votes = None
+                for cand_id in previous_cands.get(cons_id, ()):
+                    if cand_id not in present:
+                        cand_rows.append((cand_id, snapshot_id, cons_id, None))
+                        self._cand_votes[cand_id] = (cons_id, None)
+        for key in removed:
+            if key.startswith('cons:'):
+                cons_id = key[5:]
+                prov_id = self._cons_rows.pop(cons_id, (None,))[0]
+                cons_rows.append((cons_id, snapshot_id, prov_id) + (None,) * len(_CONS_FIELDS))
+        self.conn.executemany('INSERT INTO cons_series VALUES (?, ?, ?, ?, ?, ?, ?, ?)', cons_rows)
+        self.conn.executemany('INSERT INTO candidate_series VALUES (?, ?, ?, ?)', cand_rows)
+
+    # --- อ่าน ---
+
+    def _raw_records(self, snapshot_id: int) -> Dict[str, bytes]:
+        row = self.conn.execute('SELECT keyframe_id FROM snapshots WHERE id = ?', (snapshot_id,)).fetchone()
+        if row is None:
+            raise KeyError(snapshot_id)
+        raw = {}
+        for key, data in self.conn.execute(
+                'SELECT key, data FROM records WHERE snapshot_id BETWEEN ? AND ? ORDER BY snapshot_id',
+                (row[0], snapshot_id)):
+            if data is None:
+                raw.pop(key, None)
+            else:
+                raw[key] = zlib.decompress(data)
+        return raw
+
+    def load(self, snapshot_id: int) -> Dict:
+        """stats_cons ของ snapshot id"""
+        return join_stats({key: json.loads(raw) for key, raw in self._raw_records(snapshot_id).items()})
+
+    def snapshot_at(self, timestamp: str) -> Optional[int]:
+        """id ของ snapshot ล่าสุดที่ fetched_at <= timestamp (ISO)"""
+        row = self.conn.execute(
+            'SELECT id FROM snapshots WHERE fetched_at <= ? ORDER BY fetched_at DESC, id DESC LIMIT 1',
+            (timestamp,)).fetchone()
+        return row[0] if row else None
+
+    def at(self, timestamp: str) -> Optional[Dict]:
+        """stats_cons ณ เวลา timestamp (None ถ้าก่อน snapshot แรก)"""
+        snapshot_id = self.snapshot_at(timestamp)
+        return self.load(snapshot_id) if snapshot_id is not None else None
+
+    def _series(self, sql, params, fields, forward_fill):
+        points = [dict(zip(('snapshot_id', 'fetched_at') + fields, row))
+                  for row in self.conn.execute(sql, params)]
+        if not forward_fill or not points:
+            return points
+        # ขยายเป็นหนึ่งจุดต่อ snapshot ตั้งแต่จุดแรก
+        filled = []
+        i = 0
+        for snapshot_id, fetched_at in self.conn.execute(
+                'SELECT id, fetched_at FROM snapshots WHERE id >= ? ORDER BY id', (points[0]['snapshot_id'],)):
+            while i + 1 < len(points) and points[i + 1]['snapshot_id'] <= snapshot_id:
+                i += 1
+            filled.append(dict(points[i], snapshot_id=snapshot_id, fetched_at=fetched_at))
+        return filled
+
+    def constituency_series(self, cons_id: str, forward_fill: bool = False) -> List[Dict]:
+        """
+        ค่าของเขตหนึ่งตามเวลา: เฉพาะจุดที่เปลี่ยน หรือทุก snapshot ถ้า forward_fill
+        (ค่าเป็น None ที่ snapshot ที่เขตนั้นหายไป)
+        """
+        fields = ('prov_id',) + _CONS_FIELDS
+        points = self._series(
+            'SELECT s.snapshot_id, n.fetched_at, s.prov_id, s.valid_votes, s.turn_out, s.counted_stations, '
+            's.percent_count, s.pause_report FROM cons_series s JOIN snapshots n ON n.id = s.snapshot_id '
+            'WHERE s.cons_id = ? ORDER BY s.snapshot_id', (cons_id,), fields, forward_fill)
+        for p in points:
+            if p['pause_report'] is not None:
+                p['pause_report'] = bool(p['pause_report'])
+        return points
+
+    def candidate_series(self, cand_id: str, forward_fill: bool = False) -> List[Dict]:
+        """คะแนนของผู้สมัคร (mp_app_id) ตามเวลา"""
+        return self._series(
+            'SELECT s.snapshot_id, n.fetched_at, s.cons_id, s.votes FROM candidate_series s '
+            'JOIN snapshots n ON n.id = s.snapshot_id WHERE s.cand_id = ? ORDER BY s.snapshot_id',
+            (str(cand_id),), ('cons_id', 'votes'), forward_fill)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="ประวัติผล กกต. (stats_cons.json)")
+    parser.add_argument("--db", default=HISTORY_PATH)
+    parser.add_argument("--cons", help="แสดงค่าของเขตนี้ตามเวลา")
+    parser.add_argument("--candidate", help="แสดงคะแนนของผู้สมัคร (mp_app_id) ตามเวลา")
+    args = parser.parse_args()
+
+    with SnapshotStore(args.db) as store:
+        if args.cons:
+            for point in store.constituency_series(args.cons):
+                print(point)
+        elif args.candidate:
+            for point in store.candidate_series(args.candidate):
+                print(point)
+        else:
+            for info in store.snapshots():
+                kind = 'key' if info['keyframe_id'] == info['id'] else 'delta'
+                print(f"#{info['id']:<5} {info['fetched_at']}  {kind:<5} เปลี่ยน {info['changed']} record")
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Spatial autocorrelation ของเขตเลือกตั้ง: Moran's I (global) และ LISA (local Moran) — ไม่ต้องใช้ pysal
+
+น้ำหนักเพื่อนบ้าน (sparse, row-standardized):
+  - ไฟล์ adjacency ในเครื่อง: {"<unit_id>": ["<unit_id>", ...]} (ทำให้สมมาตรอัตโนมัติ)
+  - หรือจากชื่ออำเภอ/เขตใน zone ของ info_constituency.json: เขตเลือกตั้งที่มีอำเภอเดียวกัน
+    (อำเภอที่ถูกแบ่งหลายเขต) ในจังหวัดเดียวกันถือเป็นเพื่อนบ้าน; same_province=True ให้ทุกเขตในจังหวัดเดียวกันเป็นเพื่อนบ้าน
+
+นัยสำคัญจาก permutation แบบ batch บน NumPy:
+  - global: สลับค่าทั้งชุด B รอบพร้อมกัน (matrix B × n) แล้วคูณ W ครั้งเดียว
+  - local : conditional permutation — สุ่มชุดเพื่อนบ้านปลอม (B × k_max) ครั้งเดียวแล้วใช้ซ้ำทุกเขต
+    โดยเลื่อน index ข้ามตัวเอง (แบบเดียวกับ crand ของ pysal)
+
+CLI:
+  python spatial.py                          # election_data.json, 999 permutations
+  python spatial.py --adjacency adj.json --permutations 9999 --workers 3
+"""
+
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(SCRIPT_DIR, '..', 'data')
+DEFAULT_ADJACENCY = os.path.join(DATA_DIR, 'adjacency.json')
+
+# รหัส quadrant ของ LISA (ตามลำดับของ pysal)
+QUADRANTS = {1: 'HH', 2: 'LH', 3: 'LL', 4: 'HL'}
+NOT_SIGNIFICANT = 'ns'
+ISLAND = 'island'
+
+_ZONE_NOTE = re.compile(r'\s*\(.*\)\s*$')
+
+
+def district_name(zone: str) -> str:
+    """ชื่ออำเภอ/เขตโดยตัดหมายเหตุในวงเล็บ ('อำเภอวังสะพุง (เฉพาะ...)' -> 'อำเภอวังสะพุง')"""
+    return _ZONE_NOTE.sub('', zone).strip()
+
+
+class SpatialWeights:
+    """
+    น้ำหนักเพื่อนบ้านแบบ CSR (scipy.sparse) row-standardized
+
+    ids: unit_id ตามลำดับแถว; islands: mask ของเขตที่ไม่มีเพื่อนบ้าน (แถวเป็นศูนย์)
+    """
+
+    def __init__(self, ids: Sequence[str], binary: sparse.spmatrix):
+        self.ids = list(ids)
+        self.index = {uid: i for i, uid in enumerate(self.ids)}
+        binary = sparse.csr_matrix(binary, dtype=np.float64)
+        binary.setdiag(0)
+        binary.eliminate_zeros()
+        self.binary = binary
+        self.cardinalities = np.diff(binary.indptr)
+        self.islands = self.cardinalities == 0
+        inv = np.where(self.islands, 0.0, 1.0 / np.maximum(self.cardinalities, 1))
+        self.sparse = sparse.diags(inv) @ binary
+        self.sparse = sparse.csr_matrix(self.sparse)
+        self.n = len(self.ids)
+        self.s0 = float(self.sparse.sum())
+
+    def __len__(self):
+        return self.n
+
+    @classmethod
+    def from_adjacency(cls, ids: Sequence[str], adjacency: Dict[str, Sequence[str]]):
+        """จาก dict unit_id -> เพื่อนบ้าน (ข้าม id ที่ไม่อยู่ใน ids, ทำให้สมมาตร)"""
+        index = {uid: i for i, uid in enumerate(ids)}
+        rows, cols = [], []
+        for uid, neighbours in adjacency.items():
+            i = index.get(uid)
+            if i is None:
+                continue
+            for other in neighbours:
+                j = index.get(other)
+                if j is not None and j != i:
+                    rows.extend((i, j))
+                    cols.extend((j, i))
+        n = len(ids)
+        binary = sparse.coo_matrix((np.ones(len(rows)), (rows, cols)), shape=(n, n)).tocsr()
+        binary.data[:] = 1.0   # คู่ที่ซ้ำกันถูกรวมเป็น 2 — กลับเป็น binary
+        return cls(ids, binary)
+
+    @classmethod
+    def load(cls, ids: Sequence[str], path: str = DEFAULT_ADJACENCY):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_adjacency(ids, json.load(f))
+
+    @classmethod
+    def from_zones(cls, units: Sequence[Dict], same_province: bool = False):
+        """
+        จาก unit dicts (unit_id, prov_id, zone): เขตที่มีอำเภอ/เขตเดียวกันในจังหวัดเดียวกันเป็นเพื่อนบ้าน
+
+        same_province=True: ทุกเขตในจังหวัดเดียวกันเป็นเพื่อนบ้าน (หยาบกว่า แต่ไม่มีเขตโดดเดี่ยว
+        ยกเว้นจังหวัดที่มีเขตเดียว)
+        """
+        ids = [u['unit_id'] for u in units]
+        keys = {}
+        unit_of, key_of = [], []
+        for i, u in enumerate(units):
+            prov = u.get('prov_id', '')
+            names = [''] if same_province else [district_name(z) for z in (u.get('zone') or [])]
+            for name in names:
+                k = keys.setdefault((prov, name), len(keys))
+                unit_of.append(i)
+                key_of.append(k)
+        # unit × district incidence แล้วคูณกับ transpose: เขตที่มีอำเภอร่วมกัน
+        incidence = sparse.csr_matrix((np.ones(len(unit_of)), (unit_of, key_of)), shape=(len(ids), len(keys)))
+        binary = (incidence @ incidence.T).tocsr()
+        binary.data[:] = 1.0
+        return cls(ids, binary)
+
+    def subset(self, mask) -> 'SpatialWeights':
+        """น้ำหนักเฉพาะเขตที่ mask เป็น True (เช่นเขตที่มีข้อมูล) แล้ว row-standardize ใหม่"""
+        keep = np.flatnonzero(mask)
+        return SpatialWeights([self.ids[i] for i in keep.tolist()], self.binary[keep][:, keep])
+
+
+def _standardize(values):
+    values = np.asarray(values, dtype=np.float64)
+    z = values - values.mean()
+    m2 = float((z * z).mean())
+    return z, m2
+
+
+def morans_i(values, w: SpatialWeights, permutations: int = 999, seed: int = 0,
+             batch: int = 1000) -> Dict:
+    """
+    Global Moran's I พร้อม pseudo p-value จาก permutation (ด้านเดียวตามทิศของ I)
+
+    I = (n / S0) Σ_i Σ_j w_ij z_i z_j / Σ_i z_i²
+    """
+    z, m2 = _standardize(values)
+    n = len(z)
+    if n < 3 or m2 == 0 or w.s0 == 0:
+        return {'valid': False, 'reason': 'ข้อมูลหรือเพื่อนบ้านไม่พอ'}
+    scale = n / w.s0
+    denom = float((z * z).sum())
+    observed = scale * float(z @ (w.sparse @ z)) / denom
+
+    rng = np.random.default_rng(seed)
+    sims = np.empty(permutations)
+    for start in range(0, permutations, batch):
+        b = min(batch, permutations - start)
+        zp = rng.permuted(np.broadcast_to(z, (b, n)), axis=1)        # b × n
+        lag = (w.sparse @ zp.T).T                                     # b × n
+        sims[start:start + b] = scale * np.einsum('ij,ij->i', zp, lag) / denom
+
+    expected = -1.0 / (n - 1)
+    larger = int(np.count_nonzero(sims >= observed))
+    if permutations - larger < larger:
+        larger = permutations - larger
+    sd = float(sims.std(ddof=1)) if permutations > 1 else 0.0
+    return {
+        'valid': True,
+        'I': observed,
+        'expected_I': expected,
+        'z_sim': (observed - float(sims.mean())) / sd if sd > 0 else 0.0,
+        'p_sim': (larger + 1) / (permutations + 1),
+        'permutations': permutations,
+        'n': n,
+        'islands': int(w.islands.sum()),
+    }
+
+
+def _neighbour_draws(n, k_max, permutations, rng):
+    """B × k_max index ที่สุ่มแบบไม่ซ้ำจาก 0..n-2 (ใช้ร่วมทุกเขต เลื่อนข้ามตัวเองภายหลัง)"""
+    if k_max == 0:
+        return np.zeros((permutations, 0), dtype=np.int64)
+    keys = rng.random((permutations, n - 1))
+    return np.argpartition(keys, k_max - 1, axis=1)[:, :k_max] if k_max < n - 1 else np.argsort(keys, axis=1)
+
+
+def lisa(values, w: SpatialWeights, permutations: int = 999, seed: int = 0,
+         significance: float = 0.05) -> Dict:
+    """
+    Local Moran's I_i = z_i Σ_j w_ij z_j / m2 พร้อม conditional permutation p-value ต่อเขต
+
+    คืน dict ของ arrays ยาว n: Is, quadrant (1-4), p_sim, cluster ('HH'/'LH'/'LL'/'HL'/'ns'/'island')
+    """
+    z, m2 = _standardize(values)
+    n = len(z)
+    if m2 == 0:
+        m2 = 1.0
+    lag = w.sparse @ z
+    local = z * lag / m2
+    quadrant = np.where(z > 0, np.where(lag > 0, 1, 4), np.where(lag > 0, 2, 3))
+
+    rng = np.random.default_rng(seed)
+    card = w.cardinalities
+    k_max = int(card.max()) if n else 0
+    draws = _neighbour_draws(n, min(k_max, n - 1), permutations, rng)
+    p_sim = np.ones(n)
+    indptr, weights = w.sparse.indptr, w.sparse.data
+
+    # เขตที่มีจำนวนเพื่อนบ้านเท่ากันใช้ draws ชุดเดียวกัน: (m, B, k)
+    for k in np.unique(card[card > 0]).tolist():
+        rows = np.flatnonzero(card == k)
+        picks = draws[None, :, :k] + (draws[None, :, :k] >= rows[:, None, None])   # ข้ามตัวเอง
+        row_w = weights[indptr[rows][:, None] + np.arange(k)]                        # (m, k)
+        sim_lag = np.einsum('mbk,mk->mb', z[picks], row_w)
+        sims = z[rows, None] * sim_lag / m2                                           # (m, B)
+        larger = np.count_nonzero(sims >= local[rows, None], axis=1)
+        larger = np.where(permutations - larger < larger, permutations - larger, larger)
+        p_sim[rows] = (larger + 1) / (permutations + 1)
+
+    labels = np.array([NOT_SIGNIFICANT] + [QUADRANTS[q] for q in (1, 2, 3, 4)], dtype=object)
+    cluster = labels[np.where(p_sim <= significance, quadrant, 0)]
+    cluster[w.islands] = ISLAND
+    return {
+        'Is': local,
+        'lag': lag,
+        'quadrant': quadrant,
+        'p_sim': p_sim,
+        'cluster': cluster,
+    }
+
+
+def unit_variables(units: Sequence[Dict]) -> Dict[str, np.ndarray]:
+    """ตัวแปรมาตรฐานจาก unit dicts (NaN = ไม่มีข้อมูล): turnout, invalid_rate, winner_pct"""
+    turn_out = np.array([u.get('turn_out') or 0 for u in units], dtype=np.float64)
+    registered = np.array([u.get('registered_vote') or 0 for u in units], dtype=np.float64)
+    valid = np.array([u.get('valid_votes') or 0 for u in units], dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return {
+            'turnout': np.where(registered > 0, turn_out / registered * 100, np.nan),
+            'invalid_rate': np.where(turn_out > 0,
+                                     np.array([u.get('invalid_votes') or 0 for u in units]) / turn_out * 100,
+                                     np.nan),
+            'winner_pct': np.where(valid > 0,
+                                   np.array([u.get('winner_votes') or 0 for u in units]) / valid * 100,
+                                   np.nan),
+        }
+
+
+def align_variables(variables: Dict[str, np.ndarray], unit_ids: Sequence[str],
+                    w: SpatialWeights) -> Dict[str, np.ndarray]:
+    """
+    จัดตัวแปรที่เรียงตาม unit_ids ให้ตรงกับลำดับแถวของ w (w.ids)
+
+    เขตใน w ที่ไม่มีข้อมูลได้ NaN (analyze_variable ข้ามให้), unit_id ที่ไม่อยู่ใน w ถูกทิ้ง
+    """
+    rows, cols = [], []
+    for i, uid in enumerate(unit_ids):
+        j = w.index.get(uid)
+        if j is not None:
+            rows.append(j)
+            cols.append(i)
+    aligned = {}
+    for name, values in variables.items():
+        out = np.full(w.n, np.nan)
+        out[rows] = np.asarray(values, dtype=np.float64)[cols]
+        aligned[name] = out
+    return aligned
+
+
+def analyze_variable(values, w: SpatialWeights, permutations: int = 999, seed: int = 0,
+                     significance: float = 0.05) -> Dict:
+    """Moran's I + LISA ของตัวแปรเดียว (ข้ามเขตที่เป็น NaN)"""
+    values = np.asarray(values, dtype=np.float64)
+    has = ~np.isnan(values)
+    sub = w if has.all() else w.subset(has)
+    x = values[has]
+    result = morans_i(x, sub, permutations, seed)
+    if not result['valid']:
+        return result
+    local = lisa(x, sub, permutations, seed + 1, significance)
+    clusters = local['cluster']
+    result['clusters'] = {label: int(np.count_nonzero(clusters == label))
+                          for label in list(QUADRANTS.values()) + [NOT_SIGNIFICANT, ISLAND]}
+    result['lisa'] = [
+        {'unit_id': uid, 'value': round(v, 2), 'local_i': round(li, 4), 'p_sim': round(p, 4), 'cluster': c}
+        for uid, v, li, p, c in zip(sub.ids, x.tolist(), local['Is'].tolist(), local['p_sim'].tolist(),
+                                    clusters.tolist())
+        if c not in (NOT_SIGNIFICANT, ISLAND)
+    ]
+    return result
+
+
+def _analyze_job(args):
+    return analyze_variable(*args)
+
+
+def spatial_report(variables: Dict[str, np.ndarray], w: SpatialWeights, permutations: int = 999,
+                   seed: int = 0, workers: int = 1, significance: float = 0.05) -> Dict[str, Dict]:
+    """
+    Moran's I + LISA ของหลายตัวแปร — workers > 1 รันแต่ละตัวแปรใน process แยก
+
+    seed ของแต่ละตัวแปรแยกกัน (seed + 2i) ผลจึงเหมือนกันไม่ว่าจะใช้กี่ workers
+    """
+    names = list(variables)
+    jobs = [(variables[name], w, permutations, seed + 2 * i, significance) for i, name in enumerate(names)]
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            results = list(pool.map(_analyze_job, jobs))
+    else:
+        results = [_analyze_job(job) for job in jobs]
+    return dict(zip(names, results))
+
+
+def build_weights(units: Sequence[Dict], adjacency: Optional[str] = None,
+                  same_province: bool = False) -> SpatialWeights:
+    """ไฟล์ adjacency ถ้ามี (ค่าเริ่มต้น data/adjacency.json) ไม่เช่นนั้นใช้ zone"""
+    path = adjacency or DEFAULT_ADJACENCY
+    if os.path.exists(path):
+        return SpatialWeights.load([u['unit_id'] for u in units], path)
+    if adjacency:
+        raise FileNotFoundError(adjacency)
+    return SpatialWeights.from_zones(units, same_province=same_province)
+
+
+def main(adjacency=None, same_province=False, permutations=999, workers=1, output=None):
+    with open(os.path.join(DATA_DIR, 'election_data.json'), 'r', encoding='utf-8') as f:
+        units = json.load(f)['units']
+    w = build_weights(units, adjacency, same_province)
+    print(f'เขต: {w.n}, เพื่อนบ้านเฉลี่ย: {w.cardinalities.mean():.2f}, ไม่มีเพื่อนบ้าน: {int(w.islands.sum())}')
+
+    report = spatial_report(unit_variables(units), w, permutations, workers=workers)
+    for name, r in report.items():
+        if not r['valid']:
+            print(f'  {name}: {r["reason"]}')
+            continue
+        clusters = ', '.join(f'{k}={v}' for k, v in r['clusters'].items() if v)
+        print(f'  {name}: I={r["I"]:.4f} (E={r["expected_I"]:.4f}, p={r["p_sim"]:.4f}) {clusters}')
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'✅ บันทึก: {output}')
+    return report
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Moran's I / LISA ของเขตเลือกตั้ง")
+    parser.add_argument('--adjacency', help='ไฟล์ JSON unit_id -> [unit_id เพื่อนบ้าน] (ค่าเริ่มต้น data/adjacency.json ถ้ามี)')
+    parser.add_argument('--same-province', action='store_true',
+                        help='ไม่มีไฟล์ adjacency: ให้ทุกเขตในจังหวัดเดียวกันเป็นเพื่อนบ้าน แทนการใช้อำเภอร่วมกัน')
+    parser.add_argument('--permutations', type=int, default=999)
+    parser.add_argument('--workers', type=int, default=1, help='จำนวน process (หนึ่งตัวแปรต่อ process)')
+    parser.add_argument('--output', help='บันทึกผลเป็น JSON')
+    args = parser.parse_args()
+    main(args.adjacency, args.same_province, args.permutations, args.workers, args.output)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+ทดสอบ ConcurrentFetcher กับ HTTP server จำลองในเครื่อง (ไม่ต่อ กกต. จริง)
+
+    cd scripts && python -m unittest test_ect_fetcher
+"""
+
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ect_fetcher import ConcurrentFetcher, Endpoint, make_session
+
+BODY = json.dumps({'ok': True}).encode()
+
+
+class StandIn(BaseHTTPRequestHandler):
+    hits = {}
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        n = StandIn.hits[self.path] = StandIn.hits.get(self.path, 0) + 1
+        if self.path == '/truncated':
+            # ประกาศ Content-Length ยาวกว่าที่ส่งจริง แล้วปิดการเชื่อมต่อ
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(BODY) + 100))
+            self.end_headers()
+            self.wfile.write(BODY)
+            self.close_connection = True
+            return
+        if self.path == '/flaky' and n == 1:
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.path == '/slow':
+            time.sleep(0.5)
+        body = b'{"ok": tru' if self.path == '/badjson' else BODY
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client หมดเวลาไปก่อน (/slow)
+
+
+class ConcurrentFetcherTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StandIn)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StandIn.hits.clear()
+        self.fetcher = ConcurrentFetcher(make_session(), retries=2, backoff=0.0)
+
+    def endpoint(self, path, timeout=(2, 2)):
+        return Endpoint(path.strip('/'), self.base + path, path, timeout=timeout)
+
+    def test_truncated_body_is_retried_then_reported(self):
+        result = self.fetcher.fetch_one(self.endpoint('/truncated'))
+        self.assertFalse(result.ok)
+        self.assertIsNotNone(result.error)
+        self.assertEqual(result.attempts, 3)
+        self.assertEqual(StandIn.hits['/truncated'], 3)
+
+    def test_5xx_then_200(self):
+        result = self.fetcher.fetch_one(self.endpoint('/flaky'))
+        self.assertTrue(result.ok)
+        self.assertEqual(result.data, {'ok': True})
+        self.assertEqual(result.attempts, 2)
+        self.assertEqual(len(result.attempt_times), 2)
+
+    def test_timeout(self):
+        result = self.fetcher.fetch_one(self.endpoint('/slow', timeout=(2, 0.1)))
+        self.assertFalse(result.ok)
+        self.assertEqual(result.attempts, 3)
+        self.assertIn('timed out', result.error)
+
+    def test_invalid_json_is_not_retried(self):
+        result = self.fetcher.fetch_one(self.endpoint('/badjson'))
+        self.assertFalse(result.ok)
+        self.assertEqual(result.attempts, 1)
+        self.assertTrue(result.error.startswith('JSON ไม่ถูกต้อง'))
+
+    def test_invalid_url_is_not_reported_as_json(self):
+        result = self.fetcher.fetch_one(Endpoint('bad', 'not-a-url', 'bad'))
+        self.assertFalse(result.ok)
+        self.assertEqual(result.attempts, 1)
+        self.assertNotIn('JSON', result.error)
+
+    def test_fetch_all_never_raises(self):
+        endpoints = [self.endpoint('/truncated'), self.endpoint('/flaky'), self.endpoint('/slow', timeout=(2, 0.1))]
+        results = self.fetcher.fetch_all(endpoints)
+        self.assertEqual([r.ok for r in results.values()], [False, True, False])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+ทดสอบ RateAccumulator / KLLSketch / interpolated_quantiles
+
+    cd scripts && python -m unittest test_rate_stats
+"""
+
+import math
+import statistics
+import unittest
+
+import numpy as np
+
+from rate_stats import RateAccumulator, interpolated_quantiles
+
+PS = (0.25, 0.50, 0.75)
+
+
+class RateAccumulatorTest(unittest.TestCase):
+    def test_empty_quantiles_are_nan(self):
+        for acc in (RateAccumulator(), RateAccumulator(approximate=True), RateAccumulator(moments=False)):
+            q = acc.quantiles(PS)
+            self.assertEqual(len(q), 3)
+            self.assertTrue(all(math.isnan(v) for v in q))
+        self.assertTrue(all(math.isnan(v) for v in interpolated_quantiles([], PS)))
+
+    def test_exact_matches_statistics(self):
+        values = np.random.default_rng(1).normal(60, 8, 1001).round(2)
+        acc = RateAccumulator()
+        acc.update(values[:500])
+        for v in values[500:]:
+            acc.add(v)
+        self.assertAlmostEqual(acc.mean, statistics.fmean(values), places=9)
+        self.assertAlmostEqual(acc.stdev, statistics.stdev(values), places=9)
+        self.assertEqual(acc.quantiles(PS), statistics.quantiles(values, n=4, method='inclusive'))
+
+    def test_merge(self):
+        values = np.arange(100, dtype=np.float64)
+        a = RateAccumulator().update(values[:30])
+        b = RateAccumulator().update(values[30:])
+        a.merge(b)
+        self.assertEqual(a.count, 100)
+        self.assertAlmostEqual(a.mean, 49.5)
+        self.assertEqual(a.quantiles((0.5,)), [49.5])
+
+    def test_without_moments(self):
+        acc = RateAccumulator(moments=False).update([3.0, 1.0, 2.0])
+        self.assertEqual(acc.sorted_values().tolist(), [1.0, 2.0, 3.0])
+        self.assertEqual(acc.quantiles((0.5,)), [2.0])
+        self.assertIsNone(acc.mean)
+        with self.assertRaises(ValueError):
+            acc.stdev
+        with self.assertRaises(ValueError):
+            RateAccumulator().merge(acc)
+
+    def test_approximate_close_to_exact(self):
+        values = np.random.default_rng(2).uniform(0, 100, 50_000)
+        acc = RateAccumulator(approximate=True).update(values)
+        exact = np.quantile(values, PS)
+        for got, want in zip(acc.quantiles(PS), exact):
+            self.assertLess(abs(got - want), 2.0)
+        self.assertLess(acc._sketch.size, 5_000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+ทดสอบ compare_payloads เทียบกับเส้นทางทีละหน่วย (_detailed_comparison / _assess_discrepancy)
+
+    cd scripts && python -m unittest test_vectorized_compare
+"""
+
+import random
+import unittest
+
+from vectorized_compare import compare_payloads
+from vote62_comparator import Vote62Comparator
+
+
+def random_payloads(rnd, n_units):
+    """payload สุ่มของสองแหล่ง: มีรายชื่อว่าง, ชื่อซ้ำ, หน่วยที่หายไป และคะแนนที่ต่างกัน"""
+    ect, vote62 = {}, {}
+    for i in range(n_units):
+        unit_id = f'U{i}'
+        key = rnd.choice(['candidates', 'candidates', 'parties'])
+        rows = [{'name': f'c{j}', 'votes': rnd.choice([0, rnd.randint(0, 3000)])}
+                for j in range(rnd.randint(0, 6))]
+        if rows and rnd.random() < 0.1:
+            rows.append(dict(rows[0], votes=rnd.randint(0, 50)))  # ชื่อซ้ำ
+        ect[unit_id] = {key: rows}
+        r = rnd.random()
+        if r < 0.05:
+            continue
+        if r < 0.1:
+            vote62[unit_id] = {}
+            continue
+        other = [dict(row) for row in rows]
+        for row in other:
+            if rnd.random() < 0.3:
+                row['votes'] = max(0, row['votes'] + rnd.randint(-80, 80))
+        if rnd.random() < 0.1:
+            other.append({'name': 'new', 'votes': rnd.randint(0, 9)})
+        vote62[unit_id] = {key: other}
+    return ect, vote62
+
+
+def scalar_results(ect, vote62):
+    comparator = Vote62Comparator()
+    out = {}
+    for unit_id, ect_data in ect.items():
+        vote62_data = vote62.get(unit_id)
+        if not ect_data or not vote62_data:
+            continue
+        et = comparator._calculate_total_votes(ect_data)
+        vt = comparator._calculate_total_votes(vote62_data)
+        details = comparator._detailed_comparison(ect_data, vote62_data)
+        level = comparator._assess_discrepancy(abs(et - vt), et, details)
+        out[unit_id] = (et, vt, abs(et - vt), level.name, details)
+    return out
+
+
+def normalize(details):
+    # เส้นทางเดิมเรียงตามลำดับของ set — เทียบแบบไม่สนลำดับ
+    return {k: sorted(v, key=str) for k, v in details.items()}
+
+
+class ComparePayloadsTest(unittest.TestCase):
+    def assert_matches_scalar(self, ect, vote62):
+        comparison = compare_payloads(ect, vote62)
+        expected = scalar_results(ect, vote62)
+        details = comparison.details()
+        self.assertEqual(list(comparison.units['unit_id']), list(expected))
+        for row in comparison.units.itertuples():
+            et, vt, diff, level, want = expected[row.unit_id]
+            self.assertEqual((row.ect_total, row.vote62_total, row.difference, row.level),
+                             (et, vt, diff, level), row.unit_id)
+            self.assertEqual(normalize(details[row.unit_id]), normalize(want), row.unit_id)
+
+    def test_randomized_against_scalar(self):
+        rnd = random.Random(7)
+        for _ in range(20):
+            self.assert_matches_scalar(*random_payloads(rnd, rnd.randint(0, 200)))
+
+    def test_empty_inputs(self):
+        comparison = compare_payloads({}, {})
+        self.assertEqual(len(comparison.units), 0)
+        self.assertEqual(list(comparison.results()), [])
+
+    def test_empty_candidate_lists_are_identical(self):
+        empty = {'a': {'candidates': []}}
+        self.assert_matches_scalar(empty, empty)
+        [result] = compare_payloads(empty, empty).results()
+        self.assertEqual(result.discrepancy_level.name, 'IDENTICAL')
+        self.assertEqual((result.ect_total, result.vote62_total), (0, 0))
+
+    def test_empty_list_against_non_empty(self):
+        self.assert_matches_scalar({'a': {'candidates': []}, 'b': {'parties': [{'name': 'x', 'votes': 5}]}},
+                                   {'a': {'parties': [{'name': 'x', 'votes': 2}]}, 'b': {'parties': []}})
+
+
+if __name__ == '__main__':
+    unittest.main()
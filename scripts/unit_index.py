@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+ดัชนีข้อมูลรายหน่วยเลือกตั้งในหน่วยความจำ โหลดครั้งเดียวจาก payload ก้อนใหญ่
+(ทั้งเขต/ทั้งจังหวัด) แทนการยิง HTTP ทีละหน่วย
+
+รูปแบบที่รองรับ (ไฟล์ .gz ได้ด้วย):
+  - .json : list ของหน่วย, {"units": [...]}, หรือ {unit_id: payload}
+  - .jsonl: หนึ่งหน่วยต่อบรรทัด
+  - .csv  : หนึ่งแถวต่อผู้สมัคร/พรรค คอลัมน์ unit_id, name, votes
+  - http(s)://... : JSON แบบเดียวกับ .json
+payload ของแต่ละหน่วยเป็นรูปแบบเดียวกับที่ Vote62Comparator ใช้ ({"candidates": [{"name", "votes"}]})
+"""
+
+import csv
+import gzip
+import io
+import json
+from typing import Dict, Iterable, Optional
+
+import requests
+
+
+def _open_text(path):
+    if path.endswith('.gz'):
+        return io.TextIOWrapper(gzip.open(path, 'rb'), encoding='utf-8-sig')
+    return open(path, 'r', encoding='utf-8-sig')
+
+
+def _int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+class UnitIndex:
+    """
+    mapping unit_id -> payload
+
+    >>> index = UnitIndex.load('../data/vote62_raw_data.json')
+    >>> index.get('001001')
+    """
+
+    def __init__(self, id_field: str = 'unit_id'):
+        self.id_field = id_field
+        self.units: Dict[str, Dict] = {}
+
+    def __len__(self):
+        return len(self.units)
+
+    def __contains__(self, unit_id):
+        return unit_id in self.units
+
+    def get(self, unit_id: str) -> Optional[Dict]:
+        return self.units.get(unit_id)
+
+    def add_units(self, units: Iterable[Dict]) -> int:
+        """เพิ่ม/แทนที่หน่วยจาก record ที่มีฟิลด์ unit_id คืนจำนวนที่เพิ่ม"""
+        count = 0
+        for unit in units:
+            self.units[str(unit[self.id_field])] = unit
+            count += 1
+        return count
+
+    def add_payload(self, payload) -> int:
+        """เพิ่มจาก JSON ก้อนเดียว: list, {"units": [...]} หรือ {unit_id: payload}"""
+        if isinstance(payload, dict) and isinstance(payload.get('units'), list):
+            payload = payload['units']
+        if isinstance(payload, list):
+            return self.add_units(payload)
+        if isinstance(payload, dict):
+            for unit_id, unit in payload.items():
+                self.units[str(unit_id)] = unit
+            return len(payload)
+        raise ValueError('รูปแบบ payload ไม่รองรับ')
+
+    def add_csv(self, f) -> int:
+        """เพิ่มจาก CSV แบบหนึ่งแถวต่อผู้สมัคร (unit_id, name, votes)"""
+        grouped = {}
+        for row in csv.DictReader(f):
+            unit_id = str(row[self.id_field])
+            unit = grouped.get(unit_id)
+            if unit is None:
+                unit = grouped[unit_id] = {self.id_field: unit_id, 'candidates': []}
+            unit['candidates'].append({'name': row.get('name', 'unknown'), 'votes': _int(row.get('votes'))})
+        self.units.update(grouped)
+        return len(grouped)
+
+    def add_source(self, source: str, session: Optional[requests.Session] = None, timeout=60) -> int:
+        """เพิ่มจาก path ของไฟล์หรือ URL (เลือกรูปแบบตามนามสกุล)"""
+        if source.startswith(('http://', 'https://')):
+            response = (session or requests).get(source, timeout=timeout)
+            response.raise_for_status()
+            return self.add_payload(response.json())
+        name = source[:-3] if source.endswith('.gz') else source
+        with _open_text(source) as f:
+            if name.endswith('.jsonl'):
+                return self.add_units(json.loads(line) for line in f if line.strip())
+            if name.endswith('.csv'):
+                return self.add_csv(f)
+            return self.add_payload(json.load(f))
+
+    @classmethod
+    def load(cls, *sources: str, id_field: str = 'unit_id',
+             session: Optional[requests.Session] = None) -> 'UnitIndex':
+        index = cls(id_field)
+        for source in sources:
+            index.add_source(source, session=session)
+        return index
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+เปรียบเทียบ กกต. vs Vote62 ทั้งประเทศในรอบเดียวด้วย pandas/NumPy
+
+รับ DataFrame แบบ long format (unit_id, name, votes) ของทั้งสองแหล่ง แล้วคำนวณ
+คะแนนรวมต่อหน่วย, ส่วนต่างรายผู้สมัคร, รายการที่หายไปในแต่ละแหล่ง และ DiscrepancyLevel
+ด้วย groupby/merge — กติกาเดียวกับ Vote62Comparator._detailed_comparison / _assess_discrepancy
+
+ต่างจากเส้นทางทีละหน่วยเพียงลำดับของรายการใน details: ที่นี่เรียงตามลำดับที่ชื่อปรากฏ
+(กกต. ก่อน Vote62) ส่วนเส้นทางเดิมเรียงตามลำดับของ set ซึ่งไม่คงที่ระหว่าง process
+"""
+
+from datetime import datetime
+from typing import Dict, Iterator, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from vote62_comparator import DiscrepancyLevel, VerificationResult
+
+UNIT = 'unit_id'
+NAME = 'name'
+VOTES = 'votes'
+
+# status ของแต่ละ (หน่วย, ผู้สมัคร)
+MATCHING = 'matching'
+DISCREPANT = 'discrepant'
+NONE = 'none'
+
+
+def frame_from_payloads(payloads: Dict[str, Dict]) -> pd.DataFrame:
+    """
+    แปลง {unit_id: payload} (รูปแบบที่ fetch_*_unit_data คืน) เป็น long format
+
+    ใช้ 'candidates' ก่อน 'parties' เหมือน _create_vote_mapping
+    """
+    units, names, votes = [], [], []
+    for unit_id, data in payloads.items():
+        if not data:
+            continue
+        if 'candidates' in data:
+            rows = data['candidates']
+        elif 'parties' in data:
+            rows = data['parties']
+        else:
+            rows = []
+        for row in rows:
+            units.append(unit_id)
+            names.append(row.get('name', 'unknown'))
+            votes.append(row.get('votes', 0))
+    return pd.DataFrame({UNIT: units, NAME: names, VOTES: votes})
+
+
+def assess_levels(difference, total, missing) -> np.ndarray:
+    """_assess_discrepancy แบบ vectorized คืน array ของชื่อ DiscrepancyLevel"""
+    difference = np.asarray(difference)
+    total = np.asarray(total)
+    safe_total = np.where(total > 0, total, 1)
+    percentage = np.where(total > 0, difference / safe_total * 100, 0)
+    critical = np.asarray(missing) | (difference > 50) | (percentage > 2)
+    significant = (difference > 10) | (percentage > 0.5)
+    return np.select(
+        [difference == 0, critical, significant],
+        [DiscrepancyLevel.IDENTICAL.name, DiscrepancyLevel.CRITICAL.name, DiscrepancyLevel.SIGNIFICANT.name],
+        DiscrepancyLevel.MINOR.name)
+
+
+class FrameComparison:
+    """
+    ผลเปรียบเทียบทั้งชุด
+
+    units: หนึ่งแถวต่อหน่วย (ect_total, vote62_total, difference, level, n_discrepant, n_missing_*)
+    candidates: หนึ่งแถวต่อ (หน่วย, ชื่อ) พร้อม ect_votes, vote62_votes, difference, status, missing_*
+                เรียงตามหน่วยแล้วตามลำดับที่ชื่อปรากฏ
+    """
+
+    def __init__(self, units: pd.DataFrame, candidates: pd.DataFrame):
+        self.units = units
+        self.candidates = candidates
+
+    def __len__(self):
+        return len(self.units)
+
+    def level_counts(self) -> Dict[str, int]:
+        counts = self.units['level'].value_counts()
+        return {level.name: int(counts.get(level.name, 0)) for level in DiscrepancyLevel}
+
+    def details(self) -> Dict[str, Dict]:
+        """details แบบเดียวกับ _detailed_comparison ของทุกหน่วย: {unit_id: details}"""
+        out = {unit_id: {'matching_candidates': [], 'discrepant_candidates': [],
+                         'missing_in_ect': [], 'missing_in_vote62': []}
+               for unit_id in self.units[UNIT].tolist()}
+        c = self.candidates
+        for unit_id, name, ect, v62, diff, status, miss_ect, miss_v62 in zip(
+                c[UNIT].tolist(), c[NAME].tolist(), c['ect_votes'].tolist(), c['vote62_votes'].tolist(),
+                c['difference'].tolist(), c['status'].tolist(),
+                c['missing_in_ect'].tolist(), c['missing_in_vote62'].tolist()):
+            d = out[unit_id]
+            if status == MATCHING:
+                d['matching_candidates'].append({'name': name, 'votes': ect})
+            elif status == DISCREPANT:
+                d['discrepant_candidates'].append({
+                    'name': name, 'ect_votes': ect, 'vote62_votes': v62, 'difference': diff})
+            if miss_ect:
+                d['missing_in_ect'].append(name)
+            elif miss_v62:
+                d['missing_in_vote62'].append(name)
+        return out
+
+    def results(self, constituencies: Optional[Dict[str, str]] = None,
+                timestamp: Optional[str] = None) -> Iterator[VerificationResult]:
+        """VerificationResult ของทุกหน่วยตามลำดับใน units"""
+        constituencies = constituencies or {}
+        timestamp = timestamp or datetime.now().isoformat()
+        details = self.details()
+        u = self.units
+        for unit_id, ect_total, v62_total, diff, level in zip(
+                u[UNIT].tolist(), u['ect_total'].tolist(), u['vote62_total'].tolist(),
+                u['difference'].tolist(), u['level'].tolist()):
+            yield VerificationResult(
+                unit_id=unit_id,
+                constituency=constituencies.get(unit_id, "ไม่ระบุ"),
+                ect_total=ect_total,
+                vote62_total=v62_total,
+                difference=diff,
+                discrepancy_level=DiscrepancyLevel[level],
+                details=details[unit_id],
+                timestamp=timestamp
+            )
+
+
+def _last_per_key(keys, votes):
+    """ค่าของแถวหลังสุดต่อ key (เหมือนเขียนทับใน dict) คืน (keys ที่เรียงแล้ว, votes)"""
+    uniq, idx = np.unique(keys[::-1], return_index=True)
+    return uniq, votes[::-1][idx]
+
+
+def compare_frames(ect: pd.DataFrame, vote62: pd.DataFrame,
+                   unit_col: str = UNIT, name_col: str = NAME, votes_col: str = VOTES,
+                   ect_units: Optional[Sequence] = None,
+                   vote62_units: Optional[Sequence] = None) -> FrameComparison:
+    """
+    เปรียบเทียบสองแหล่งแบบ grouped (เฉพาะหน่วยที่มีในทั้งสองแหล่ง เรียงตามลำดับที่พบใน ect)
+
+    คะแนนรวมนับทุกแถว; ถ้าชื่อซ้ำในหน่วยเดียวกัน การเทียบรายชื่อใช้แถวหลังสุด (เหมือน dict ของเดิม)
+    ect_units / vote62_units: หน่วยที่มีข้อมูลในแต่ละแหล่งแม้ไม่มีแถว (payload ที่รายชื่อว่าง)
+    หน่วยเหล่านี้ได้คะแนนรวม 0 (IDENTICAL ถ้าอีกแหล่งก็เป็น 0) เหมือนเส้นทางทีละหน่วย
+    """
+    ect_units = pd.Series(list(ect_units or []), dtype=object)
+    vote62_units = pd.Series(list(vote62_units or []), dtype=object)
+    n_ect = len(ect)
+    # แปลง unit_id / ชื่อ เป็นรหัสจำนวนเต็มครั้งเดียว (ลำดับที่พบ: กกต. ก่อน) แล้วทำงานกับ int64 ทั้งหมด
+    unit_codes, unit_labels = pd.factorize(pd.concat(
+        [ect_units, ect[unit_col], vote62_units, vote62[unit_col]], ignore_index=True))
+    name_codes, name_labels = pd.factorize(pd.concat([ect[name_col], vote62[name_col]], ignore_index=True))
+    n_units = len(unit_labels)
+    n_names = max(len(name_labels), 1)
+    # frame ว่างจาก frame_from_payloads มี dtype object — ไม่ให้มันบังคับเป็น float
+    integer = all(f[votes_col].dtype.kind in 'iu' or len(f) == 0 for f in (ect, vote62))
+    dtype = np.int64 if integer else np.float64
+    votes_e = ect[votes_col].to_numpy(dtype=dtype)
+    votes_v = vote62[votes_col].to_numpy(dtype=dtype)
+    split = np.cumsum([len(ect_units), n_ect, len(vote62_units)])
+    listed_e, unit_e, listed_v, unit_v = np.split(unit_codes, split)
+
+    total_e = np.zeros(n_units, dtype=dtype)
+    total_v = np.zeros(n_units, dtype=dtype)
+    np.add.at(total_e, unit_e, votes_e)
+    np.add.at(total_v, unit_v, votes_v)
+    present_e = np.bincount(np.concatenate((listed_e, unit_e)), minlength=n_units) > 0
+    present_v = np.bincount(np.concatenate((listed_v, unit_v)), minlength=n_units) > 0
+    common = present_e & present_v
+
+    key_e, val_e = _last_per_key(unit_e.astype(np.int64) * n_names + name_codes[:n_ect], votes_e)
+    key_v, val_v = _last_per_key(unit_v.astype(np.int64) * n_names + name_codes[n_ect:], votes_v)
+    keys = np.sort(np.concatenate((key_e, key_v)), kind='stable')
+    keys = keys[np.concatenate((np.ones(min(len(keys), 1), dtype=bool), keys[1:] != keys[:-1]))]
+    keys = keys[common[keys // n_names]]
+    ev = np.zeros(len(keys), dtype=dtype)
+    vv = np.zeros(len(keys), dtype=dtype)
+    for src_keys, src_vals, dst in ((key_e, val_e, ev), (key_v, val_v, vv)):
+        pos = np.searchsorted(keys, src_keys)
+        hit = pos < len(keys)
+        hit[hit] = keys[pos[hit]] == src_keys[hit]
+        dst[pos[hit]] = src_vals[hit]
+    key_unit = keys // n_names
+
+    status = np.where(ev == vv, np.where(ev > 0, MATCHING, NONE), DISCREPANT)
+    missing_in_ect = (ev == 0) & (vv > 0)
+    missing_in_vote62 = ~missing_in_ect & (vv == 0) & (ev > 0)
+    candidates = pd.DataFrame({
+        UNIT: unit_labels[key_unit],
+        NAME: name_labels[keys % n_names],
+        'ect_votes': ev,
+        'vote62_votes': vv,
+        'difference': np.abs(ev - vv),
+        'status': status,
+        'missing_in_ect': missing_in_ect,
+        'missing_in_vote62': missing_in_vote62,
+    })
+
+    idx = np.flatnonzero(common)
+    n_missing_ect = np.bincount(key_unit[missing_in_ect], minlength=n_units)[idx]
+    n_missing_v62 = np.bincount(key_unit[missing_in_vote62], minlength=n_units)[idx]
+    et = total_e[idx]
+    vt = total_v[idx]
+    difference = np.abs(et - vt)
+    units = pd.DataFrame({
+        UNIT: unit_labels[idx],
+        'ect_total': et,
+        'vote62_total': vt,
+        'difference': difference,
+        'level': assess_levels(difference, et, (n_missing_ect > 0) | (n_missing_v62 > 0)),
+        'n_discrepant': np.bincount(key_unit[status == DISCREPANT], minlength=n_units)[idx],
+        'n_missing_in_ect': n_missing_ect,
+        'n_missing_in_vote62': n_missing_v62,
+    })
+    return FrameComparison(units, candidates)
+
+
+def compare_payloads(ect_payloads: Dict[str, Dict], vote62_payloads: Dict[str, Dict]) -> FrameComparison:
+    """compare_frames จาก {unit_id: payload} ของทั้งสองแหล่ง"""
+    return compare_frames(frame_from_payloads(ect_payloads), frame_from_payloads(vote62_payloads),
+                          ect_units=[u for u, data in ect_payloads.items() if data],
+                          vote62_units=[u for u, data in vote62_payloads.items() if data])
@@ -4,14 +4,28 @@
 Cross-verification between Official ECT Data and Citizen-sourced Vote62 Data
 """
 
+import asyncio
 import requests
 import json
 import pandas as pd
-from typing import Dict, List, Tuple, Optional
+from typing import AsyncIterator, Dict, List, Tuple, Optional
 from datetime import datetime
 import hashlib
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from dataclasses import dataclass
 from enum import Enum
+from urllib.parse import urlsplit
+
+from checkpoint_store import CheckpointStore, source_hash
+from ect_fetcher import make_session
+from result_export import ResultWriter, summary_row
+from result_store import ResultStore
+from unit_index import UnitIndex
+
+# อายุสูงสุด (วินาที) ของผลใน checkpoint ที่ใช้ซ้ำได้เมื่อไม่รู้ hash ปัจจุบันของหน่วย (ข้อมูลอัปเดตทุกชั่วโมง)
+CHECKPOINT_MAX_AGE = 3600
 
 
 class DiscrepancyLevel(Enum):
@@ -33,15 +47,29 @@ class VerificationResult:
     discrepancy_level: DiscrepancyLevel
     details: Dict
     timestamp: str
+    source_hash: Optional[str] = None
 
 
 class Vote62Comparator:
     """คลาสหลักสำหรับเปรียบเทียบข้อมูล"""
     
-    def __init__(self):
+    def __init__(self, session: Optional[requests.Session] = None,
+                 max_workers: int = 1, per_host_limit: int = 8, timeout=30):
+        """
+        Args:
+            session: requests.Session ที่ใช้ร่วมกัน (keep-alive) — ไม่ระบุจะสร้างให้
+            max_workers: จำนวน thread ของ batch_compare (1 = ทีละหน่วย)
+            per_host_limit: จำนวน request พร้อมกันสูงสุดต่อ host
+            timeout: timeout ของแต่ละ request (วินาที หรือ (connect, read))
+        """
         self.ect_base_url = "https://static-ectreport69.ect.go.th/data/data"
         self.vote62_base_url = "https://vote62.com/api"  # สมมติ API endpoint
-        self.discrepancies = []
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.session = session or make_session(max(max_workers, per_host_limit) * 2)
+        # ผลทุกหน่วยแบบ columnar (วนลูปได้เหมือน list ของ VerificationResult)
+        self.discrepancies = ResultStore()
         self.stats = {
             'total_units_compared': 0,
             'identical': 0,
@@ -49,6 +77,73 @@ class Vote62Comparator:
             'significant_diff': 0,
             'critical_diff': 0
         }
+        self._lock = threading.Lock()
+        self._host_slots = {}
+        # ข้อมูลรายหน่วยที่โหลดแบบ bulk (ถ้ามี fetch_* จะค้นจากที่นี่ก่อน ไม่ต้องยิง HTTP)
+        self.ect_index: Optional[UnitIndex] = None
+        self.vote62_index: Optional[UnitIndex] = None
+        self.index_only = False
+    
+    def load_ect_units(self, *sources: str, index_only: Optional[bool] = None) -> int:
+        """
+        โหลดข้อมูล กกต. ทั้งเขต/จังหวัดจากไฟล์ (JSON/JSONL/CSV) หรือ URL เข้า index
+        
+        Args:
+            sources: path หรือ URL ตั้งแต่หนึ่งรายการ
+            index_only: True = หน่วยที่ไม่มีใน index ไม่ต้องยิง HTTP ทีละหน่วย
+        """
+        if self.ect_index is None:
+            self.ect_index = UnitIndex()
+        count = sum(self.ect_index.add_source(src, session=self.session) for src in sources)
+        if index_only is not None:
+            self.index_only = index_only
+        print(f"📦 โหลดข้อมูล กกต. {count:,} หน่วย (รวม {len(self.ect_index):,})")
+        return count
+    
+    def load_vote62_units(self, *sources: str, index_only: Optional[bool] = None) -> int:
+        """โหลดข้อมูล Vote62 แบบ bulk (เช่น /api/units หรือ vote62_raw_data.json) เข้า index"""
+        if self.vote62_index is None:
+            self.vote62_index = UnitIndex()
+        count = sum(self.vote62_index.add_source(src, session=self.session) for src in sources)
+        if index_only is not None:
+            self.index_only = index_only
+        print(f"📦 โหลดข้อมูล Vote62 {count:,} หน่วย (รวม {len(self.vote62_index):,})")
+        return count
+    
+    def _lookup(self, index: Optional[UnitIndex], unit_id: str):
+        """(พบใน index, payload) — ถ้า index_only และไม่พบ ถือว่าไม่มีข้อมูลโดยไม่ต้องยิง HTTP"""
+        if index is not None:
+            unit = index.get(unit_id)
+            if unit is not None or self.index_only:
+                return True, unit
+        return False, None
+
+    def current_source_hashes(self, unit_ids: List[str]) -> Dict[str, str]:
+        """source_hash ของหน่วยที่มีข้อมูลใน index ทั้งสองแหล่ง (หน่วยอื่นต้องดึงใหม่จึงจะรู้)"""
+        if self.ect_index is None or self.vote62_index is None:
+            return {}
+        hashes = {}
+        for unit_id in unit_ids:
+            ect_data = self.ect_index.get(unit_id)
+            vote62_data = self.vote62_index.get(unit_id)
+            if ect_data and vote62_data:
+                hashes[unit_id] = source_hash(ect_data, vote62_data)
+        return hashes
+
+    @contextmanager
+    def _host_slot(self, url: str):
+        """จำกัดจำนวน request พร้อมกันต่อ host ด้วย semaphore"""
+        host = urlsplit(url).netloc
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+        with slot:
+            yield
+
+    def _get(self, url: str) -> requests.Response:
+        with self._host_slot(url):
+            return self.session.get(url, timeout=self.timeout)
     
     def fetch_ect_unit_data(self, unit_id: str) -> Optional[Dict]:
         """
@@ -57,10 +152,16 @@ class Vote62Comparator:
         Args:
             unit_id: รหัสหน่วยเลือกตั้ง
         """
+        found, unit = self._lookup(self.ect_index, unit_id)
+        if found:
+            if unit is None:
+                print(f"⚠️  ไม่พบข้อมูล กกต. สำหรับหน่วย {unit_id}")
+            return unit
+        
         try:
             # ตัวอย่าง URL structure (ปรับตามจริง)
             url = f"{self.ect_base_url}/results/unit/{unit_id}.json"
-            response = requests.get(url, timeout=30)
+            response = self._get(url)
             
             if response.status_code == 200:
                 return response.json()
@@ -78,10 +179,16 @@ class Vote62Comparator:
         Args:
             unit_id: รหัสหน่วยเลือกตั้ง
         """
+        found, unit = self._lookup(self.vote62_index, unit_id)
+        if found:
+            if unit is None:
+                print(f"⚠️  ไม่พบข้อมูล Vote62 สำหรับหน่วย {unit_id}")
+            return unit
+        
         try:
             # ตัวอย่าง API call (ปรับตาม Vote62 API จริง)
             url = f"{self.vote62_base_url}/units/{unit_id}"
-            response = requests.get(url, timeout=30)
+            response = self._get(url)
             
             if response.status_code == 200:
                 return response.json()
@@ -102,10 +209,26 @@ class Vote62Comparator:
         """
         print(f"\n🔍 กำลังตรวจสอบหน่วย {unit_id} ({constituency})...")
         
+        result = self._compare_unit(unit_id, constituency)
+        if result is None:
+            return None
+        
+        # บันทึกผล
+        self._record_result(result)
+        self._print_result(result)
+        
+        return result
+    
+    def _compare_unit(self, unit_id: str, constituency: str) -> Optional[VerificationResult]:
+        """ดึงข้อมูลทั้งสองแหล่งแล้วเปรียบเทียบ (ไม่บันทึกผล) — เรียกจากหลาย thread ได้"""
         # ดึงข้อมูลจากทั้งสองแหล่ง
         ect_data = self.fetch_ect_unit_data(unit_id)
         vote62_data = self.fetch_vote62_unit_data(unit_id)
-        
+        return self._build_result(unit_id, constituency, ect_data, vote62_data)
+    
+    def _build_result(self, unit_id: str, constituency: str,
+                      ect_data: Optional[Dict], vote62_data: Optional[Dict]) -> Optional[VerificationResult]:
+        """เปรียบเทียบข้อมูลที่ดึงมาแล้วของหน่วยเดียว (None ถ้าแหล่งใดไม่มีข้อมูล)"""
         if not ect_data or not vote62_data:
             return None
         
@@ -128,15 +251,102 @@ class Vote62Comparator:
             difference=difference,
             discrepancy_level=discrepancy_level,
             details=details,
-            timestamp=datetime.now().isoformat()
+            timestamp=datetime.now().isoformat(),
+            source_hash=source_hash(ect_data, vote62_data)
         )
         
-        # บันทึกผล
+        return result
+    
+    async def acompare_unit_results(self, unit_id: str, constituency: str) -> Optional[VerificationResult]:
+        """
+        compare_unit_results แบบ async: ดึงข้อมูล กกต. และ Vote62 พร้อมกัน
+        
+        Args:
+            unit_id: รหัสหน่วยเลือกตั้ง
+            constituency: ชื่อเขตเลือกตั้ง
+        """
+        loop = asyncio.get_running_loop()
+        ect_data, vote62_data = await asyncio.gather(
+            loop.run_in_executor(None, self.fetch_ect_unit_data, unit_id),
+            loop.run_in_executor(None, self.fetch_vote62_unit_data, unit_id),
+        )
+        result = self._build_result(unit_id, constituency, ect_data, vote62_data)
+        if result is None:
+            return None
+        
         self._record_result(result)
         self._print_result(result)
-        
         return result
     
+    async def abatch_compare(self, unit_ids: List[str], constituencies: Dict[str, str],
+                             concurrency: Optional[int] = None,
+                             queue_size: Optional[int] = None) -> AsyncIterator[VerificationResult]:
+        """
+        เปรียบเทียบหลายหน่วยแบบ pipeline แล้วส่ง VerificationResult ออกมาทันทีที่เสร็จ
+        
+        Args:
+            unit_ids: รายการรหัสหน่วยเลือกตั้ง
+            constituencies: mapping unit_id -> constituency name
+            concurrency: จำนวนหน่วยที่ดึงข้อมูลพร้อมกัน (ไม่ระบุใช้ max(max_workers, per_host_limit))
+            queue_size: ขนาดคิวระหว่างขั้นตอน (ไม่ระบุใช้ 2 เท่าของ concurrency)
+        
+        ขั้นตอน: unit_ids -> [คิว] -> ดึงข้อมูล (thread) -> [คิว] -> เปรียบเทียบ/ประเมิน -> ผู้เรียก
+        คิวมีขนาดจำกัด ถ้าผู้เรียกอ่านช้า การดึงข้อมูลจะหยุดรอ (backpressure) หน่วยความจำจึงคงที่
+        
+        >>> async for result in comparator.abatch_compare(unit_ids, constituencies):
+        ...     handle(result)
+        """
+        concurrency = concurrency or max(self.max_workers, self.per_host_limit)
+        queue_size = queue_size or concurrency * 2
+        loop = asyncio.get_running_loop()
+        pending = asyncio.Queue(maxsize=queue_size)
+        fetched = asyncio.Queue(maxsize=queue_size)
+        done = object()
+        # หน่วยละ 2 request (กกต. + Vote62) พร้อมกัน
+        executor = ThreadPoolExecutor(max_workers=concurrency * 2)
+        
+        async def produce():
+            for unit_id in unit_ids:
+                await pending.put(unit_id)
+            for _ in range(concurrency):
+                await pending.put(done)
+        
+        async def fetch_worker():
+            while True:
+                unit_id = await pending.get()
+                if unit_id is done:
+                    await fetched.put(done)
+                    return
+                ect_data, vote62_data = await asyncio.gather(
+                    loop.run_in_executor(executor, self.fetch_ect_unit_data, unit_id),
+                    loop.run_in_executor(executor, self.fetch_vote62_unit_data, unit_id),
+                )
+                await fetched.put((unit_id, ect_data, vote62_data))
+        
+        tasks = [asyncio.ensure_future(produce())]
+        tasks += [asyncio.ensure_future(fetch_worker()) for _ in range(concurrency)]
+        try:
+            finished = 0
+            while finished < concurrency:
+                item = await fetched.get()
+                if item is done:
+                    finished += 1
+                    continue
+                unit_id, ect_data, vote62_data = item
+                # ขั้นเปรียบเทียบทำใน event loop ระหว่างที่ worker ดึงข้อมูลหน่วยถัดไป
+                result = self._build_result(unit_id, constituencies.get(unit_id, "ไม่ระบุ"),
+                                            ect_data, vote62_data)
+                if result is None:
+                    continue
+                self._record_result(result)
+                self._print_result(result)
+                yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            executor.shutdown(wait=False)
+    
     def _calculate_total_votes(self, data: Dict) -> int:
         """คำนวณคะแนนรวม"""
         total = 0
@@ -240,18 +450,19 @@ class Vote62Comparator:
             return DiscrepancyLevel.MINOR
     
     def _record_result(self, result: VerificationResult):
-        """บันทึกผลการตรวจสอบ"""
-        self.discrepancies.append(result)
-        self.stats['total_units_compared'] += 1
-        
-        if result.discrepancy_level == DiscrepancyLevel.IDENTICAL:
-            self.stats['identical'] += 1
-        elif result.discrepancy_level == DiscrepancyLevel.MINOR:
-            self.stats['minor_diff'] += 1
-        elif result.discrepancy_level == DiscrepancyLevel.SIGNIFICANT:
-            self.stats['significant_diff'] += 1
-        else:
-            self.stats['critical_diff'] += 1
+        """บันทึกผลการตรวจสอบ (thread-safe)"""
+        with self._lock:
+            self.discrepancies.append(result)
+            self.stats['total_units_compared'] += 1
+            
+            if result.discrepancy_level == DiscrepancyLevel.IDENTICAL:
+                self.stats['identical'] += 1
+            elif result.discrepancy_level == DiscrepancyLevel.MINOR:
+                self.stats['minor_diff'] += 1
+            elif result.discrepancy_level == DiscrepancyLevel.SIGNIFICANT:
+                self.stats['significant_diff'] += 1
+            else:
+                self.stats['critical_diff'] += 1
     
     def _print_result(self, result: VerificationResult):
         """แสดงผลการตรวจสอบ"""
@@ -280,37 +491,180 @@ class Vote62Comparator:
             for name in result.details['missing_in_vote62']:
                 print(f"  - {name}")
     
-    def batch_compare(self, unit_ids: List[str], constituencies: Dict[str, str]) -> pd.DataFrame:
+    def batch_compare(self, unit_ids: List[str], constituencies: Dict[str, str],
+                      max_workers: Optional[int] = None,
+                      checkpoint=None,
+                      source_hashes: Optional[Dict[str, str]] = None,
+                      checkpoint_max_age: Optional[float] = CHECKPOINT_MAX_AGE,
+                      export=None, export_details=False,
+                      as_frame: bool = True) -> Optional[pd.DataFrame]:
         """
         เปรียบเทียบหลายหน่วยพร้อมกัน
         
         Args:
             unit_ids: รายการรหัสหน่วยเลือกตั้ง
             constituencies: mapping unit_id -> constituency name
+            max_workers: จำนวน thread (ไม่ระบุใช้ self.max_workers, 1 = ทีละหน่วย)
+            checkpoint: path ของไฟล์ JSONL หรือ CheckpointStore — ผลแต่ละหน่วยถูกเขียนทันที
+                และหน่วยที่มีผลอยู่แล้วจะไม่ถูกดึงซ้ำเมื่อรันต่อ
+            source_hashes: mapping unit_id -> source_hash ของข้อมูลปัจจุบัน (ถ้ารู้ล่วงหน้า)
+                หน่วยที่ hash ไม่ตรงกับ checkpoint จะถูกเปรียบเทียบใหม่
+                ไม่ระบุ: คำนวณจากหน่วยที่อยู่ใน index ทั้งสองแหล่ง (load_*_units)
+            checkpoint_max_age: หน่วยที่ไม่รู้ hash ปัจจุบัน ใช้ผลใน checkpoint ได้เมื่ออายุไม่เกินกี่วินาที
+                (None = เปรียบเทียบใหม่ทุกหน่วยที่ไม่รู้ hash)
+            export: path (.csv / .jsonl / .parquet) หรือ ResultWriter — เขียนผลต่อท้ายทีละหน่วย
+                (หลาย thread: เขียนตามลำดับที่เสร็จ)
+            export_details: เขียนแถวรายผู้สมัครด้วย (True หรือ path ของไฟล์ details)
+            as_frame: False = ไม่สะสมผลเป็น DataFrame (คืน None) ใช้คู่กับ export ในการรันทั้งประเทศ
+        
+        ผลลัพธ์, self.discrepancies และ stats เรียงตามลำดับ unit_ids เสมอ
         """
         results = []
+        workers = max_workers or self.max_workers
+        store = CheckpointStore(checkpoint) if isinstance(checkpoint, str) else checkpoint
+        writer = ResultWriter(export, details=export_details) if isinstance(export, str) else export
+        
+        # หน่วยที่มีผลใน checkpoint แล้ว (และข้อมูลต้นทางไม่เปลี่ยน)
+        restored = {}
+        if store is not None:
+            hashes = self.current_source_hashes(unit_ids) if source_hashes is None else source_hashes
+            for unit_id in unit_ids:
+                if store.is_current(unit_id, hashes.get(unit_id), max_age=checkpoint_max_age):
+                    restored[unit_id] = self._result_from_record(store.get(unit_id))
         
         print(f"\n🚀 เริ่มเปรียบเทียบ {len(unit_ids)} หน่วย...")
+        if restored:
+            print(f"♻️  ใช้ผลจาก checkpoint {len(restored)} หน่วย, ต้องตรวจสอบ {len(unit_ids) - len(restored)} หน่วย")
         
-        for i, unit_id in enumerate(unit_ids, 1):
-            print(f"\nProgress: {i}/{len(unit_ids)}")
-            constituency = constituencies.get(unit_id, "ไม่ระบุ")
-            result = self.compare_unit_results(unit_id, constituency)
-            
-            if result:
-                results.append({
-                    'unit_id': result.unit_id,
-                    'constituency': result.constituency,
-                    'ect_total': result.ect_total,
-                    'vote62_total': result.vote62_total,
-                    'difference': result.difference,
-                    'discrepancy_level': result.discrepancy_level.value,
-                    'timestamp': result.timestamp
-                })
+        def finish(result, fresh):
+            if fresh and store is not None:
+                store.append(self._result_to_record(result))
+            if writer is not None:
+                writer.write(result)
+            if as_frame:
+                results.append(self._result_row(result))
         
+        try:
+            if workers <= 1:
+                for i, unit_id in enumerate(unit_ids, 1):
+                    print(f"\nProgress: {i}/{len(unit_ids)}")
+                    if unit_id in restored:
+                        self._record_result(restored[unit_id])
+                        finish(restored[unit_id], fresh=False)
+                        continue
+                    constituency = constituencies.get(unit_id, "ไม่ระบุ")
+                    result = self.compare_unit_results(unit_id, constituency)
+                    
+                    if result:
+                        finish(result, fresh=True)
+            else:
+                # ดึงข้อมูลพร้อมกันหลาย thread ส่งงานทีละช่วง (ไม่เกิน workers * 2 งานค้าง)
+                # ผลแต่ละหน่วยเขียนลง checkpoint / export ทันทีที่เสร็จ แล้วจัดตามลำดับ input ตอนท้าย
+                for unit_id, result in restored.items():
+                    if writer is not None:
+                        writer.write(result)
+                todo = iter([u for u in unit_ids if u not in restored])
+                window = workers * 2
+                compared = {}
+                done_count = len(restored)
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    pending = {}
+                    try:
+                        while True:
+                            for unit_id in todo:
+                                future = pool.submit(self._compare_unit, unit_id,
+                                                     constituencies.get(unit_id, "ไม่ระบุ"))
+                                pending[future] = unit_id
+                                if len(pending) >= window:
+                                    break
+                            if not pending:
+                                break
+                            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                            for future in finished:
+                                unit_id = pending.pop(future)
+                                result = future.result()
+                                done_count += 1
+                                print(f"\nProgress: {done_count}/{len(unit_ids)}")
+                                if result:
+                                    self._print_result(result)
+                                    if store is not None:
+                                        store.append(self._result_to_record(result))
+                                    if writer is not None:
+                                        writer.write(result)
+                                    compared[unit_id] = result
+                    except BaseException:
+                        # หยุดกลางทาง (เช่น Ctrl-C): ยกเลิกงานที่ยังไม่เริ่ม ผลที่เสร็จแล้วอยู่ใน checkpoint
+                        for future in pending:
+                            future.cancel()
+                        raise
+                
+                for unit_id in unit_ids:
+                    result = restored.get(unit_id) or compared.get(unit_id)
+                    if result:
+                        self._record_result(result)
+                        if as_frame:
+                            results.append(self._result_row(result))
+        finally:
+            if isinstance(checkpoint, str):
+                store.close()
+            if isinstance(export, str):
+                writer.close()
+        
+        if not as_frame:
+            return None
         df = pd.DataFrame(results)
         return df
     
+    def batch_compare_frames(self, ect_df: pd.DataFrame, vote62_df: pd.DataFrame,
+                             constituencies: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+        """
+        เปรียบเทียบจาก DataFrame แบบ long format (unit_id, name, votes) ของทั้งสองแหล่งในรอบเดียว
+        
+        ให้ผลเหมือน batch_compare (บันทึกลง discrepancies / stats) แต่คำนวณแบบ vectorized
+        ดู vectorized_compare.compare_frames
+        """
+        from vectorized_compare import compare_frames
+        
+        comparison = compare_frames(ect_df, vote62_df)
+        rows = []
+        for result in comparison.results(constituencies):
+            self._record_result(result)
+            rows.append(self._result_row(result))
+        print(f"✅ เปรียบเทียบ {len(rows):,} หน่วย (vectorized)")
+        return pd.DataFrame(rows)
+    
+    def _result_to_record(self, result: VerificationResult) -> Dict:
+        """VerificationResult -> dict สำหรับ checkpoint (JSON)"""
+        return {
+            'unit_id': result.unit_id,
+            'source_hash': result.source_hash,
+            'constituency': result.constituency,
+            'ect_total': result.ect_total,
+            'vote62_total': result.vote62_total,
+            'difference': result.difference,
+            'level': result.discrepancy_level.name,
+            'details': result.details,
+            'timestamp': result.timestamp
+        }
+    
+    def _result_from_record(self, record: Dict) -> VerificationResult:
+        """dict จาก checkpoint -> VerificationResult"""
+        return VerificationResult(
+            unit_id=record['unit_id'],
+            constituency=record['constituency'],
+            ect_total=record['ect_total'],
+            vote62_total=record['vote62_total'],
+            difference=record['difference'],
+            discrepancy_level=DiscrepancyLevel[record['level']],
+            details=record['details'],
+            timestamp=record['timestamp'],
+            source_hash=record.get('source_hash')
+        )
+    
+    def _result_row(self, result: VerificationResult) -> Dict:
+        """แถวของ DataFrame สำหรับผลหนึ่งหน่วย"""
+        return summary_row(result)
+    
     def generate_summary_report(self) -> Dict:
         """สร้างรายงานสรุป"""
         total = self.stats['total_units_compared']
@@ -333,15 +687,7 @@ class Vote62Comparator:
                 'significant': (self.stats['significant_diff'] / total) * 100,
                 'critical': (self.stats['critical_diff'] / total) * 100
             },
-            'critical_units': [
-                {
-                    'unit_id': r.unit_id,
-                    'constituency': r.constituency,
-                    'difference': r.difference
-                }
-                for r in self.discrepancies
-                if r.discrepancy_level == DiscrepancyLevel.CRITICAL
-            ]
+            'critical_units': list(self.discrepancies.rows(DiscrepancyLevel.CRITICAL))
         }
         
         return report
@@ -370,26 +716,19 @@ class Vote62Comparator:
         
         print("\n" + "="*80)
     
-    def export_to_csv(self, filename: str = "verification_results.csv"):
-        """Export ผลการเปรียบเทียบเป็น CSV"""
+    def export_to_csv(self, filename: str = "verification_results.csv", details=False):
+        """
+        Export ผลการเปรียบเทียบเป็น CSV (หรือ .jsonl / .parquet ตามนามสกุล) แบบ streaming
+        
+        details=True เขียนแถวรายผู้สมัครด้วย — หน่วยที่ไม่มีความแตกต่างไม่ได้เก็บ details
+        ไว้ใน self.discrepancies ถ้าต้องการรายชื่อครบทุกหน่วยให้ใช้ batch_compare(export=...)
+        """
         if not self.discrepancies:
             print("ไม่มีข้อมูลให้ export")
             return
         
-        data = []
-        for r in self.discrepancies:
-            data.append({
-                'unit_id': r.unit_id,
-                'constituency': r.constituency,
-                'ect_total': r.ect_total,
-                'vote62_total': r.vote62_total,
-                'difference': r.difference,
-                'discrepancy_level': r.discrepancy_level.value,
-                'timestamp': r.timestamp
-            })
-        
-        df = pd.DataFrame(data)
-        df.to_csv(filename, index=False, encoding='utf-8-sig')
+        with ResultWriter(filename, details=details) as writer:
+            writer.write_many(self.discrepancies)
         print(f"\n✅ Export สำเร็จ: {filename}")
     
     def create_visualization_data(self) -> Dict:
@@ -399,20 +738,10 @@ class Vote62Comparator:
         
         # จัดกลุ่มตามระดับความร้ายแรง
         grouped = {
-            'identical': [],
-            'minor': [],
-            'significant': [],
-            'critical': []
+            level.name.lower(): list(self.discrepancies.rows(level))
+            for level in DiscrepancyLevel
         }
         
-        for r in self.discrepancies:
-            key = r.discrepancy_level.name.lower()
-            grouped[key].append({
-                'unit_id': r.unit_id,
-                'constituency': r.constituency,
-                'difference': r.difference
-            })
-        
         return grouped
 
 